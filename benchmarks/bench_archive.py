@@ -0,0 +1,129 @@
+# The damages table before and after archiving everything but the last
+# year: on-disk size, a recent-months query, a car's full history (the
+# report query) and a page that reaches back into archived months.
+#
+#   python -m benchmarks.bench_archive --rows 1000000 --keep-months 12
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from datetime import date, timedelta
+
+from sqlalchemy import create_engine, insert, select, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from database.archive import DamageArchive, archive_damages, archived_damage_rows
+from database.models import Base, CarData, DamageData
+
+START = date(2015, 1, 1)
+DAYS = 3650
+CARS = 1000
+
+
+def seed(url, rows):
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(insert(CarData), [
+            {"license_plate": f"CAR{i:05d}", "model": "Civic", "color": "Red",
+             "vin_number": f"VIN{i:014d}", "brand": "Honda"} for i in range(CARS)])
+        for start in range(0, rows, 10000):
+            connection.execute(insert(DamageData), [
+                {"license_plate": f"CAR{i % CARS:05d}", "damage_type": ["Dent", "Scratch"][i % 2],
+                 "damaged_part": ["Bonnet", "Door", "Roof"][i % 3],
+                 "date": START + timedelta(days=i * 7 % DAYS)}
+                for i in range(start, min(start + 10000, rows))])
+    engine.dispose()
+
+
+def database_size(url):
+    engine = create_engine(url)
+    with engine.connect() as connection:
+        connection.execution_options(isolation_level="AUTOCOMMIT").execute(text("VACUUM"))
+    engine.dispose()
+    return os.path.getsize(url.removeprefix("sqlite:///"))
+
+
+def directory_size(directory):
+    return sum(entry.stat().st_size for entry in os.scandir(directory)) if os.path.isdir(directory) else 0
+
+
+async def timed(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await fn()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+async def queries(session_factory, archive, recent_from, repeat):
+    async with session_factory() as db_session:
+        async def recent():
+            await db_session.execute(
+                select(DamageData).where(DamageData.damage_type == "Dent", DamageData.date >= recent_from)
+                .order_by(DamageData.date, DamageData.id).limit(100))
+
+        async def history():
+            result = await db_session.execute(select(DamageData).where(DamageData.license_plate == "CAR00042"))
+            result.scalars().all()
+            await archive.damages_for_plates(["CAR00042"])
+
+        async def old_page():
+            result = await db_session.execute(
+                select(DamageData).where(DamageData.date >= date(2016, 3, 1), DamageData.date < date(2016, 4, 1))
+                .order_by(DamageData.date, DamageData.id).limit(100))
+            result.scalars().all()
+            await archived_damage_rows(db_session, date_from=date(2016, 3, 1), date_to=date(2016, 3, 31),
+                                       limit=100, archive=archive)
+
+        return [await timed(fn, repeat) for fn in (recent, history, old_page)]
+
+
+async def run(url, archive, keep_months, repeat):
+    async_engine = create_async_engine(url.replace("sqlite://", "sqlite+aiosqlite://"))
+    session_factory = async_sessionmaker(bind=async_engine, expire_on_commit=False)
+    end = START + timedelta(days=DAYS)
+    months = end.year * 12 + end.month - 1 - keep_months
+    before = date(months // 12, months % 12 + 1, 1)
+
+    results = {"before": await queries(session_factory, archive, before, repeat)}
+    started = time.perf_counter()
+    async with session_factory() as db_session:
+        archived = await archive_damages(db_session, before, archive=archive)
+    elapsed = time.perf_counter() - started
+    results["after"] = await queries(session_factory, archive, before, repeat)
+    await async_engine.dispose()
+    return results, archived, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--keep-months", type=int, default=12)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    url = f"sqlite:///{os.path.join(directory, 'bench.db')}"
+    archive = DamageArchive(os.path.join(directory, "archive"))
+    seed(url, args.rows)
+    size_before = database_size(url)
+
+    results, archived, elapsed = asyncio.run(run(url, archive, args.keep_months, args.repeat))
+    size_after = database_size(url)
+
+    print(f"Archived {sum(archived.values())} of {args.rows} damages "
+          f"({len(archived)} months) in {elapsed:.1f} s\n")
+    print(f"{'':<8} {'table MB':>9} {'archive MB':>11} {'recent ms':>10} {'history ms':>11} {'old page ms':>12}")
+    for label, table_size, archive_size in [("before", size_before, 0),
+                                            ("after", size_after, directory_size(archive.directory))]:
+        recent, history, old_page = results[label]
+        print(f"{label:<8} {table_size / 2 ** 20:>9.1f} {archive_size / 2 ** 20:>11.1f} "
+              f"{recent:>10.2f} {history:>11.2f} {old_page:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+# Deleting cars with many damages: the previous ORM cascade (load every
+# damage, one DELETE each) against ON DELETE CASCADE with the summary
+# decrements counted in SQL, and against one DELETE for many plates.
+#
+#   python -m benchmarks.bench_car_delete --damages-per-car 5000
+#   python -m benchmarks.bench_car_delete --cars 2000 --damages-per-car 20
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+from sqlalchemy import create_engine, delete, insert, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import selectinload
+
+from database.analytics import apply_damage_deltas, count_damages, deleted_car_deltas, rebuild_damage_summary
+from database.bulk import BULK_BATCH_SIZE
+from database.database import get_async_url
+from database.models import Base, CarData, DamageData
+
+
+def seed(url, cars, damages_per_car):
+    engine = create_engine(url)
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    start = date(2020, 1, 1)
+    with engine.begin() as connection:
+        connection.execute(insert(CarData), [
+            {"license_plate": f"CAR{i:06d}", "model": "Civic", "color": "Red",
+             "vin_number": f"VIN{i:014d}", "brand": "Honda"} for i in range(cars)])
+        for i in range(cars):
+            connection.execute(insert(DamageData), [
+                {"license_plate": f"CAR{i:06d}", "damage_type": "Dent", "damaged_part": "Bonnet",
+                 "date": start + timedelta(days=n % 1000)} for n in range(damages_per_car)])
+    engine.dispose()
+
+
+async def orm_cascade_delete(db_session, plates):
+    # What delete_car_data did before: the damages are loaded so the ORM
+    # can delete them one by one.
+    for plate in plates:
+        result = await db_session.execute(
+            select(CarData).options(selectinload(CarData.damages)).filter(CarData.license_plate == plate))
+        car = result.scalars().first()
+        await db_session.delete(car)
+        await apply_damage_deltas(db_session, count_damages(
+            ((damage.damage_type, damage.damaged_part, car.brand, damage.date) for damage in car.damages),
+            sign=-1))
+        await db_session.commit()
+
+
+async def database_cascade_delete(db_session, plates):
+    # delete_car_data now, one request per plate.
+    for plate in plates:
+        result = await db_session.execute(
+            select(CarData).filter(CarData.license_plate == plate).with_for_update())
+        car = result.scalars().first()
+        deltas, _ = await deleted_car_deltas(db_session, [plate])
+        await db_session.delete(car)
+        await apply_damage_deltas(db_session, deltas)
+        await db_session.commit()
+
+
+async def bulk_delete(db_session, plates):
+    # POST /admin/cars/delete with every plate at once.
+    for start in range(0, len(plates), BULK_BATCH_SIZE):
+        batch = plates[start:start + BULK_BATCH_SIZE]
+        deltas, _ = await deleted_car_deltas(db_session, batch)
+        await db_session.execute(delete(CarData).filter(CarData.license_plate.in_(batch))
+                                 .execution_options(synchronize_session=False))
+        await apply_damage_deltas(db_session, deltas)
+    await db_session.commit()
+
+
+async def measure(url, strategy, plates):
+    async_engine = create_async_engine(get_async_url(url))
+    session_factory = async_sessionmaker(bind=async_engine, expire_on_commit=False)
+    async with session_factory() as db_session:
+        await rebuild_damage_summary(db_session)
+        await db_session.commit()
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    async with session_factory() as db_session:
+        await strategy(db_session, plates)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    await async_engine.dispose()
+    return elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cars", type=int, default=20)
+    parser.add_argument("--damages-per-car", type=int, default=5000)
+    args = parser.parse_args()
+
+    url = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    plates = [f"CAR{i:06d}" for i in range(args.cars)]
+
+    print(f"Deleting {args.cars} cars with {args.damages_per_car} damages each\n")
+    print(f"{'strategy':<26} {'total s':>9} {'ms / car':>9} {'peak MB':>9}")
+    for name, strategy in [("ORM cascade (before)", orm_cascade_delete),
+                           ("ON DELETE CASCADE", database_cascade_delete),
+                           ("bulk /admin/cars/delete", bulk_delete)]:
+        seed(url, args.cars, args.damages_per_car)
+        elapsed, peak = asyncio.run(measure(url, strategy, plates))
+        print(f"{name:<26} {elapsed:>9.2f} {elapsed / args.cars * 1000:>9.1f} {peak / 2 ** 20:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
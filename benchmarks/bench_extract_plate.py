@@ -0,0 +1,58 @@
+# extract_plate against the original cubic implementation.
+#
+#   python -m benchmarks.bench_extract_plate
+
+import argparse
+import random
+import re
+import timeit
+
+from routers.report import extract_plate, extract_plates
+
+
+def legacy_extract_plate(plate_text):
+    matches = re.findall(r'[A-Za-z0-9]+', plate_text)
+
+    for match in matches:
+        length = len(match)
+        for size in range(1, length + 1):
+            for start in range(length - size + 1):
+                substring = match[start:start + size]
+                if match == substring * (length // size):
+                    return substring
+
+    return max(matches, key=len) if matches else None
+
+
+def per_call_us(fn, text, number):
+    return min(timeit.repeat(lambda: fn(text), number=number, repeat=3)) / number * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--batch", type=int, default=10000)
+    args = parser.parse_args()
+
+    print(f"{'token length':>12} {'legacy us':>10} {'new us':>8}")
+    for length in [8, 16, 64, 256]:
+        # Worst case for the legacy loop: no period, so every size is tried.
+        text = ("AB12" * length)[:length - 1] + "X"
+        number = max(1, 2000 // length)
+        print(f"{length:>12} {per_call_us(legacy_extract_plate, text, number):>10.1f} "
+              f"{per_call_us(extract_plate, text, number):>8.2f}")
+
+    rng = random.Random(0)
+    plates = ["".join(rng.choice("ABCDEFGH0123456789") for _ in range(7))
+              for _ in range(args.batch // 10)]
+    texts = [rng.choice(plates) * rng.randint(1, 2) for _ in range(args.batch)]
+    legacy_ms = min(timeit.repeat(lambda: [legacy_extract_plate(t) for t in texts],
+                                  number=1, repeat=3)) * 1000
+    loop_ms = min(timeit.repeat(lambda: [extract_plate(t) for t in texts],
+                                number=1, repeat=3)) * 1000
+    batch_ms = min(timeit.repeat(lambda: extract_plates(texts), number=1, repeat=3)) * 1000
+    print(f"\n{args.batch} OCR strings: legacy {legacy_ms:.1f} ms, "
+          f"extract_plate {loop_ms:.1f} ms, extract_plates {batch_ms:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
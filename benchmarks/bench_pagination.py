@@ -0,0 +1,82 @@
+# Compares LIMIT/OFFSET against keyset pagination on GET /damage's query.
+#
+#   python -m benchmarks.bench_pagination --rows 200000 --limit 100
+
+import argparse
+import os
+import tempfile
+import time
+from datetime import date, timedelta
+
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import joinedload, sessionmaker
+
+from database.models import Base, CarData, DamageData
+from database.pagination import encode_cursor, get_next_cursor, paginate_keyset
+
+
+def seed(session, rows):
+    session.execute(insert(CarData), [
+        {"license_plate": f"CAR{i:05d}", "model": "Civic", "color": "Red",
+         "vin_number": f"VIN{i:014d}", "brand": "Honda"}
+        for i in range(1000)
+    ])
+    start = date(2015, 1, 1)
+    batch = []
+    for i in range(rows):
+        batch.append({"license_plate": f"CAR{i % 1000:05d}", "damage_type": "Dent",
+                      "damaged_part": "Bonnet", "date": start + timedelta(days=i % 3000)})
+        if len(batch) == 10000:
+            session.execute(insert(DamageData), batch)
+            batch = []
+    if batch:
+        session.execute(insert(DamageData), batch)
+    session.commit()
+
+
+def timed(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    seed(session, args.rows)
+
+    base_statement = select(DamageData).options(joinedload(DamageData.car))
+    ordered = base_statement.order_by(DamageData.date, DamageData.id)
+
+    def fetch(statement):
+        return session.execute(statement).scalars().all()
+
+    def keyset_page(cursor):
+        rows = fetch(paginate_keyset(base_statement, cursor, args.limit))
+        return rows, get_next_cursor(rows, args.limit)
+    last_page = args.rows // args.limit - 1
+
+    print(f"{'page':>8} {'offset ms':>10} {'keyset ms':>10}")
+    for page in [0, last_page // 100, last_page // 10, last_page // 2, last_page]:
+        offset = page * args.limit
+        cursor = encode_cursor(fetch(ordered.offset(offset - 1).limit(1))[0]) if offset else ""
+        session.expunge_all()
+
+        offset_ms = timed(lambda: fetch(ordered.limit(args.limit).offset(offset)), args.repeat)
+        keyset_ms = timed(lambda: keyset_page(cursor), args.repeat)
+        print(f"{page:>8} {offset_ms:>10.2f} {keyset_ms:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+# Latency and throughput of the plate API client against the offline stub.
+#
+#   python -m benchmarks.bench_plate_client --latency 0.2 --calls 64
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+from services.plate_client import PlateRecognitionClient
+from services.plate_stub import create_stub_app
+
+
+async def run(latency, calls, max_in_flight):
+    client = PlateRecognitionClient(
+        url="http://plate-api/platebber.aspx", max_in_flight=max_in_flight,
+        transport=httpx.ASGITransport(app=create_stub_app(latency=latency)))
+    durations = []
+
+    async def call():
+        started = time.perf_counter()
+        await client.recognise(b"\0" * 200_000)
+        durations.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(call() for _ in range(calls)))
+    elapsed = time.perf_counter() - started
+    await client.aclose()
+
+    durations.sort()
+    return {
+        "p50": statistics.median(durations) * 1000,
+        "p95": durations[int(len(durations) * 0.95) - 1] * 1000,
+        "throughput": calls / elapsed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--calls", type=int, default=64)
+    parser.add_argument("--max-in-flight", type=int, nargs="+", default=[1, 4, 16, 64])
+    args = parser.parse_args()
+
+    print(f"{'in flight':>10} {'p50 ms':>8} {'p95 ms':>8} {'calls/s':>8}")
+    for max_in_flight in args.max_in_flight:
+        stats = asyncio.run(run(args.latency, args.calls, max_in_flight))
+        print(f"{max_in_flight:>10} {stats['p50']:>8.0f} {stats['p95']:>8.0f} "
+              f"{stats['throughput']:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+# Build time, memory and lookup latency of the fuzzy plate index over a
+# generated fleet, queried with OCR-style misreads of real plates.
+#
+#   python -m benchmarks.bench_plate_index --cars 1000000
+
+import argparse
+import gc
+import random
+import resource
+import time
+
+from database.generate import license_plate
+from services.plate_index import CONFUSABLE_GROUPS, PlateIndex
+
+CONFUSIONS = {ch: group for group in CONFUSABLE_GROUPS for ch in group}
+PLATE_SPACE = 26 ** 5 * 10 ** 2
+
+
+def misread(plate: str, rng: random.Random) -> str:
+    # One or two confusable swaps, and half the time a dropped or extra
+    # character on top.
+    chars = list(plate)
+    for position in rng.sample(range(len(chars)), 2):
+        if chars[position] in CONFUSIONS:
+            chars[position] = rng.choice(CONFUSIONS[chars[position]])
+    edit = rng.random()
+    if edit < 0.25:
+        del chars[rng.randrange(len(chars))]
+    elif edit < 0.5:
+        chars.insert(rng.randrange(len(chars) + 1), rng.choice("ACEHKMX"))
+    return "".join(chars)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cars", type=int, default=1000000)
+    parser.add_argument("--queries", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--dense", action="store_true",
+                        help="Index consecutive plates (AA00AAA, AA00AAB, ...), the worst case for lookups")
+    args = parser.parse_args()
+
+    # By default plates are spread over the whole plate space, as a real
+    # fleet's are.
+    rng = random.Random(args.seed)
+    numbers = range(args.cars) if args.dense else rng.sample(range(PLATE_SPACE), args.cars)
+    plates = [license_plate(number) for number in numbers]
+
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    index = PlateIndex()
+    started = time.perf_counter()
+    for plate in plates:
+        index.add(plate)
+    build = time.perf_counter() - started
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    gc.collect()
+    gc.freeze()
+
+    queries = [(plate, misread(plate, rng)) for plate in rng.choices(plates, k=args.queries)]
+
+    durations = []
+    found = 0
+    for plate, query in queries:
+        started = time.perf_counter()
+        candidates = index.search(query)
+        durations.append(time.perf_counter() - started)
+        found += any(candidate == plate for candidate, _ in candidates)
+    durations.sort()
+
+    print(f"{args.cars} plates indexed in {build:.1f}s, ~{(rss_after - rss_before) / 1024:.0f} MB")
+    for label, fraction in [("p50", 0.5), ("p95", 0.95), ("p99", 0.99)]:
+        print(f"{label} lookup: {durations[int(len(durations) * fraction)] * 1e6:.0f} us")
+    print(f"true plate among candidates: {found / len(queries):.1%}")
+
+
+if __name__ == "__main__":
+    main()
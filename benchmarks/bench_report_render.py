@@ -0,0 +1,81 @@
+# Render time and event-loop blocking of the /generate-report PDF step.
+#
+#   python -m benchmarks.bench_report_render --damages 10 100 1000
+
+import argparse
+import asyncio
+import re
+import time
+from datetime import date
+
+from routers.models import CarDataResponse, DamageCreateDataResponse, CarAndDamageResponse
+from services.pdf import create_pdf, get_render_pool, render_pdf, shutdown_render_pool
+
+
+def make_report(damages):
+    return CarAndDamageResponse(
+        car=CarDataResponse(license_plate="ABC123", model="Civic", color="Red",
+                            vin_number="1HGFA16568L000001", brand="Honda"),
+        damages=[DamageCreateDataResponse(damage_type="Dent", damaged_part="Bonnet",
+                                          date=date(2022, 5, 1))] * damages)
+
+
+async def max_loop_lag(work, tick=0.001):
+    # A ticker that should wake every `tick` seconds; the worst delay it
+    # sees is how long the event loop was blocked while `work` ran.
+    lag = 0.0
+    done = False
+
+    async def ticker():
+        nonlocal lag
+        while not done:
+            started = time.perf_counter()
+            await asyncio.sleep(tick)
+            lag = max(lag, time.perf_counter() - started - tick)
+
+    task = asyncio.create_task(ticker())
+    await asyncio.sleep(tick)
+    started = time.perf_counter()
+    await work()
+    elapsed = time.perf_counter() - started
+    done = True
+    await task
+    return elapsed * 1000, lag * 1000
+
+
+async def run(damages_counts, repeat):
+    get_render_pool()
+    await render_pdf(make_report(1))
+
+    print(f"{'damages':>8} {'pages':>6} {'inline ms':>10} {'inline lag ms':>14} "
+          f"{'pool ms':>8} {'pool lag ms':>12}")
+    for damages in damages_counts:
+        report = make_report(damages)
+        pages = len(re.findall(rb"/Type /Page\b", create_pdf(report)))
+
+        async def inline():
+            create_pdf(report)
+
+        async def pooled():
+            await render_pdf(report)
+
+        inline_ms, inline_lag = min(
+            [await max_loop_lag(inline) for _ in range(repeat)])
+        pool_ms, pool_lag = min([await max_loop_lag(pooled) for _ in range(repeat)])
+        print(f"{damages:>8} {pages:>6} {inline_ms:>10.1f} {inline_lag:>14.1f} "
+              f"{pool_ms:>8.1f} {pool_lag:>12.1f}")
+
+    shutdown_render_pool()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--damages", type=int, nargs="+",
+                        default=[10, 100, 1000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    asyncio.run(run(args.damages, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+# Rows per second for GET /cars and /damage bodies: ORM entities + Pydantic
+# models (the previous path) against column projection + direct JSON.
+#
+#   python -m benchmarks.bench_serialization --rows 20000
+
+import argparse
+import json
+import os
+import tempfile
+import time
+from datetime import date, timedelta
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import joinedload, sessionmaker
+
+from database.models import Base, CarData, DamageData
+from routers.damage import DAMAGE_RESPONSE_COLUMNS
+from routers.models import CarDataResponse, DamageDataResponse
+from services.serialize import encode_car_rows, encode_damage_rows
+
+
+def seed(session, rows):
+    session.execute(insert(CarData), [
+        {"license_plate": f"CAR{i:05d}", "model": "Civic", "color": "Red",
+         "vin_number": f"VIN{i:014d}", "brand": "Honda"}
+        for i in range(rows)
+    ])
+    start = date(2015, 1, 1)
+    session.execute(insert(DamageData), [
+        {"license_plate": f"CAR{i:05d}", "damage_type": "Dent",
+         "damaged_part": "Bonnet", "date": start + timedelta(days=i % 3000)}
+        for i in range(rows)
+    ])
+    session.commit()
+
+
+def encode_models(models):
+    return json.dumps(jsonable_encoder(models)).encode("utf-8")
+
+
+def orm_cars(session):
+    cars = session.execute(select(CarData)).scalars().all()
+    return encode_models([CarDataResponse(**car.__dict__) for car in cars])
+
+
+def projected_cars(session):
+    return encode_car_rows(session.execute(select(
+        CarData.license_plate, CarData.model, CarData.color,
+        CarData.vin_number, CarData.brand)).all())
+
+
+def orm_damages(session):
+    damages = session.execute(select(DamageData).options(
+        joinedload(DamageData.car))).scalars().all()
+    return encode_models([DamageDataResponse(
+        license_plate=damage.license_plate,
+        damage_type=damage.damage_type,
+        damaged_part=damage.damaged_part,
+        date=damage.date,
+        car=CarDataResponse(
+            license_plate=damage.car.license_plate,
+            model=damage.car.model,
+            color=damage.car.color,
+            vin_number=damage.car.vin_number,
+            brand=damage.car.brand)
+    ) for damage in damages])
+
+
+def projected_damages(session):
+    return encode_damage_rows(session.execute(
+        select(*DAMAGE_RESPONSE_COLUMNS).join(CarData, DamageData.car)).all())
+
+
+def rows_per_second(session, fn, rows, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        session.expunge_all()
+        started = time.perf_counter()
+        fn(session)
+        best = min(best, time.perf_counter() - started)
+    return rows / best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    seed(session, args.rows)
+
+    assert json.loads(orm_damages(session)) == json.loads(projected_damages(session))
+
+    print(f"{'endpoint':>8} {'orm rows/s':>12} {'projected rows/s':>17} {'speedup':>8}")
+    for name, orm, projected in [("/cars", orm_cars, projected_cars),
+                                 ("/damage", orm_damages, projected_damages)]:
+        orm_rate = rows_per_second(session, orm, args.rows, args.repeat)
+        projected_rate = rows_per_second(session, projected, args.rows, args.repeat)
+        print(f"{name:>8} {orm_rate:>12.0f} {projected_rate:>17.0f} {projected_rate / orm_rate:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+# Cold start of the app in fresh interpreters: process start to `import
+# main`, the lifespan startup, and the first request, plus which heavy
+# modules and resources exist once main is imported.
+#
+#   python -m benchmarks.bench_startup --runs 10
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+CHILD = """
+import json, sys, time
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+state = {
+    "reportlab": "reportlab" in sys.modules,
+    "pyarrow": "pyarrow" in sys.modules,
+    "engines": __import__("database.database").database.Database._initialized,
+}
+from fastapi.testclient import TestClient
+with TestClient(main.app) as client:
+    ready = time.perf_counter()
+    client.get(sys.argv[1])
+    answered = time.perf_counter()
+print(json.dumps({"import": imported - started, "lifespan": ready - imported,
+                  "first_request": answered - ready, **state}))
+"""
+
+
+def run_once(path):
+    started = time.perf_counter()
+    output = subprocess.run([sys.executable, "-c", CHILD, path], capture_output=True, text=True, check=True,
+                            env={**os.environ, "PDF_RENDER_WORKERS": "0"}).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    result["process"] = time.perf_counter() - started
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--path", default="/healthz", help="Path of the first request")
+    args = parser.parse_args()
+
+    runs = [run_once(args.path) for _ in range(args.runs)]
+    print(f"{args.runs} cold starts, first request GET {args.path}\n")
+    print(f"{'stage':<16} {'p50 ms':>8} {'max ms':>8}")
+    for stage in ["import", "lifespan", "first_request", "process"]:
+        values = [run[stage] * 1000 for run in runs]
+        print(f"{stage:<16} {statistics.median(values):>8.1f} {max(values):>8.1f}")
+    print()
+    for name in ["reportlab", "pyarrow", "engines"]:
+        print(f"{name + ' loaded at import':<28} {runs[0][name]}")
+
+
+if __name__ == "__main__":
+    main()
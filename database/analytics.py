@@ -0,0 +1,153 @@
+import argparse
+import asyncio
+from collections import Counter
+
+from sqlalchemy import Date, cast, delete, func, insert, literal_column, select, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+
+from database.archive import damage_archive
+from database.bulk import BULK_BATCH_SIZE
+from database.models import CarData, DamageData, DamageSummary
+
+SUMMARY_DIMENSIONS = ["damage_type", "damaged_part", "brand", "month"]
+
+# Inlined rather than bound: Postgres only matches a SELECT expression to
+# its GROUP BY twin when the two are textually identical, and every bound
+# parameter gets its own placeholder.
+_EMPTY = literal_column("''")
+
+
+def summary_key(damage_type, damaged_part, brand, damage_date):
+    # Summary keys are part of the primary key, so missing values are
+    # stored as "" rather than NULL.
+    return (damage_type or "", damaged_part or "", brand or "", damage_date.replace(day=1))
+
+
+def count_damages(rows, sign: int = 1) -> Counter:
+    # rows are (damage_type, damaged_part, brand, date) tuples; sign -1
+    # turns them into decrements for deleted or overwritten damages.
+    deltas = Counter()
+    for damage_type, damaged_part, brand, damage_date in rows:
+        if damage_date is not None:
+            deltas[summary_key(damage_type, damaged_part, brand, damage_date)] += sign
+    return deltas
+
+
+async def apply_damage_deltas(db_session, deltas: Counter):
+    # Runs in the caller's transaction, so the summary commits or rolls back
+    # together with the damages it describes. The increment happens in the
+    # upsert itself, which keeps concurrent writers from losing updates.
+    rows = [dict(zip(SUMMARY_DIMENSIONS, key), damage_count=delta)
+            for key, delta in deltas.items() if delta]
+    if not rows:
+        return
+
+    dialect_insert = (postgresql.insert
+                      if db_session.get_bind().dialect.name == "postgresql" else sqlite.insert)
+    statement = dialect_insert(DamageSummary)
+    statement = statement.on_conflict_do_update(
+        index_elements=SUMMARY_DIMENSIONS,
+        set_={"damage_count": DamageSummary.damage_count + statement.excluded.damage_count})
+    await db_session.execute(statement, rows)
+
+    # Only keys this write decremented can have dropped to zero. damage_count
+    # has no index, so they are named by primary key rather than found by
+    # scanning the whole summary.
+    decremented = [key for key, delta in deltas.items() if delta < 0]
+    dimensions = tuple_(*(getattr(DamageSummary, name) for name in SUMMARY_DIMENSIONS))
+    for start in range(0, len(decremented), BULK_BATCH_SIZE):
+        await db_session.execute(
+            delete(DamageSummary)
+            .where(dimensions.in_(decremented[start:start + BULK_BATCH_SIZE]))
+            .where(DamageSummary.damage_count <= 0))
+
+
+async def deleted_car_deltas(db_session, license_plates):
+    # Summary decrements and the damage count for deleting these cars,
+    # grouped in SQL: a car with thousands of damages costs a handful of
+    # rows, not thousands of loaded entities.
+    month = _month_start(DamageData.date, db_session.get_bind().dialect.name)
+    dimensions = [DamageData.damage_type, DamageData.damaged_part, CarData.brand, month]
+    result = await db_session.execute(
+        select(*dimensions, func.count())
+        .select_from(DamageData)
+        .join(CarData, DamageData.car)
+        .where(DamageData.license_plate.in_(license_plates))
+        .group_by(*dimensions))
+
+    deltas = Counter()
+    damages = 0
+    for damage_type, damaged_part, brand, damage_month, count in result.all():
+        damages += count
+        if damage_month is not None:
+            deltas[summary_key(damage_type, damaged_part, brand, damage_month)] -= count
+
+    # Archived damages leave the summary with their car too.
+    if damage_archive.months():
+        result = await db_session.execute(
+            select(CarData.license_plate, CarData.brand).where(CarData.license_plate.in_(license_plates)))
+        brands = dict(result.all())
+        counts = await damage_archive.counts(brands)
+        damages += sum(count for *_, count in counts)
+        deltas.update(archived_deltas(counts, brands, sign=-1))
+    return deltas, damages
+
+
+def archived_deltas(counts, brands: dict, sign: int = 1) -> Counter:
+    # counts are DamageArchive.counts rows, brands maps plate to brand.
+    deltas = Counter()
+    for license_plate, damage_type, damaged_part, damage_date, count in counts:
+        deltas[summary_key(damage_type, damaged_part, brands.get(license_plate), damage_date)] += sign * count
+    return deltas
+
+
+def _month_start(column, dialect_name: str):
+    if dialect_name == "postgresql":
+        return cast(func.date_trunc(literal_column("'month'"), column), Date)
+    return func.date(column, literal_column("'start of month'"), type_=Date)
+
+
+async def rebuild_damage_summary(db_session):
+    # Recomputes the whole table from damages in one INSERT ... SELECT, for
+    # backfills and loads that bypass the API (setup.sh, psql \copy).
+    dialect_name = db_session.get_bind().dialect.name
+    dimensions = [
+        func.coalesce(DamageData.damage_type, _EMPTY),
+        func.coalesce(DamageData.damaged_part, _EMPTY),
+        func.coalesce(CarData.brand, _EMPTY),
+        _month_start(DamageData.date, dialect_name)
+    ]
+    grouped = (select(*dimensions, func.count())
+               .select_from(DamageData)
+               .outerjoin(CarData, DamageData.car)
+               .where(DamageData.date.is_not(None))
+               .group_by(*dimensions))
+
+    await db_session.execute(delete(DamageSummary))
+    await db_session.execute(
+        insert(DamageSummary).from_select(SUMMARY_DIMENSIONS + ["damage_count"], grouped))
+    if damage_archive.months():
+        result = await db_session.execute(select(CarData.license_plate, CarData.brand))
+        await apply_damage_deltas(db_session, archived_deltas(await damage_archive.counts(), dict(result.all())))
+    result = await db_session.execute(select(func.count()).select_from(DamageSummary))
+    return result.scalar()
+
+
+async def _rebuild():
+    from database.database import Database
+
+    async with Database().get_async_session() as db_session:
+        groups = await rebuild_damage_summary(db_session)
+        await db_session.commit()
+    print(f"Rebuilt damage_summary: {groups} groups")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("command", choices=["rebuild"])
+    parser.parse_args()
+    asyncio.run(_rebuild())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,374 @@
+import argparse
+import asyncio
+import functools
+import operator
+import os
+import tempfile
+import threading
+from collections import Counter
+from datetime import date
+from typing import NamedTuple, Optional
+
+from sqlalchemy import delete, func, select
+
+from database.bulk import BULK_BATCH_SIZE
+from database.damagefilters import split_values
+from database.models import CarData, DamageData
+from database.versions import bump_versions
+
+# Empty disables the archive; reads then only see the damages table.
+DAMAGE_ARCHIVE_DIR = os.getenv("DAMAGE_ARCHIVE_DIR", "")
+
+ARCHIVE_COLUMNS = ["id", "license_plate", "damage_type", "damaged_part", "date"]
+# Files are sorted by plate, so a plate lookup only reads the row groups
+# whose min/max statistics can hold it.
+ARCHIVE_ROW_GROUP_SIZE = 2048
+
+
+class ArchivedDamageRow(NamedTuple):
+    # Same layout as DAMAGE_RESPONSE_COLUMNS in routers/damage.py.
+    id: int
+    license_plate: str
+    damage_type: Optional[str]
+    damaged_part: Optional[str]
+    date: date
+    model: Optional[str]
+    color: Optional[str]
+    vin_number: Optional[str]
+    brand: Optional[str]
+
+
+def month_start(value: date) -> date:
+    return value.replace(day=1)
+
+
+def next_month(value: date) -> date:
+    return date(value.year + value.month // 12, value.month % 12 + 1, 1)
+
+
+def seek_from(date_from: date = None, after=None):
+    # Where a cursor page starts reading: nothing before the cursor's date
+    # can be on it, so the cursor prunes months just like date_from does.
+    dates = [value for value in (date_from, after[0] if after else None) if value]
+    return max(dates) if dates else None
+
+
+def _schema():
+    import pyarrow as pa
+
+    return pa.schema([("id", pa.int64()), ("license_plate", pa.string()),
+                      ("damage_type", pa.string()), ("damaged_part", pa.string()),
+                      ("date", pa.date32())])
+
+
+def _rows(table):
+    return list(zip(*(table.column(name).to_pylist() for name in ARCHIVE_COLUMNS)))
+
+
+class DamageArchive:
+    # Damages moved out of the damages table, one zstd-compressed Parquet
+    # file per month. The table keeps recent months with their indexes;
+    # readers merge in archived months when a query reaches back that far.
+    # Files are only ever replaced whole, by rename, so readers never see a
+    # partial one. pyarrow is imported on first use.
+
+    def __init__(self, directory: str = DAMAGE_ARCHIVE_DIR):
+        self.directory = directory
+        self._listing = (None, [])
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.directory)
+
+    def path(self, month: date) -> str:
+        return os.path.join(self.directory, f"damages-{month:%Y-%m}.parquet")
+
+    def months(self):
+        # Listed again only when the directory changes, which every rename
+        # into it does.
+        if not self.enabled:
+            return []
+        try:
+            stamp = os.stat(self.directory).st_mtime_ns
+        except FileNotFoundError:
+            return []
+        if self._listing[0] != stamp:
+            months = [date.fromisoformat(f"{entry.name[8:15]}-01") for entry in os.scandir(self.directory)
+                      if entry.name.startswith("damages-") and entry.name.endswith(".parquet")]
+            self._listing = (stamp, sorted(months))
+        return self._listing[1]
+
+    def reaches(self, date_from: date = None) -> bool:
+        months = self.months()
+        return bool(months) and (date_from is None or date_from < next_month(months[-1]))
+
+    def _months_between(self, date_from: date = None, date_to: date = None):
+        return [month for month in self.months()
+                if (date_from is None or month >= month_start(date_from))
+                and (date_to is None or month <= date_to)]
+
+    def _read(self, paths, expression=None):
+        import pyarrow.dataset as ds
+
+        return ds.dataset(paths, format="parquet", schema=_schema()).to_table(
+            columns=ARCHIVE_COLUMNS, filter=expression)
+
+    def _page(self, months, expression, offset: int, limit: int):
+        # Rows in (date, id) order. Months are read one at a time and
+        # skipped whole while the offset lies beyond them.
+        rows = []
+        for month in months:
+            table = self._read(self.path(month), expression)
+            if offset >= table.num_rows:
+                offset -= table.num_rows
+                continue
+            table = table.sort_by([("date", "ascending"), ("id", "ascending")])
+            rows += _rows(table.slice(offset, limit - len(rows)))
+            offset = 0
+            if len(rows) >= limit:
+                break
+        return rows
+
+    def _for_plates(self, license_plates):
+        import pyarrow.dataset as ds
+
+        paths = [self.path(month) for month in self.months()]
+        if not paths:
+            return []
+        table = self._read(paths, ds.field("license_plate").isin(list(license_plates)))
+        return _rows(table.sort_by([("date", "ascending"), ("id", "ascending")]))
+
+    def _counts(self, license_plates=None):
+        # (license_plate, damage_type, damaged_part, date, count), grouped
+        # per file so memory stays at one month.
+        import pyarrow.dataset as ds
+
+        expression = None
+        if license_plates is not None:
+            expression = ds.field("license_plate").isin(list(license_plates))
+        counts = []
+        for month in self.months():
+            table = self._read(self.path(month), expression)
+            grouped = table.group_by(["license_plate", "damage_type", "damaged_part", "date"]).aggregate(
+                [("id", "count")])
+            counts += zip(*(grouped.column(name).to_pylist() for name in
+                            ["license_plate", "damage_type", "damaged_part", "date", "id_count"]))
+        return counts
+
+    def _replace(self, month: date, table):
+        import pyarrow.parquet as pq
+
+        path = self.path(month)
+        if table.num_rows == 0:
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            return
+        table = table.sort_by([("license_plate", "ascending"), ("date", "ascending"), ("id", "ascending")])
+        fd, temporary = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        os.close(fd)
+        try:
+            pq.write_table(table, temporary, compression="zstd", row_group_size=ARCHIVE_ROW_GROUP_SIZE)
+            os.replace(temporary, path)
+        except BaseException:
+            os.unlink(temporary)
+            raise
+
+    def _write_month(self, month: date, rows):
+        # Merged into the month's existing file; rows from the table win
+        # over archived rows with the same id.
+        import pyarrow as pa
+        import pyarrow.compute as pc
+
+        os.makedirs(self.directory, exist_ok=True)
+        table = pa.Table.from_pylist([dict(zip(ARCHIVE_COLUMNS, row)) for row in rows], schema=_schema())
+        with self._lock:
+            if os.path.exists(self.path(month)):
+                existing = self._read(self.path(month))
+                existing = existing.filter(pc.invert(pc.is_in(existing.column("id"), value_set=table.column("id"))))
+                table = pa.concat_tables([existing, table])
+            self._replace(month, table)
+
+    def _remove_plates(self, license_plates) -> int:
+        import pyarrow as pa
+        import pyarrow.compute as pc
+        import pyarrow.dataset as ds
+
+        value_set = pa.array(list(license_plates), type=pa.string())
+        expression = ds.field("license_plate").isin(value_set)
+        removed = 0
+        with self._lock:
+            for month in self.months():
+                # Counted on the plate column first, skipping row groups whose
+                # statistics rule the plates out; only files that hold one of
+                # the plates are rewritten.
+                if not ds.dataset(self.path(month), format="parquet").count_rows(filter=expression):
+                    continue
+                table = self._read(self.path(month))
+                kept = table.filter(pc.invert(pc.is_in(table.column("license_plate"), value_set=value_set)))
+                if kept.num_rows < table.num_rows:
+                    removed += table.num_rows - kept.num_rows
+                    self._replace(month, kept)
+        return removed
+
+    async def page(self, date_from=None, date_to=None, offset: int = 0, limit: int = 100, after=None,
+                   **filters):
+        months = self._months_between(seek_from(date_from, after), date_to)
+        if not months or limit <= 0:
+            return []
+        expression = _expression(date_from=date_from, date_to=date_to, after=after, **filters)
+        return await asyncio.to_thread(self._page, months, expression, offset, limit)
+
+    async def damages_for_plates(self, license_plates):
+        # Archived damages of these cars as DamageData, keyed by plate.
+        license_plates = list(license_plates)
+        if not license_plates or not self.months():
+            return {}
+        damages = {}
+        for row in await asyncio.to_thread(self._for_plates, license_plates):
+            damages.setdefault(row[1], []).append(DamageData(**dict(zip(ARCHIVE_COLUMNS, row))))
+        return damages
+
+    async def counts(self, license_plates=None):
+        if not self.months() or (license_plates is not None and not license_plates):
+            return []
+        return await asyncio.to_thread(self._counts, license_plates)
+
+    async def write_month(self, month: date, rows):
+        await asyncio.to_thread(self._write_month, month, rows)
+
+    async def remove_plates(self, license_plates) -> int:
+        license_plates = list(license_plates)
+        if not license_plates or not self.months():
+            return 0
+        return await asyncio.to_thread(self._remove_plates, license_plates)
+
+
+def _expression(damage_types=None, damaged_parts=None, date_from=None, date_to=None,
+                license_plates=None, after=None):
+    # The archive side of DamageFilters, as a pyarrow filter.
+    import pyarrow.dataset as ds
+
+    conditions = []
+    if damage_types:
+        conditions.append(ds.field("damage_type").isin(damage_types))
+    if damaged_parts:
+        conditions.append(ds.field("damaged_part").isin(damaged_parts))
+    if date_from:
+        conditions.append(ds.field("date") >= date_from)
+    if date_to:
+        conditions.append(ds.field("date") <= date_to)
+    if license_plates is not None:
+        conditions.append(ds.field("license_plate").isin(list(license_plates)))
+    if after:
+        after_date, after_id = after
+        conditions.append((ds.field("date") > after_date)
+                          | ((ds.field("date") == after_date) & (ds.field("id") > after_id)))
+    return functools.reduce(operator.and_, conditions) if conditions else None
+
+
+damage_archive = DamageArchive()
+
+
+async def archived_damage_rows(db_session, damage_type: str = None, damaged_part: str = None,
+                               date_from: date = None, date_to: date = None, brand: str = None,
+                               license_plate: str = None, limit: int = 100, offset: int = 0,
+                               after=None, archive: DamageArchive = None):
+    # Archived damages matching the /damage filters in (date, id) order,
+    # with the car columns of the hot query. Damages whose car is gone
+    # are left out, as the join leaves them out of the hot query.
+    archive = archive or damage_archive
+    license_plates = split_values(license_plate) if license_plate else None
+    if brand:
+        result = await db_session.execute(
+            select(CarData.license_plate).where(CarData.brand.in_(split_values(brand))))
+        brand_plates = result.scalars().all()
+        license_plates = brand_plates if license_plates is None else set(license_plates) & set(brand_plates)
+        if not license_plates:
+            return []
+
+    rows = await archive.page(
+        date_from=date_from, date_to=date_to, offset=offset, limit=limit, after=after,
+        damage_types=split_values(damage_type) if damage_type else None,
+        damaged_parts=split_values(damaged_part) if damaged_part else None,
+        license_plates=license_plates)
+    if not rows:
+        return []
+
+    result = await db_session.execute(
+        select(CarData.license_plate, CarData.model, CarData.color, CarData.vin_number, CarData.brand)
+        .where(CarData.license_plate.in_({row[1] for row in rows})))
+    cars = {car[0]: car[1:] for car in result.all()}
+    return [ArchivedDamageRow(*row, *cars[row[1]]) for row in rows if row[1] in cars]
+
+
+async def archive_damages(db_session, before: date, archive: DamageArchive = None):
+    # Moves every month that ends before `before` out of the damages table,
+    # one month per transaction. The file is in place before the delete
+    # commits, so a crash in between leaves rows in both; running again
+    # merges them. The summary is left alone: it still counts archived
+    # damages.
+    archive = archive or damage_archive
+    cutoff = month_start(before)
+    result = await db_session.execute(select(func.min(DamageData.date)).where(DamageData.date < cutoff))
+    month = result.scalar()
+    archived = Counter()
+
+    month = month_start(month) if month else cutoff
+    while month < cutoff:
+        end = next_month(month)
+        # Locked, so an upsert cannot change a row between the copy and
+        # the delete.
+        result = await db_session.execute(
+            select(*(getattr(DamageData, name) for name in ARCHIVE_COLUMNS))
+            .where(DamageData.date >= month, DamageData.date < end)
+            .with_for_update())
+        rows = result.all()
+        if rows:
+            await archive.write_month(month, rows)
+            ids = [row[0] for row in rows]
+            for start in range(0, len(ids), BULK_BATCH_SIZE):
+                await db_session.execute(
+                    delete(DamageData)
+                    .where(DamageData.id.in_(ids[start:start + BULK_BATCH_SIZE]))
+                    .execution_options(synchronize_session=False))
+            await bump_versions(db_session, "damages")
+            await db_session.commit()
+            archived[month] = len(rows)
+        month = end
+    return archived
+
+
+async def _archive(before: date):
+    from database.database import Database
+
+    if not damage_archive.enabled:
+        raise SystemExit("Set DAMAGE_ARCHIVE_DIR to archive damages")
+    async with Database().get_async_session() as db_session:
+        archived = await archive_damages(db_session, before)
+    for month, count in sorted(archived.items()):
+        print(f"Archived {month:%Y-%m}: {count} damages")
+    print(f"Archived {sum(archived.values())} damages from {len(archived)} months")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--before", type=date.fromisoformat,
+                       help="Archive the months before this date (YYYY-MM-DD)")
+    group.add_argument("--keep-months", type=int,
+                       help="Archive everything but the current and the last N months")
+    args = parser.parse_args()
+
+    before = args.before
+    if before is None:
+        month = month_start(date.today())
+        months = month.year * 12 + month.month - 1 - args.keep_months
+        before = date(months // 12, months % 12 + 1, 1)
+    asyncio.run(_archive(before))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+from sqlalchemy import column, insert, select, table, text
+from sqlalchemy.dialects import postgresql, sqlite
+
+BULK_BATCH_SIZE = 5000
+
+
+def _insert_statement(dialect_name: str, target, columns: list, conflict_key: str = None):
+    if conflict_key is None or dialect_name not in ("postgresql", "sqlite"):
+        return insert(target)
+
+    dialect_insert = postgresql.insert if dialect_name == "postgresql" else sqlite.insert
+    statement = dialect_insert(target)
+    return statement.on_conflict_do_update(
+        index_elements=[conflict_key],
+        set_={name: statement.excluded[name] for name in columns if name != conflict_key})
+
+
+async def _copy_rows(db_session, target, columns: list, rows: list, conflict_key: str = None):
+    # asyncpg speaks the COPY protocol directly. Plain appends go straight
+    # into the table; upserts go through a temp staging table first because
+    # COPY itself cannot resolve conflicts.
+    connection = await db_session.connection()
+    raw_connection = await connection.get_raw_connection()
+    driver_connection = raw_connection.driver_connection
+    records = [tuple(row[name] for name in columns) for row in rows]
+
+    if conflict_key is None:
+        await driver_connection.copy_records_to_table(
+            target.name, records=records, columns=columns)
+        return
+
+    staging_name = f"{target.name}_staging"
+    await db_session.execute(text(
+        f"CREATE TEMPORARY TABLE IF NOT EXISTS {staging_name} "
+        f"(LIKE {target.name} INCLUDING DEFAULTS) ON COMMIT DROP"))
+    await db_session.execute(text(f"TRUNCATE {staging_name}"))
+    await driver_connection.copy_records_to_table(
+        staging_name, records=records, columns=columns)
+
+    staging = table(staging_name, *[column(name) for name in columns])
+    statement = postgresql.insert(target).from_select(columns, select(*staging.c))
+    statement = statement.on_conflict_do_update(
+        index_elements=[conflict_key],
+        set_={name: statement.excluded[name] for name in columns if name != conflict_key})
+    await db_session.execute(statement)
+
+
+async def write_rows(db_session, target, rows: list, conflict_key: str = None):
+    # Rows must all carry the same keys. With a conflict_key, rows that
+    # already exist are updated in place instead of failing the batch.
+    if not rows:
+        return 0
+
+    columns = list(rows[0])
+    dialect_name = db_session.get_bind().dialect.name
+
+    if dialect_name == "postgresql":
+        await _copy_rows(db_session, target, columns, rows, conflict_key)
+    else:
+        # The driver's executemany: one prepared INSERT, run once per row.
+        await db_session.execute(
+            _insert_statement(dialect_name, target, columns, conflict_key), rows)
+
+    return len(rows)
+
+
+async def sync_id_sequence(db_session, target):
+    # Rows loaded with explicit ids leave the serial sequence behind.
+    if db_session.get_bind().dialect.name != "postgresql":
+        return
+
+    await db_session.execute(text(
+        f"SELECT setval(pg_get_serial_sequence('{target.name}', 'id'), "
+        f"(SELECT COALESCE(MAX(id), 1) FROM {target.name}))"))
@@ -1,18 +1,48 @@
+from sqlalchemy import select
+
+from database.models import CarData
+
+
+def split_values(value: str):
+    return [x.strip() for x in value.split(',')]
+
+
 class DamageFilters:
     def get_damage_data_filter(
         table: str,
         damage_type: str = None,
-        damaged_part: str = None
+        damaged_part: str = None,
+        date_from=None,
+        date_to=None,
+        brand: str = None,
+        license_plate: str = None
     ):
 
         filters = []
 
         if damage_type:
-            damage_types = [x.strip() for x in damage_type.split(',')]
+            damage_types = split_values(damage_type)
             filters.append(table.damage_type.in_(damage_types))
 
         if damaged_part:
-            damaged_parts = [x.strip() for x in damaged_part.split(',')]
+            damaged_parts = split_values(damaged_part)
             filters.append(table.damaged_part.in_(damaged_parts))
 
+        if date_from:
+            filters.append(table.date >= date_from)
+
+        if date_to:
+            filters.append(table.date <= date_to)
+
+        if license_plate:
+            license_plates = split_values(license_plate)
+            filters.append(table.license_plate.in_(license_plates))
+
+        if brand:
+            # Resolved to plates through ix_cars_brand, so the damages side
+            # can still use ix_damages_plate_date instead of a join scan.
+            brands = split_values(brand)
+            filters.append(table.license_plate.in_(
+                select(CarData.license_plate).where(CarData.brand.in_(brands))))
+
         return filters
@@ -0,0 +1,216 @@
+# Deterministic synthetic fleet data for benchmarks and staging.
+#
+#   python -m database.generate --cars 1000000 --damages-per-car 10 --csv data/
+#   python -m database.generate --cars 1000000 --damages-per-car 10 --database-url postgresql://...
+#
+# Rows are produced by generators and written in batches, so memory stays
+# flat whatever the fleet size. The same --seed always gives the same data.
+
+import argparse
+import asyncio
+import csv
+import io
+import itertools
+import os
+import random
+import string
+import time
+from datetime import date, timedelta
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from database.analytics import rebuild_damage_summary
+from database.database import get_async_url
+from database.models import Base, CarData, DamageData
+
+GENERATE_BATCH_SIZE = 10000
+
+# Headers of cars.csv / damages.csv, so the output loads the same way.
+CAR_CSV_HEADER = ["car License Plate", "Car Model", "Car Color", "Car VIN Number", "Car Brand"]
+DAMAGE_CSV_HEADER = ["id", "Car License Plate", "Damage Type", "Damaged Part", "Date"]
+
+CAR_COLUMNS = ["license_plate", "model", "color", "vin_number", "brand"]
+DAMAGE_COLUMNS = ["license_plate", "damage_type", "damaged_part", "date"]
+
+# Brand -> (VIN world manufacturer identifier, models)
+BRANDS = {
+    "Toyota": ("JTD", ["Corolla", "Camry", "Yaris", "RAV4"]),
+    "Volkswagen": ("WVW", ["Golf", "Polo", "Passat", "Tiguan"]),
+    "Ford": ("1FA", ["Focus", "Fiesta", "Mondeo", "Kuga"]),
+    "Honda": ("1HG", ["Civic", "Accord", "Jazz", "CR-V"]),
+    "BMW": ("WBA", ["3 Series", "5 Series", "X1", "X3"]),
+    "Hyundai": ("KMH", ["i20", "i30", "Tucson", "Kona"]),
+    "Kia": ("KNA", ["Rio", "Ceed", "Sportage", "Niro"]),
+    "Nissan": ("JN1", ["Micra", "Qashqai", "Juke", "Leaf"]),
+}
+COLORS = ["White", "Black", "Grey", "Silver", "Blue", "Red", "Green"]
+# Listed roughly from most to least common; --skew weights them by rank.
+DAMAGE_TYPES = ["Scratch", "Dent", "Chip", "Crack", "Rust"]
+DAMAGED_PARTS = ["Front Bumper", "Back Door", "Front Door", "Bonnet", "Trunk",
+                 "Rear Bumper", "Roof", "Windscreen", "Left Mirror", "Right Mirror"]
+
+# Mixed radix for plates like "AB12CDE": unique for over a billion cars.
+_PLATE_RADIX = [26, 26, 10, 10, 26, 26, 26]
+_PLATE_SYMBOLS = [string.ascii_uppercase if radix == 26 else string.digits for radix in _PLATE_RADIX]
+
+
+def license_plate(index: int) -> str:
+    symbols = []
+    for radix, alphabet in zip(reversed(_PLATE_RADIX), reversed(_PLATE_SYMBOLS)):
+        index, digit = divmod(index, radix)
+        symbols.append(alphabet[digit])
+    return "".join(reversed(symbols))
+
+
+def rank_weights(count: int, skew: float):
+    # Zipf-like: the k-th value is 1 / k**skew as likely as the first.
+    return list(itertools.accumulate(1 / (rank ** skew) for rank in range(1, count + 1)))
+
+
+class FleetGenerator:
+    def __init__(self, cars: int, damages_per_car: float = 5, skew: float = 1.0,
+                 start_date: date = date(2018, 1, 1), days: int = 365 * 6, seed: int = 0):
+        self.cars = cars
+        self.damages_per_car = damages_per_car
+        self.start_date = start_date
+        self.days = days
+        self.seed = seed
+        self._type_weights = rank_weights(len(DAMAGE_TYPES), skew)
+        self._part_weights = rank_weights(len(DAMAGED_PARTS), skew)
+        self._brands = list(BRANDS)
+        self._brand_weights = rank_weights(len(self._brands), skew / 2)
+
+    def iter_cars(self):
+        rng = random.Random(self.seed)
+        for index in range(self.cars):
+            brand = rng.choices(self._brands, cum_weights=self._brand_weights)[0]
+            wmi, models = BRANDS[brand]
+            yield (license_plate(index), rng.choice(models), rng.choice(COLORS),
+                   f"{wmi}{index:014d}", brand)
+
+    def iter_damages(self):
+        # Each car gets between 0 and 2 * damages_per_car damages, so the
+        # mean is damages_per_car. Cars and damages use separate streams, so
+        # either can be generated alone and still match the other.
+        rng = random.Random(self.seed + 1)
+        most = round(2 * self.damages_per_car)
+        for index in range(self.cars):
+            plate = license_plate(index)
+            for _ in range(rng.randint(0, most)):
+                yield (plate,
+                       rng.choices(DAMAGE_TYPES, cum_weights=self._type_weights)[0],
+                       rng.choices(DAMAGED_PARTS, cum_weights=self._part_weights)[0],
+                       self.start_date + timedelta(days=rng.randrange(self.days)))
+
+
+def iter_batches(rows, size: int = GENERATE_BATCH_SIZE):
+    iterator = iter(rows)
+    while batch := list(itertools.islice(iterator, size)):
+        yield batch
+
+
+def write_csv(generator: FleetGenerator, directory: str):
+    os.makedirs(directory, exist_ok=True)
+    counts = {}
+
+    with open(os.path.join(directory, "cars.csv"), "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(CAR_CSV_HEADER)
+        counts["cars"] = 0
+        for batch in iter_batches(generator.iter_cars()):
+            writer.writerows(batch)
+            counts["cars"] += len(batch)
+
+    with open(os.path.join(directory, "damages.csv"), "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(DAMAGE_CSV_HEADER)
+        damage_id = itertools.count(1)
+        counts["damages"] = 0
+        for batch in iter_batches(generator.iter_damages()):
+            writer.writerows((next(damage_id), *row) for row in batch)
+            counts["damages"] += len(batch)
+
+    return counts
+
+
+def _copy_batch(connection, table: str, columns: list, batch: list):
+    # COPY one batch; psycopg2 reads a CSV buffer, psycopg 3 takes rows.
+    statement = f"COPY {table} ({', '.join(columns)}) FROM STDIN"
+    cursor = connection.connection.cursor()
+    if connection.dialect.driver == "psycopg2":
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(batch)
+        buffer.seek(0)
+        cursor.copy_expert(f"{statement} WITH CSV", buffer)
+    else:
+        with cursor.copy(statement) as copy:
+            for row in batch:
+                copy.write_row(row)
+
+
+def _write_table(connection, target, columns: list, rows):
+    written = 0
+    use_copy = connection.dialect.name == "postgresql" and connection.dialect.driver in ("psycopg2", "psycopg")
+    for batch in iter_batches(rows):
+        if use_copy:
+            _copy_batch(connection, target.name, columns, batch)
+        else:
+            connection.execute(insert(target), [dict(zip(columns, row)) for row in batch])
+        written += len(batch)
+    return written
+
+
+def write_database(generator: FleetGenerator, url: str, reset: bool = False):
+    engine = create_engine(url)
+    if reset:
+        Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+
+    with engine.begin() as connection:
+        counts = {
+            "cars": _write_table(connection, CarData.__table__, CAR_COLUMNS, generator.iter_cars()),
+            "damages": _write_table(connection, DamageData.__table__, DAMAGE_COLUMNS, generator.iter_damages()),
+        }
+    engine.dispose()
+
+    asyncio.run(_rebuild_summary(url))
+    return counts
+
+
+async def _rebuild_summary(url: str):
+    async_engine = create_async_engine(get_async_url(url))
+    async with async_sessionmaker(bind=async_engine)() as db_session:
+        await rebuild_damage_summary(db_session)
+        await db_session.commit()
+    await async_engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cars", type=int, default=10000)
+    parser.add_argument("--damages-per-car", type=float, default=5)
+    parser.add_argument("--skew", type=float, default=1.0,
+                        help="0 spreads damage types and parts evenly, higher values favour the first ones")
+    parser.add_argument("--start-date", type=date.fromisoformat, default=date(2018, 1, 1))
+    parser.add_argument("--days", type=int, default=365 * 6, help="Spread of damage dates")
+    parser.add_argument("--seed", type=int, default=0)
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--csv", metavar="DIRECTORY", help="Write cars.csv and damages.csv here")
+    target.add_argument("--database-url", help="Insert straight into this database")
+    parser.add_argument("--reset", action="store_true", help="Drop and recreate the tables first")
+    args = parser.parse_args()
+
+    generator = FleetGenerator(args.cars, args.damages_per_car, args.skew,
+                               args.start_date, args.days, args.seed)
+    started = time.perf_counter()
+    if args.csv:
+        counts = write_csv(generator, args.csv)
+    else:
+        counts = write_database(generator, args.database_url, args.reset)
+    print(f"Generated {counts['cars']} cars and {counts['damages']} damages "
+          f"in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Date, ForeignKey, Integer
+from sqlalchemy import Column, String, Date, ForeignKey, Integer, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 
@@ -13,19 +13,52 @@ class CarData(Base):
     color = Column(String)
     vin_number = Column(String, unique=True, index=True)
     brand = Column(String, index=True)
+    # Changes whenever the car's report would; see stamp_report_versions.
+    report_version = Column(Integer, nullable=False, default=0, server_default="0")
 
     # damages = relationship("DamageData", back_populates="car")
+    # The database deletes a car's damages (ON DELETE CASCADE); with
+    # passive_deletes the ORM no longer loads them just to delete them.
     damages = relationship(
-        "DamageData", back_populates="car", cascade="all, delete-orphan")
+        "DamageData", back_populates="car", cascade="all, delete-orphan", passive_deletes=True)
 
 
 class DamageData(Base):
     __tablename__ = "damages"
 
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
-    license_plate = Column(String, ForeignKey("cars.license_plate"))
-    damage_type = Column(String, index=True)
+    license_plate = Column(String, ForeignKey("cars.license_plate", ondelete="CASCADE"))
+    damage_type = Column(String)
     damaged_part = Column(String, index=True)
     date = Column(Date)
 
     car = relationship("CarData", back_populates="damages")
+
+    # ix_damages_type_part_date serves "dents on bonnets since <date>" and,
+    # through its leading column, damage_type on its own.
+    __table_args__ = (
+        Index("ix_damages_date_id", "date", "id"),
+        Index("ix_damages_type_part_date", "damage_type", "damaged_part", "date"),
+        Index("ix_damages_plate_date", "license_plate", "date"),
+    )
+
+
+class DamageSummary(Base):
+    # Damage counts per (damage_type, damaged_part, brand, month), kept up
+    # to date by the admin writes so analytics never scan the damages table.
+    __tablename__ = "damage_summary"
+
+    damage_type = Column(String, primary_key=True)
+    damaged_part = Column(String, primary_key=True)
+    brand = Column(String, primary_key=True)
+    month = Column(Date, primary_key=True)
+    damage_count = Column(Integer, nullable=False, default=0)
+
+
+class TableVersion(Base):
+    # Change counter per table, bumped by every admin write in the same
+    # transaction. List endpoints derive their ETags from it.
+    __tablename__ = "table_versions"
+
+    table_name = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
@@ -0,0 +1,45 @@
+import base64
+import json
+from datetime import date
+
+from sqlalchemy import tuple_
+
+from database.models import DamageData
+
+
+class InvalidCursorError(ValueError):
+    pass
+
+
+def encode_cursor(damage: DamageData) -> str:
+    payload = json.dumps([damage.date.isoformat(), damage.id]).encode('utf-8')
+    return base64.urlsafe_b64encode(payload).decode('utf-8').rstrip('=')
+
+
+def decode_cursor(cursor: str):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        damage_date, damage_id = json.loads(base64.urlsafe_b64decode(padded))
+        return date.fromisoformat(damage_date), int(damage_id)
+    except (ValueError, TypeError) as e:
+        raise InvalidCursorError(f"Invalid cursor: {cursor}") from e
+
+
+def paginate_keyset(statement, cursor: str, limit: int):
+    # Seeks past the last row of the previous page on the (date, id) index
+    # instead of skipping rows, so every page costs the same. Damages
+    # without a date have no place in that order (and could not be encoded
+    # into a cursor), so cursor pages leave them out; offset pages list them.
+    statement = statement.where(DamageData.date.is_not(None))
+    if cursor:
+        after = decode_cursor(cursor)
+        statement = statement.where(
+            tuple_(DamageData.date, DamageData.id) > tuple_(*after))
+
+    return (statement
+            .order_by(DamageData.date, DamageData.id)
+            .limit(limit))
+
+
+def get_next_cursor(rows, limit: int):
+    return encode_cursor(rows[-1]) if rows and len(rows) == limit else None
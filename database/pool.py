@@ -0,0 +1,48 @@
+import time
+
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from services.metrics import db_pool_wait
+
+
+class PoolStatsMixin:
+    # Counts checkouts and how long callers waited for a connection, on top
+    # of the occupancy numbers QueuePool already tracks.
+    metrics_label = None
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+
+    def connect(self):
+        started = time.perf_counter()
+        connection = super().connect()
+        waited = time.perf_counter() - started
+
+        self.checkouts += 1
+        self.wait_time_total += waited
+        self.wait_time_max = max(self.wait_time_max, waited)
+        db_pool_wait.observe(waited, self.metrics_label)
+        return connection
+
+    def stats(self):
+        return {
+            "pool_size": self.size(),
+            "checked_in": self.checkedin(),
+            "checked_out": self.checkedout(),
+            "overflow": max(self.overflow(), 0),
+            "checkouts": self.checkouts,
+            "wait_time_total": self.wait_time_total,
+            "wait_time_max": self.wait_time_max,
+            "wait_time_avg": self.wait_time_total / self.checkouts if self.checkouts else 0.0,
+        }
+
+
+class InstrumentedQueuePool(PoolStatsMixin, QueuePool):
+    metrics_label = "sync"
+
+
+class InstrumentedAsyncQueuePool(PoolStatsMixin, AsyncAdaptedQueuePool):
+    metrics_label = "async"
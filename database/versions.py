@@ -0,0 +1,42 @@
+from sqlalchemy import select, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+from database.models import CarData, TableVersion
+
+
+async def bump_versions(db_session, *table_names: str):
+    # Runs in the caller's transaction; the increment happens in the upsert
+    # so concurrent writers never hand out the same version twice.
+    dialect_insert = (postgresql.insert
+                      if db_session.get_bind().dialect.name == "postgresql" else sqlite.insert)
+    statement = dialect_insert(TableVersion)
+    statement = statement.on_conflict_do_update(
+        index_elements=["table_name"],
+        set_={"version": TableVersion.version + 1})
+    await db_session.execute(statement, [{"table_name": name, "version": 1} for name in table_names])
+
+
+async def get_versions(db_session, *table_names: str):
+    result = await db_session.execute(
+        select(TableVersion.table_name, TableVersion.version)
+        .where(TableVersion.table_name.in_(table_names)))
+    versions = dict(result.all())
+    return [versions.get(name, 0) for name in table_names]
+
+
+async def stamp_report_versions(db_session, license_plates):
+    # Gives these cars a new report_version, which is what cached report
+    # PDFs are keyed on. Stamps come from one shared counter rather than a
+    # per-car one, so a plate that is deleted and registered again can never
+    # get back a version an old report was cached under.
+    license_plates = list(license_plates)
+    if not license_plates:
+        return
+    await bump_versions(db_session, "reports")
+    await db_session.execute(
+        update(CarData)
+        .where(CarData.license_plate.in_(license_plates))
+        .values(report_version=select(TableVersion.version)
+                .where(TableVersion.table_name == "reports")
+                .scalar_subquery())
+        .execution_options(synchronize_session=False))
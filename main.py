@@ -1,8 +1,50 @@
+from dotenv import load_dotenv
+
+# Before any module reads its settings from the environment.
+load_dotenv()
+
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
-from routers import car, damage, report
+from routers import car, damage, report, pool, cache, image, analytics, metrics, health
+from database.database import close_database
+from services.image import UploadLimitMiddleware
+from services.metrics import METRICS_ENABLED, MetricsMiddleware
+from services.pdf import shutdown_render_pool
+from services.plate_cache import plate_cache
+from services.plate_client import close_plate_client
+from services.report_jobs import report_jobs
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Nothing is opened at startup: database engines, the plate API client,
+    # the plate cache file, the PDF render pool and the report job workers
+    # are created on first use, in the process that uses them, so workers
+    # can be forked from a preloaded app. Shutdown releases whatever was
+    # created.
+    yield
+    await report_jobs.shutdown()
+    await close_plate_client()
+    await asyncio.to_thread(plate_cache.close)
+    await asyncio.to_thread(shutdown_render_pool)
+    await close_database()
+
+
+app = FastAPI(lifespan=lifespan)
+
+app.add_middleware(UploadLimitMiddleware, limits=report.UPLOAD_REQUEST_LIMITS)
 
-app = FastAPI()
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
 
 app.include_router(car.router)
 app.include_router(damage.router)
 app.include_router(report.router)
+app.include_router(pool.router)
+app.include_router(cache.router)
+app.include_router(image.router)
+app.include_router(analytics.router)
+app.include_router(metrics.router)
+app.include_router(health.router)
@@ -0,0 +1,76 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import List, Optional
+from datetime import date
+from sqlalchemy import func, select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+import logging
+
+from database.analytics import rebuild_damage_summary
+from database.database import get_db_session
+from database.models import DamageSummary
+from routers.models import AnalyticsDimension, DamageAnalyticsResponse
+
+router = APIRouter()
+
+tags_metadata = [
+    {"name": "Admin operations", "description": "Admin operations Endpoint"},
+    {"name": "Analytics", "description": "Aggregated damage counts"}
+]
+
+
+@router.get("/analytics/damage", response_model=List[DamageAnalyticsResponse], tags=["Analytics"])
+async def read_damage_analytics(
+    group_by: List[AnalyticsDimension] = Query(
+        list(AnalyticsDimension), description="Dimensions to group the counts by"),
+    damage_type: Optional[str] = Query(None, description="Car's Damage Type"),
+    damaged_part: Optional[str] = Query(
+        None, description="Car's Damaged part"),
+    brand: Optional[str] = Query(None, description="Car's Brand"),
+    month_from: Optional[date] = Query(
+        None, description="First month to include (any day in that month)"),
+    month_to: Optional[date] = Query(
+        None, description="Last month to include (any day in that month)"),
+    db_session: AsyncSession = Depends(get_db_session)
+):
+    try:
+        # Reads only the summary table, so the cost grows with the number
+        # of groups rather than the number of damages.
+        dimensions = [getattr(DamageSummary, dimension.value)
+                      for dimension in dict.fromkeys(group_by)]
+        filters = []
+        if damage_type:
+            filters.append(DamageSummary.damage_type == damage_type)
+        if damaged_part:
+            filters.append(DamageSummary.damaged_part == damaged_part)
+        if brand:
+            filters.append(DamageSummary.brand == brand)
+        if month_from:
+            filters.append(DamageSummary.month >= month_from.replace(day=1))
+        if month_to:
+            filters.append(DamageSummary.month <= month_to.replace(day=1))
+
+        result = await db_session.execute(
+            select(*dimensions, func.sum(DamageSummary.damage_count).label("count"))
+            .where(*filters)
+            .group_by(*dimensions)
+            .order_by(*dimensions))
+
+        return [DamageAnalyticsResponse(**row._mapping) for row in result.all()]
+
+    except SQLAlchemyError as e:
+        logging.error(f"Database error: {e}")
+        raise HTTPException(status_code=500, detail="Internal Server Error")
+
+
+@router.post("/admin/analytics/rebuild", response_model=dict, tags=["Admin operations"])
+async def rebuild_damage_analytics(db_session: AsyncSession = Depends(get_db_session)):
+    try:
+        groups = await rebuild_damage_summary(db_session)
+        await db_session.commit()
+        return {"detail": "Damage summary rebuilt", "groups": groups}
+
+    except SQLAlchemyError as e:
+        logging.error(f"Database error: {e}")
+        await db_session.rollback()
+        raise HTTPException(status_code=500, detail="Internal Server Error")
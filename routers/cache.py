@@ -0,0 +1,46 @@
+import asyncio
+
+from fastapi import APIRouter
+
+from services.cache import result_cache
+from services.plate_cache import plate_cache
+from services.report_cache import report_cache
+
+router = APIRouter()
+
+tags_metadata = [
+    {"name": "Admin operations", "description": "Admin operations Endpoint"}
+]
+
+
+@router.get("/admin/cache", response_model=dict, tags=["Admin operations"])
+async def read_cache_stats():
+    return result_cache.stats()
+
+
+@router.delete("/admin/cache", response_model=dict, tags=["Admin operations"])
+async def clear_cache():
+    await result_cache.clear()
+    return {"detail": "Result cache cleared"}
+
+
+@router.get("/admin/cache/plates", response_model=dict, tags=["Admin operations"])
+async def read_plate_cache_stats():
+    return plate_cache.stats()
+
+
+@router.delete("/admin/cache/plates", response_model=dict, tags=["Admin operations"])
+async def clear_plate_cache():
+    plate_cache.clear()
+    return {"detail": "Plate cache cleared"}
+
+
+@router.get("/admin/cache/reports", response_model=dict, tags=["Admin operations"])
+async def read_report_cache_stats():
+    return report_cache.stats()
+
+
+@router.delete("/admin/cache/reports", response_model=dict, tags=["Admin operations"])
+async def clear_report_cache():
+    await asyncio.to_thread(report_cache.clear)
+    return {"detail": "Report cache cleared"}
@@ -1,15 +1,32 @@
-from fastapi import APIRouter, Query, HTTPException
-from typing import List
+from fastapi import APIRouter, Depends, Header, Query, HTTPException, Request, Response
+from typing import List, Optional
+from datetime import date
+from sqlalchemy import delete, select
 from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
 import logging
+from collections import Counter
 
-from database.database import Database
-from database.models import CarData
-from routers.models import CarDataResponse, CarDataRequest
+from database.analytics import apply_damage_deltas, archived_deltas, count_damages, deleted_car_deltas
+from database.archive import damage_archive
+from database.bulk import write_rows
+from database.database import get_db_session
+from database.models import CarData, DamageData
+from database.versions import bump_versions, get_versions, stamp_report_versions
+from database.damagefilters import DamageFilters
+from routers.models import (CarDataResponse, CarDataRequest, ExportFormat, BulkLoadResponse, BulkRowError,
+                            CarDeleteRequest, CarDeleteResponse, PlateCandidateResponse)
+from routers.conditional import etag_matches, make_etag, not_modified
+from routers.ingest import bulk_openapi_extra, iter_batches, read_bulk_rows, validate_rows
+from routers.streaming import export_response
+from services.cache import result_cache
+from services.plate_index import plate_index
+from services.report_cache import report_cache
+from services.serialize import encode_car_rows
 
 router = APIRouter()
 
-db_session = Database().get_session()
+CAR_CSV_COLUMNS = ["license_plate", "model", "color", "vin_number", "brand"]
 
 tags_metadata = [
     {"name": "Admin operations", "description": "Admin operations Endpoint"},
@@ -18,10 +35,35 @@ tags_metadata = [
 
 
 @router.get("/cars", response_model=list[CarDataResponse], tags=["Car & Damage Data"])
-def read_car_data():
+async def read_car_data(
+    if_none_match: Optional[str] = Header(
+        None, description="ETag of a previous response; answered with 304 if nothing changed since"),
+    db_session: AsyncSession = Depends(get_db_session)
+):
     try:
-        car_data = db_session.query(CarData).all()
-        return [CarDataResponse(**car.__dict__) for car in car_data]
+        # Read before the data, so a concurrent write can only make the
+        # ETag older than the body, never newer.
+        etag = make_etag("cars", await get_versions(db_session, "cars"))
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+
+        # Keyed on the ETag too, so a worker that missed an invalidation
+        # cannot serve an older body under a newer ETag.
+        cache_params = {"etag": etag}
+        headers = {"ETag": etag}
+        cached = await result_cache.get("cars", cache_params)
+        if cached is not None:
+            return Response(content=cached, media_type="application/json", headers=headers)
+
+        result = await db_session.execute(select(
+            CarData.license_plate,
+            CarData.model,
+            CarData.color,
+            CarData.vin_number,
+            CarData.brand))
+        body = encode_car_rows(result.all())
+        await result_cache.set("cars", cache_params, body)
+        return Response(content=body, media_type="application/json", headers=headers)
 
     except SQLAlchemyError as e:
         logging.error(f"Database error: {e}")
@@ -32,46 +74,262 @@ def read_car_data():
         raise HTTPException(status_code=500, detail="Internal Server Error")
 
 
+@router.get("/cars/export", tags=["Car & Damage Data"])
+async def export_car_data(
+    format: ExportFormat = Query(
+        ExportFormat.ndjson, description="Export format"),
+    damage_type: Optional[str] = Query(
+        None, description="Only cars with this Damage Type"),
+    damaged_part: Optional[str] = Query(
+        None, description="Only cars with this Damaged part"),
+    date_from: Optional[date] = Query(
+        None, description="Only cars with damages on or after this date"),
+    date_to: Optional[date] = Query(
+        None, description="Only cars with damages on or before this date"),
+    db_session: AsyncSession = Depends(get_db_session)
+):
+    try:
+        statement = select(
+            CarData.license_plate,
+            CarData.model,
+            CarData.color,
+            CarData.vin_number,
+            CarData.brand
+        ).order_by(CarData.license_plate)
+
+        filters = DamageFilters.get_damage_data_filter(
+            DamageData,
+            damage_type,
+            damaged_part,
+            date_from,
+            date_to
+        )
+        if filters:
+            statement = statement.where(CarData.damages.any(*filters))
+
+        return await export_response(db_session, statement, format, "cars")
+
+    except SQLAlchemyError as e:
+        logging.error(f"Database error: {e}")
+        raise HTTPException(status_code=500, detail="Internal Server Error")
+
+
+@router.get("/cars/lookup", response_model=list[PlateCandidateResponse], tags=["Car & Damage Data"])
+async def lookup_car_plate(
+    plate: str = Query(..., description="Plate as read, e.g. by OCR; confusable characters are matched"),
+    limit: int = Query(5, ge=1, le=50),
+    db_session: AsyncSession = Depends(get_db_session)
+):
+    try:
+        await plate_index.sync(db_session)
+        return [PlateCandidateResponse(license_plate=license_plate, cost=cost)
+                for license_plate, cost in plate_index.search(plate, limit)]
+
+    except SQLAlchemyError as e:
+        logging.error(f"Database error: {e}")
+        raise HTTPException(status_code=500, detail="Internal Server Error")
+
+
 @router.delete("/admin/cars/{license_plate}", response_model=dict, tags=["Admin operations"])
-def delete_car_data(license_plate: str):
+async def delete_car_data(license_plate: str, db_session: AsyncSession = Depends(get_db_session)):
     try:
-        car_to_delete = db_session.query(CarData).filter(
-            CarData.license_plate == license_plate).first()
+        # Locked first, so no damage can be added to the car between
+        # counting its damages and deleting them.
+        result = await db_session.execute(
+            select(CarData)
+            .filter(CarData.license_plate == license_plate)
+            .with_for_update())
+        car_to_delete = result.scalars().first()
 
         if not car_to_delete:
             raise HTTPException(status_code=404, detail="Car not found")
 
-        db_session.delete(car_to_delete)
-        db_session.commit()
+        # ON DELETE CASCADE removes the damages in the database; the summary
+        # decrements come from one grouped query instead of loading them.
+        deltas, _ = await deleted_car_deltas(db_session, [license_plate])
+        await db_session.delete(car_to_delete)
+        await apply_damage_deltas(db_session, deltas)
+        await bump_versions(db_session, "cars", "damages")
+        await db_session.commit()
+        await result_cache.invalidate("cars", "damage")
+        await report_cache.discard(license_plate)
+        await remove_archived_damages([license_plate])
+        plate_index.remove(license_plate)
+        await plate_index.advance(db_session)
 
         return {"detail": "Car and related damages deleted successfully"}
 
     except SQLAlchemyError as e:
         logging.error(f"Database error: {e}")
-        db_session.rollback()
+        await db_session.rollback()
         raise HTTPException(status_code=500, detail="Internal Server Error")
 
     except Exception as e:
         logging.error(f"Unexpected error: {e}")
-        db_session.rollback()
+        await db_session.rollback()
+        raise HTTPException(status_code=500, detail="Internal Server Error")
+
+
+async def remove_archived_damages(license_plates):
+    # Runs after the commit, so archived damages only go once their car
+    # has. Damages a failed rewrite leaves behind stay hidden from reads
+    # for as long as the plate is not registered again.
+    try:
+        await damage_archive.remove_plates(license_plates)
+    except OSError as e:
+        logging.error(f"Archived damages could not be removed for {len(license_plates)} cars: {e}")
+
+
+@router.post("/admin/cars/delete", response_model=CarDeleteResponse, tags=["Admin operations"])
+async def bulk_delete_car_data(delete_request: CarDeleteRequest, db_session: AsyncSession = Depends(get_db_session)):
+    license_plates = list(dict.fromkeys(delete_request.license_plates))
+    response = CarDeleteResponse(requested=len(license_plates))
+    deleted_plates = []
+
+    try:
+        # One DELETE per batch of plates; the database cascades to damages.
+        for batch in iter_batches(license_plates):
+            result = await db_session.execute(
+                select(CarData.license_plate)
+                .filter(CarData.license_plate.in_(batch))
+                .with_for_update())
+            found = set(result.scalars().all())
+            response.not_found += [license_plate for license_plate in batch if license_plate not in found]
+
+            deltas, damages = await deleted_car_deltas(db_session, batch)
+            result = await db_session.execute(
+                delete(CarData)
+                .filter(CarData.license_plate.in_(batch))
+                .execution_options(synchronize_session=False))
+            await apply_damage_deltas(db_session, deltas)
+            response.cars_deleted += result.rowcount
+            response.damages_deleted += damages
+            deleted_plates += found
+
+        if deleted_plates:
+            await bump_versions(db_session, "cars", "damages")
+        await db_session.commit()
+        if deleted_plates:
+            await result_cache.invalidate("cars", "damage")
+            for license_plate in deleted_plates:
+                await report_cache.discard(license_plate)
+                plate_index.remove(license_plate)
+            await remove_archived_damages(deleted_plates)
+            await plate_index.advance(db_session)
+        return response
+
+    except SQLAlchemyError as e:
+        logging.error(f"Database error: {e}")
+        await db_session.rollback()
         raise HTTPException(status_code=500, detail="Internal Server Error")
 
 
 @router.post("/admin/cars", response_model=CarDataResponse, tags=["Admin operations"])
-def create_car_data(car_data_request: CarDataRequest):
+async def create_car_data(car_data_request: CarDataRequest, db_session: AsyncSession = Depends(get_db_session)):
     try:
         new_car = CarData(**car_data_request.dict())
         db_session.add(new_car)
-        db_session.commit()
-        db_session.refresh(new_car)
+        await stamp_report_versions(db_session, [new_car.license_plate])
+        await bump_versions(db_session, "cars")
+        await db_session.commit()
+        await result_cache.invalidate("cars", "damage")
+        plate_index.add(new_car.license_plate)
+        await plate_index.advance(db_session)
+        await db_session.refresh(new_car)
         return CarDataResponse(**new_car.__dict__)
 
     except SQLAlchemyError as e:
         logging.error(f"Database error: {e}")
-        db_session.rollback()
+        await db_session.rollback()
         raise HTTPException(status_code=500, detail="Internal Server Error")
 
     except Exception as e:
         logging.error(f"Unexpected error: {e}")
-        db_session.rollback()
+        await db_session.rollback()
         raise HTTPException(status_code=500, detail="Internal Server Error")
+
+
+@router.post("/admin/cars/bulk", response_model=BulkLoadResponse, tags=["Admin operations"],
+             openapi_extra=bulk_openapi_extra(CarDataRequest))
+async def bulk_create_car_data(request: Request, db_session: AsyncSession = Depends(get_db_session)):
+    rows = await read_bulk_rows(request, CAR_CSV_COLUMNS)
+    response = BulkLoadResponse()
+    seen_plates = set()
+    vin_owners = {}
+
+    try:
+        for batch in iter_batches(rows):
+            response.received += len(batch)
+            valid, errors = validate_rows(batch, CarDataRequest)
+            response.errors += errors
+
+            result = await db_session.execute(
+                select(CarData.vin_number, CarData.license_plate)
+                .filter(CarData.vin_number.in_([row["vin_number"] for _, row in valid])))
+            vin_owners.update(result.all())
+
+            result = await db_session.execute(
+                select(CarData.license_plate, CarData.brand)
+                .filter(CarData.license_plate.in_([row["license_plate"] for _, row in valid])))
+            old_brands = dict(result.all())
+
+            cars = []
+            for row_number, row in valid:
+                license_plate = row["license_plate"]
+                if license_plate in seen_plates:
+                    response.errors.append(BulkRowError(
+                        row=row_number, detail="license_plate: Duplicate entry in upload"))
+                    continue
+
+                owner = vin_owners.setdefault(row["vin_number"], license_plate)
+                if owner != license_plate:
+                    response.errors.append(BulkRowError(
+                        row=row_number, detail=f"vin_number: Already registered to {owner}"))
+                    continue
+
+                seen_plates.add(license_plate)
+                cars.append(row)
+
+            response.written += await write_rows(
+                db_session, CarData.__table__, cars, conflict_key="license_plate")
+            await apply_damage_deltas(db_session, await rebrand_deltas(db_session, old_brands, cars))
+            await stamp_report_versions(db_session, [car["license_plate"] for car in cars])
+
+        await bump_versions(db_session, "cars")
+        await db_session.commit()
+        await result_cache.invalidate("cars", "damage")
+        for license_plate in seen_plates:
+            plate_index.add(license_plate)
+        await plate_index.advance(db_session)
+        response.errors.sort(key=lambda error: error.row)
+        return response
+
+    except SQLAlchemyError as e:
+        logging.error(f"Database error: {e}")
+        await db_session.rollback()
+        raise HTTPException(status_code=500, detail="Internal Server Error")
+
+
+async def rebrand_deltas(db_session, old_brands: dict, cars: list):
+    # Updating a car's brand moves all of its damages to other summary groups.
+    new_brands = {car["license_plate"]: car["brand"] for car in cars
+                  if car["license_plate"] in old_brands and car["brand"] != old_brands[car["license_plate"]]}
+    if not new_brands:
+        return Counter()
+
+    result = await db_session.execute(
+        select(DamageData.license_plate, DamageData.damage_type, DamageData.damaged_part, DamageData.date)
+        .filter(DamageData.license_plate.in_(list(new_brands))))
+    damages = result.all()
+    deltas = count_damages(
+        ((damage_type, damaged_part, old_brands[plate], damage_date)
+         for plate, damage_type, damaged_part, damage_date in damages), sign=-1)
+    deltas.update(count_damages(
+        (damage_type, damaged_part, new_brands[plate], damage_date)
+        for plate, damage_type, damaged_part, damage_date in damages))
+
+    # Archived damages are still counted in the summary, so they move too.
+    counts = await damage_archive.counts(new_brands)
+    deltas.update(archived_deltas(counts, old_brands, sign=-1))
+    deltas.update(archived_deltas(counts, new_brands))
+    return deltas
@@ -0,0 +1,22 @@
+from typing import Optional
+
+from fastapi import Response
+
+
+def make_etag(name: str, versions) -> str:
+    # Weak: the body is the same data, not necessarily the same bytes.
+    return f'W/"{name}-{".".join(str(version) for version in versions)}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == opaque
+               for candidate in if_none_match.split(","))
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag})
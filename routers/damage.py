@@ -1,17 +1,38 @@
-from fastapi import APIRouter, HTTPException, Query, Path
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Path, Request, Response
 from typing import List, Optional
+from datetime import date
+from sqlalchemy import func, select
 from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import joinedload
 import logging
 
-from database.database import Database
-from database.models import DamageData
-from routers.models import CarDataResponse, DamageDataResponse, DamageDataRequest, DamageCreateDataResponse
+from database.analytics import apply_damage_deltas, count_damages
+from database.archive import archive_damages, archived_damage_rows, damage_archive, seek_from
+from database.bulk import sync_id_sequence, write_rows
+from database.database import get_db_session
+from database.models import CarData, DamageData
+from database.versions import bump_versions, get_versions, stamp_report_versions
+from routers.models import DamageDataResponse, DamageDataRequest, DamageCreateDataResponse, ExportFormat
+from routers.models import DamageBulkRequest, BulkLoadResponse, BulkRowError
+from routers.models import DamageArchiveResponse, ArchivedMonthResponse
+from routers.conditional import etag_matches, make_etag, not_modified
+from routers.ingest import bulk_openapi_extra, iter_batches, read_bulk_rows, validate_rows
+from routers.streaming import export_response
+from services.cache import result_cache
+from services.serialize import encode_damage_rows
 from database.damagefilters import DamageFilters
+from database.pagination import InvalidCursorError, decode_cursor, get_next_cursor, paginate_keyset
 
 router = APIRouter()
 
-db_session = Database().get_session()
+DAMAGE_CSV_COLUMNS = ["id", "license_plate",
+                      "damage_type", "damaged_part", "date"]
+
+# Row layout expected by encode_damage_rows; id and date also feed the cursor.
+DAMAGE_RESPONSE_COLUMNS = [DamageData.id, DamageData.license_plate, DamageData.damage_type,
+                           DamageData.damaged_part, DamageData.date, CarData.model,
+                           CarData.color, CarData.vin_number, CarData.brand]
 
 tags_metadata = [
     {"name": "Admin operations", "description": "Admin operations Endpoint"},
@@ -20,45 +41,109 @@ tags_metadata = [
 
 
 @router.get("/damage", response_model=list[DamageDataResponse], tags=["Car & Damage Data"])
-def read_damage_data(
+async def read_damage_data(
     damage_type: Optional[str] = Query(None, description="Car's Damage Type"),
     damaged_part: Optional[str] = Query(
         None, description="Car's Damaged part"),
-    limit: int = Query(100, description="Limit the number of results"),
-    offset: int = Query(0, description="Offset for pagination")
+    date_from: Optional[date] = Query(
+        None, description="Only damages on or after this date"),
+    date_to: Optional[date] = Query(
+        None, description="Only damages on or before this date"),
+    brand: Optional[str] = Query(None, description="Car's Brand"),
+    license_plate: Optional[str] = Query(
+        None, description="Car's License Plate"),
+    limit: int = Query(100, ge=1, description="Limit the number of results"),
+    offset: int = Query(0, ge=0, description="Offset for pagination"),
+    cursor: Optional[str] = Query(
+        None, description="Keyset pagination cursor ordered by (date, id). Pass an empty value for the first page, then the X-Next-Cursor header of the previous response"),
+    if_none_match: Optional[str] = Header(
+        None, description="ETag of a previous response; answered with 304 if nothing changed since"),
+    db_session: AsyncSession = Depends(get_db_session)
 ):
+    after = None
+    if cursor:
+        try:
+            after = decode_cursor(cursor)
+        except InvalidCursorError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
     try:
+        # Damage rows embed car details, so both tables feed the ETag. See
+        # read_car_data for why versions are read first and cached with.
+        etag = make_etag("damage", await get_versions(db_session, "cars", "damages"))
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+
+        # Cursor pages are not cached; they are walked once, not polled.
+        cache_params = {"damage_type": damage_type, "damaged_part": damaged_part,
+                        "date_from": date_from, "date_to": date_to,
+                        "brand": brand, "license_plate": license_plate,
+                        "limit": limit, "offset": offset, "etag": etag}
+        headers = {"ETag": etag}
+        if cursor is None:
+            cached = await result_cache.get("damage", cache_params)
+            if cached is not None:
+                return Response(content=cached, media_type="application/json", headers=headers)
+
         filters = DamageFilters.get_damage_data_filter(
             DamageData,
             damage_type,
-            damaged_part
+            damaged_part,
+            date_from,
+            date_to,
+            brand,
+            license_plate
         )
-        damage_data = (db_session.query(DamageData)
-                       .options(joinedload(DamageData.car))
-                       .filter(*filters)
-                       .limit(limit)
-                       .offset(offset)
-                       .all())
-
-        result = []
-        for damage in damage_data:
-            car_data = CarDataResponse(
-                license_plate=damage.car.license_plate,
-                model=damage.car.model,
-                color=damage.car.color,
-                vin_number=damage.car.vin_number,
-                brand=damage.car.brand
-            )
-            damage_response = DamageDataResponse(
-                license_plate=damage.license_plate,
-                damage_type=damage.damage_type,
-                damaged_part=damage.damaged_part,
-                date=damage.date,
-                car=car_data
-            )
-            result.append(damage_response)
-
-        return result
+        # Only the response columns are selected and encoded straight to
+        # JSON; ORM entities and per-row Pydantic models cost several times
+        # more than the query itself on large pages.
+        statement = (select(*DAMAGE_RESPONSE_COLUMNS)
+                     .join(CarData, DamageData.car)
+                     .filter(*filters))
+
+        if cursor is not None:
+            statement = paginate_keyset(statement, cursor, limit)
+        else:
+            statement = (statement
+                         .limit(limit)
+                         .offset(offset))
+
+        damage_data = (await db_session.execute(statement)).all()
+
+        # Archived months are merged in only when the query reaches back
+        # into them, so queries on recent damages, and cursor pages past
+        # the archive, never touch it.
+        if damage_archive.reaches(seek_from(date_from, after)):
+            archive_filters = {"damage_type": damage_type, "damaged_part": damaged_part,
+                               "date_from": date_from, "date_to": date_to,
+                               "brand": brand, "license_plate": license_plate}
+            if cursor is not None:
+                archived = await archived_damage_rows(
+                    db_session, **archive_filters, limit=limit, after=after)
+                damage_data = sorted(list(damage_data) + archived,
+                                     key=lambda row: (row.date, row.id))[:limit]
+            elif len(damage_data) < limit:
+                # Offset pages list the damages table first and archived
+                # damages after it.
+                hot_count = offset + len(damage_data)
+                if offset and not damage_data:
+                    result = await db_session.execute(
+                        select(func.count()).select_from(DamageData)
+                        .join(CarData, DamageData.car).filter(*filters))
+                    hot_count = result.scalar()
+                damage_data = list(damage_data) + await archived_damage_rows(
+                    db_session, **archive_filters, limit=limit - len(damage_data),
+                    offset=max(offset - hot_count, 0))
+
+        if cursor is not None:
+            next_cursor = get_next_cursor(damage_data, limit)
+            if next_cursor:
+                headers["X-Next-Cursor"] = next_cursor
+
+        body = encode_damage_rows(damage_data)
+        if cursor is None:
+            await result_cache.set("damage", cache_params, body)
+        return Response(content=body, media_type="application/json", headers=headers)
 
     except SQLAlchemyError as e:
         logging.error(f"Database error: {e}")
@@ -69,23 +154,78 @@ def read_damage_data(
         raise HTTPException(status_code=500, detail="Internal Server Error")
 
 
+@router.get("/damage/export", tags=["Car & Damage Data"])
+async def export_damage_data(
+    format: ExportFormat = Query(
+        ExportFormat.ndjson, description="Export format"),
+    damage_type: Optional[str] = Query(None, description="Car's Damage Type"),
+    damaged_part: Optional[str] = Query(
+        None, description="Car's Damaged part"),
+    date_from: Optional[date] = Query(
+        None, description="Only damages on or after this date"),
+    date_to: Optional[date] = Query(
+        None, description="Only damages on or before this date"),
+    brand: Optional[str] = Query(None, description="Car's Brand"),
+    license_plate: Optional[str] = Query(
+        None, description="Car's License Plate"),
+    db_session: AsyncSession = Depends(get_db_session)
+):
+    try:
+        filters = DamageFilters.get_damage_data_filter(
+            DamageData,
+            damage_type,
+            damaged_part,
+            date_from,
+            date_to,
+            brand,
+            license_plate
+        )
+        statement = (select(
+            DamageData.id,
+            DamageData.license_plate,
+            DamageData.damage_type,
+            DamageData.damaged_part,
+            DamageData.date,
+            CarData.model,
+            CarData.color,
+            CarData.vin_number,
+            CarData.brand)
+            .join(CarData, DamageData.car)
+            .where(*filters)
+            .order_by(DamageData.date, DamageData.id))
+
+        return await export_response(db_session, statement, format, "damages")
+
+    except SQLAlchemyError as e:
+        logging.error(f"Database error: {e}")
+        raise HTTPException(status_code=500, detail="Internal Server Error")
+
+
 @router.post("/admin/damage", response_model=DamageCreateDataResponse, tags=["Admin operations"])
-def create_damage_data(damage_data_request: DamageDataRequest):
+async def create_damage_data(damage_data_request: DamageDataRequest, db_session: AsyncSession = Depends(get_db_session)):
     try:
         new_damage = DamageData(**damage_data_request.dict())
         db_session.add(new_damage)
-        db_session.commit()
-        db_session.refresh(new_damage)
+
+        result = await db_session.execute(select(CarData.brand).filter(
+            CarData.license_plate == new_damage.license_plate))
+        await apply_damage_deltas(db_session, count_damages([(
+            new_damage.damage_type, new_damage.damaged_part, result.scalar(), new_damage.date)]))
+        await stamp_report_versions(db_session, [new_damage.license_plate])
+        await bump_versions(db_session, "damages")
+        await db_session.commit()
+        await result_cache.invalidate("damage")
+        await db_session.refresh(new_damage)
         return DamageCreateDataResponse(**new_damage.__dict__)
 
     except SQLAlchemyError as e:
         logging.error(f"Database error: {e}")
-        db_session.rollback()
+        await db_session.rollback()
         raise HTTPException(status_code=500, detail="Internal Server Error")
 
     except Exception as e:
         logging.error(f"Unexpected error: {e}")
-        db_session.rollback()
+        await db_session.rollback()
         if "duplicate key value violates unique constraint" in str(e):
             raise HTTPException(
                 status_code=400, detail="Duplicate entry for damage ID")
@@ -93,24 +233,142 @@ def create_damage_data(damage_data_request: DamageDataRequest):
 
 
 @router.delete("/admin/damage/{damage_id}", response_model=dict, tags=["Admin operations"])
-def delete_damage_data(damage_id: int = Path(..., description="The ID of the damage to delete")):
+async def delete_damage_data(
+    damage_id: int = Path(..., description="The ID of the damage to delete"),
+    db_session: AsyncSession = Depends(get_db_session)
+):
     try:
-        damage_data = db_session.query(DamageData).filter(
-            DamageData.id == damage_id).first()
+        result = await db_session.execute(select(DamageData)
+                                          .options(joinedload(DamageData.car))
+                                          .filter(DamageData.id == damage_id))
+        damage_data = result.scalars().first()
         if not damage_data:
             raise HTTPException(
                 status_code=404, detail="Damage data not found")
 
-        db_session.delete(damage_data)
-        db_session.commit()
+        brand = damage_data.car.brand if damage_data.car else None
+        await db_session.delete(damage_data)
+        await apply_damage_deltas(db_session, count_damages([(
+            damage_data.damage_type, damage_data.damaged_part, brand, damage_data.date)], sign=-1))
+        await stamp_report_versions(db_session, [damage_data.license_plate])
+        await bump_versions(db_session, "damages")
+        await db_session.commit()
+        await result_cache.invalidate("damage")
         return {"message": "Damage data deleted successfully"}
 
     except SQLAlchemyError as e:
         logging.error(f"Database error: {e}")
-        db_session.rollback()
+        await db_session.rollback()
         raise HTTPException(status_code=500, detail="Internal Server Error")
 
     except Exception as e:
         logging.error(f"Unexpected error: {e}")
-        db_session.rollback()
+        await db_session.rollback()
+        raise HTTPException(status_code=500, detail="Internal Server Error")
+
+
+@router.post("/admin/damage/archive", response_model=DamageArchiveResponse, tags=["Admin operations"])
+async def archive_damage_data(
+    before: date = Query(...,
+                         description="Archive the damages of every month that ends before this date"),
+    db_session: AsyncSession = Depends(get_db_session)
+):
+    if not damage_archive.enabled:
+        raise HTTPException(
+            status_code=400, detail="Damage archive is not configured")
+
+    try:
+        archived = await archive_damages(db_session, before)
+        await result_cache.invalidate("damage")
+        return DamageArchiveResponse(
+            before=before,
+            months=[ArchivedMonthResponse(month=month, damages=count)
+                    for month, count in sorted(archived.items())],
+            damages=sum(archived.values()))
+
+    except SQLAlchemyError as e:
+        logging.error(f"Database error: {e}")
+        await db_session.rollback()
+        raise HTTPException(status_code=500, detail="Internal Server Error")
+
+    except OSError as e:
+        logging.error(f"Damage archive write failed: {e}")
+        await db_session.rollback()
+        raise HTTPException(status_code=500, detail="Internal Server Error")
+
+
+@router.post("/admin/damage/bulk", response_model=BulkLoadResponse, tags=["Admin operations"],
+             openapi_extra=bulk_openapi_extra(DamageBulkRequest))
+async def bulk_create_damage_data(request: Request, db_session: AsyncSession = Depends(get_db_session)):
+    rows = await read_bulk_rows(request, DAMAGE_CSV_COLUMNS)
+    response = BulkLoadResponse()
+    seen_ids = set()
+
+    try:
+        for batch in iter_batches(rows):
+            response.received += len(batch)
+            valid, errors = validate_rows(batch, DamageBulkRequest)
+            response.errors += errors
+
+            result = await db_session.execute(
+                select(CarData.license_plate, CarData.brand)
+                .filter(CarData.license_plate.in_([row["license_plate"] for _, row in valid])))
+            known_plates = dict(result.all())
+
+            with_ids = []
+            without_ids = []
+            for row_number, row in valid:
+                if row["license_plate"] not in known_plates:
+                    response.errors.append(BulkRowError(
+                        row=row_number, detail="license_plate: Car not found"))
+                    continue
+
+                if row["id"] is None:
+                    row.pop("id")
+                    without_ids.append(row)
+                    continue
+
+                if row["id"] in seen_ids:
+                    response.errors.append(BulkRowError(
+                        row=row_number, detail="id: Duplicate entry in upload"))
+                    continue
+
+                seen_ids.add(row["id"])
+                with_ids.append(row)
+
+            # Rows that overwrite an existing id move that damage out of its
+            # old summary group before the new values are counted in.
+            result = await db_session.execute(
+                select(DamageData.license_plate, DamageData.damage_type, DamageData.damaged_part,
+                       CarData.brand, DamageData.date)
+                .outerjoin(CarData, DamageData.car)
+                .filter(DamageData.id.in_([row["id"] for row in with_ids])))
+            overwritten = result.all()
+            deltas = count_damages((row[1:] for row in overwritten), sign=-1)
+            deltas.update(count_damages(
+                (row["damage_type"], row["damaged_part"], known_plates[row["license_plate"]], row["date"])
+                for row in with_ids + without_ids))
+
+            # Explicit ids go first and move the id sequence past them, so
+            # the generated ids of the remaining rows cannot collide.
+            if with_ids:
+                response.written += await write_rows(
+                    db_session, DamageData.__table__, with_ids, conflict_key="id")
+                await sync_id_sequence(db_session, DamageData.__table__)
+            response.written += await write_rows(
+                db_session, DamageData.__table__, without_ids)
+            await apply_damage_deltas(db_session, deltas)
+            # Overwritten damages may have belonged to another car.
+            await stamp_report_versions(db_session, {row["license_plate"] for row in with_ids + without_ids}
+                                        | {row.license_plate for row in overwritten if row.license_plate})
+
+        await bump_versions(db_session, "damages")
+        await db_session.commit()
+        await result_cache.invalidate("damage")
+        response.errors.sort(key=lambda error: error.row)
+        return response
+
+    except SQLAlchemyError as e:
+        logging.error(f"Database error: {e}")
+        await db_session.rollback()
         raise HTTPException(status_code=500, detail="Internal Server Error")
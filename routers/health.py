@@ -0,0 +1,36 @@
+from fastapi import APIRouter, Depends
+from fastapi.responses import JSONResponse
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+import asyncio
+import logging
+import os
+
+from database.database import get_db_session
+
+READINESS_TIMEOUT = float(os.getenv("READINESS_TIMEOUT", "2"))
+
+router = APIRouter()
+
+tags_metadata = [
+    {"name": "Health", "description": "Liveness and readiness probes"}
+]
+
+
+@router.get("/healthz", response_model=dict, tags=["Health"])
+async def read_liveness():
+    # The process is up and serving; never touches the database, so a
+    # database outage does not get every worker restarted.
+    return {"status": "ok"}
+
+
+@router.get("/readyz", response_model=dict, tags=["Health"])
+async def read_readiness(db_session: AsyncSession = Depends(get_db_session)):
+    # Ready once a pooled connection answers; the first probe is also what
+    # opens this worker's first connection.
+    try:
+        await asyncio.wait_for(db_session.execute(text("SELECT 1")), READINESS_TIMEOUT)
+    except Exception as e:
+        logging.error(f"Readiness check failed: {e!r}")
+        return JSONResponse(status_code=503, content={"status": "unavailable", "database": "unreachable"})
+    return {"status": "ready", "database": "ok"}
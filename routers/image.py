@@ -0,0 +1,14 @@
+from fastapi import APIRouter
+
+from services.image import image_stats
+
+router = APIRouter()
+
+tags_metadata = [
+    {"name": "Admin operations", "description": "Admin operations Endpoint"}
+]
+
+
+@router.get("/admin/images", response_model=dict, tags=["Admin operations"])
+async def read_image_stats():
+    return image_stats.stats()
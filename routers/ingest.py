@@ -0,0 +1,91 @@
+import csv
+import io
+import json
+
+from fastapi import HTTPException, Request
+from pydantic import ValidationError
+
+from database.bulk import BULK_BATCH_SIZE
+from routers.models import BulkRowError
+
+
+def bulk_openapi_extra(request_model):
+    return {
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {
+                    "schema": {"type": "array", "items": request_model.model_json_schema()}
+                },
+                "multipart/form-data": {
+                    "schema": {
+                        "type": "object",
+                        "properties": {"file": {"type": "string", "format": "binary"}},
+                        "required": ["file"]
+                    }
+                }
+            }
+        }
+    }
+
+
+def _iter_csv_rows(upload, csv_columns: list):
+    reader = csv.reader(io.TextIOWrapper(
+        upload.file, encoding="utf-8-sig", newline=""))
+    next(reader, None)
+    for row_number, values in enumerate(reader, start=1):
+        if len(values) != len(csv_columns):
+            yield row_number, None
+            continue
+        yield row_number, {name: value.strip() or None
+                           for name, value in zip(csv_columns, values)}
+
+
+async def read_bulk_rows(request: Request, csv_columns: list):
+    # Accepts a JSON array or a multipart CSV upload laid out like the
+    # seed files. Rows are numbered from 1, not counting the CSV header.
+    content_type = request.headers.get("content-type", "")
+
+    if content_type.startswith("multipart/form-data"):
+        form = await request.form()
+        upload = form.get("file")
+        if upload is None or isinstance(upload, str):
+            raise HTTPException(status_code=400, detail="Missing CSV file")
+        return _iter_csv_rows(upload, csv_columns)
+
+    try:
+        payload = await request.json()
+    except json.JSONDecodeError:
+        raise HTTPException(status_code=400, detail="Invalid JSON body")
+    if not isinstance(payload, list):
+        raise HTTPException(
+            status_code=400, detail="Expected a JSON array of rows")
+    return enumerate(payload, start=1)
+
+
+def iter_batches(rows, size: int = BULK_BATCH_SIZE):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def validate_rows(batch: list, request_model):
+    valid = []
+    errors = []
+    for row_number, raw in batch:
+        if not isinstance(raw, dict):
+            errors.append(BulkRowError(row=row_number, detail="Malformed row"))
+            continue
+        try:
+            valid.append((row_number, request_model(**raw).model_dump()))
+        except ValidationError as e:
+            error = e.errors()[0]
+            field = ".".join(str(part) for part in error["loc"])
+            errors.append(BulkRowError(
+                row=row_number, detail=f"{field}: {error['msg']}"))
+    return valid, errors
@@ -1,5 +1,12 @@
 from pydantic import BaseModel
-from datetime import date
+from datetime import date, datetime
+from enum import Enum
+from typing import Optional
+
+
+class ExportFormat(str, Enum):
+    ndjson = "ndjson"
+    csv = "csv"
 
 
 class CarDataResponse(BaseModel):
@@ -38,6 +45,73 @@ class DamageDataRequest(BaseModel):
     date: date
 
 
+class DamageBulkRequest(DamageDataRequest):
+    id: Optional[int] = None
+
+
+class BulkRowError(BaseModel):
+    row: int
+    detail: str
+
+
+class BulkLoadResponse(BaseModel):
+    received: int = 0
+    written: int = 0
+    errors: list[BulkRowError] = []
+
+
 class CarAndDamageResponse(BaseModel):
     car: CarDataResponse
     damages: list[DamageCreateDataResponse]
+
+
+class AnalyticsDimension(str, Enum):
+    damage_type = "damage_type"
+    damaged_part = "damaged_part"
+    brand = "brand"
+    month = "month"
+
+
+class DamageAnalyticsResponse(BaseModel):
+    damage_type: Optional[str] = None
+    damaged_part: Optional[str] = None
+    brand: Optional[str] = None
+    month: Optional[date] = None
+    count: int
+
+
+class PlateCandidateResponse(BaseModel):
+    license_plate: str
+    cost: float
+
+
+class CarDeleteRequest(BaseModel):
+    license_plates: list[str]
+
+
+class CarDeleteResponse(BaseModel):
+    requested: int
+    cars_deleted: int = 0
+    damages_deleted: int = 0
+    not_found: list[str] = []
+
+
+class ReportJobResponse(BaseModel):
+    job_id: str
+    status: str
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    status_code: Optional[int] = None
+    detail: Optional[str] = None
+
+
+class ArchivedMonthResponse(BaseModel):
+    month: date
+    damages: int
+
+
+class DamageArchiveResponse(BaseModel):
+    before: date
+    months: list[ArchivedMonthResponse] = []
+    damages: int = 0
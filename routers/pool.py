@@ -0,0 +1,14 @@
+from fastapi import APIRouter
+
+from database.database import Database
+
+router = APIRouter()
+
+tags_metadata = [
+    {"name": "Admin operations", "description": "Admin operations Endpoint"}
+]
+
+
+@router.get("/admin/pool", response_model=dict, tags=["Admin operations"])
+async def read_pool_stats():
+    return Database().get_pool_stats()
@@ -1,140 +1,422 @@
-from fastapi import APIRouter, File, UploadFile, HTTPException, Response
+from fastapi import APIRouter, Depends, File, Query, UploadFile, HTTPException, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
+from typing import Callable, List, NamedTuple, Optional
+from sqlalchemy import select
 from sqlalchemy.exc import SQLAlchemyError
-from database.database import Database
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+from database.archive import damage_archive
+from database.database import get_db_session, get_session_factory
 from database.models import DamageData, CarData
-from routers.models import CarDataResponse, DamageCreateDataResponse, CarAndDamageResponse
-from reportlab.lib.pagesizes import letter
-from reportlab.pdfgen import canvas
-from io import BytesIO
-import base64
-import requests
-import base64
+from routers.models import CarDataResponse, DamageCreateDataResponse, CarAndDamageResponse, ReportJobResponse
+from routers.streaming import iter_zip
+from services.image import (BATCH_UPLOAD_MAX_BYTES, OCR_DOWNSCALE, UPLOAD_FORM_OVERHEAD, UPLOAD_MAX_BYTES,
+                            ImageTooLargeError, downscale_image, image_stats, read_upload)
+from services.metrics import plate_api_duration, plate_api_errors
+from services.pdf import render_pdf
+from services.plate_cache import plate_cache
+from services.plate_client import PlateApiError, get_plate_client
+from services.plate_index import best_match, plate_index
+from services.report_cache import report_cache
+from services.report_jobs import QueueFullError, report_jobs
+import asyncio
+import json
+import logging
 import re
-from dotenv import load_dotenv
+import time
 import os
 
-load_dotenv()
-
-USERNAME = os.getenv('USERNAME')
-PASSWORD = os.getenv('PASSWORD')
-EXTERNAL_API_URL = "https://gatiosoft.ro/platebber.aspx"
+BATCH_MAX_IMAGES = int(os.getenv("BATCH_MAX_IMAGES", "200"))
+# Request body limits enforced by UploadLimitMiddleware before the form is
+# parsed.
+UPLOAD_REQUEST_LIMITS = {
+    "/generate-report": UPLOAD_MAX_BYTES + UPLOAD_FORM_OVERHEAD,
+    "/reports": UPLOAD_MAX_BYTES + UPLOAD_FORM_OVERHEAD,
+    "/generate-report/batch": BATCH_UPLOAD_MAX_BYTES,
+}
+PLATE_LOOKUP_CONCURRENCY = int(os.getenv("PLATE_LOOKUP_CONCURRENCY", "8"))
+PLATE_CANDIDATES = int(os.getenv("PLATE_CANDIDATES", "5"))
 
 router = APIRouter()
 
-db_session = Database().get_session()
-
 tags_metadata = [
+    {"name": "Admin operations", "description": "Admin operations Endpoint"},
     {"name": "Car & Damage Data", "description": "Car & Damage Data Results"}
 ]
 
 
 @router.post("/generate-report", response_model=CarAndDamageResponse, tags=["Car & Damage Data"])
-async def generate_report(file: UploadFile = File(...)):
-    license_plate = await call_external_api(file)
+async def generate_report(
+    file: UploadFile = File(...),
+    refresh: bool = Query(
+        False, description="Re-run plate recognition even if this image was seen before"),
+    db_session: AsyncSession = Depends(get_db_session)
+):
+    timings = {}
+    license_plate = await call_external_api(file, bypass_cache=refresh, timings=timings)
+
+    try:
+        report = await find_report(db_session, license_plate)
+    except SQLAlchemyError as e:
+        raise HTTPException(status_code=500, detail="Internal Server Error")
+
+    if report.cached_path:
+        response = FileResponse(report.cached_path, media_type='application/pdf', filename="report.pdf")
+        response.headers["X-Report-Cache"] = "hit"
+    else:
+        response = PDFResponse(content=report.pdf_bytes, filename="report.pdf", media_type='application/pdf')
+        response.headers["X-Report-Cache"] = "miss"
+    response.headers["Server-Timing"] = ", ".join(
+        f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in timings.items()
+        if stage != "bytes_saved")
+    response.headers["X-Image-Bytes-Saved"] = str(timings.get("bytes_saved", 0))
+    if report.matched_plate:
+        response.headers["X-Matched-Plate"] = report.matched_plate
+    return response
+
+
+@router.post("/reports", response_model=ReportJobResponse, status_code=202, tags=["Car & Damage Data"])
+async def submit_report_job(
+    response: Response,
+    file: UploadFile = File(...),
+    refresh: bool = Query(
+        False, description="Re-run plate recognition even if this image was seen before"),
+    session_factory: Callable[[], AsyncSession] = Depends(get_session_factory),
+):
+    # The asynchronous form of /generate-report: the upload is read now, the
+    # plate lookup and render happen on a report worker, and the result is
+    # fetched from GET /reports/{job_id}.
+    try:
+        contents = await read_upload(file)
+    except ImageTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+    # Jobs outlive the request, so they open their own session from the
+    # factory rather than borrowing the request's.
+    async def run():
+        license_plate = await recognise_plate(contents, bypass_cache=refresh)
+        async with session_factory() as db_session:
+            report = await find_report(db_session, license_plate)
+        pdf_bytes = report.pdf_bytes
+        if pdf_bytes is None:
+            pdf_bytes = await asyncio.to_thread(read_file, report.cached_path)
+        return pdf_bytes, report.matched_plate
+
+    try:
+        job = report_jobs.submit(run)
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+
+    response.headers["Location"] = f"/reports/{job.id}"
+    return job.describe()
+
+
+@router.get("/reports/{job_id}", response_model=ReportJobResponse, tags=["Car & Damage Data"],
+            responses={200: {"content": {"application/pdf": {}},
+                             "description": "The finished report, or the job if it failed"},
+                       202: {"description": "The job is still queued or running"}})
+async def read_report_job(job_id: str):
+    job = report_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Report job not found or expired")
+
+    if job.status == "done":
+        pdf_bytes, matched_plate = job.result
+        response = PDFResponse(content=pdf_bytes, filename="report.pdf", media_type='application/pdf')
+        if matched_plate:
+            response.headers["X-Matched-Plate"] = matched_plate
+        return response
+
+    status_code = 200 if job.status == "failed" else 202
+    return JSONResponse(jsonable_encoder(job.describe()), status_code=status_code)
+
+
+@router.get("/admin/reports/jobs", response_model=dict, tags=["Admin operations"])
+async def read_report_job_stats():
+    return report_jobs.stats()
+
+
+@router.post("/generate-report/batch", response_class=StreamingResponse, tags=["Car & Damage Data"])
+async def generate_batch_report(
+    files: List[UploadFile] = File(...),
+    refresh: bool = Query(
+        False, description="Re-run plate recognition even if an image was seen before"),
+    db_session: AsyncSession = Depends(get_db_session)
+):
+    if len(files) > BATCH_MAX_IMAGES:
+        raise HTTPException(
+            status_code=400, detail=f"At most {BATCH_MAX_IMAGES} images per batch")
+
+    lookup_slots = asyncio.Semaphore(PLATE_LOOKUP_CONCURRENCY)
+
+    async def resolve_plate(file: UploadFile):
+        async with lookup_slots:
+            try:
+                return await call_external_api(file, bypass_cache=refresh), None
+            except HTTPException as e:
+                return None, e.detail
+
+    resolved = await asyncio.gather(*(resolve_plate(file) for file in files))
+    plates = {license_plate for license_plate, _ in resolved if license_plate}
 
     try:
-        car_data = db_session.query(CarData).filter(
-            CarData.license_plate == license_plate).first()
+        # One query for every car in the batch together with its damages.
+        result = await db_session.execute(
+            select(CarData)
+            .options(joinedload(CarData.damages))
+            .filter(CarData.license_plate.in_(plates)))
+        cars = {car.license_plate: car for car in result.unique().scalars().all()}
+
+        matched = {}
+        if plates - cars.keys():
+            await plate_index.sync(db_session)
+            for license_plate in plates - cars.keys():
+                matched_plate = best_match(plate_index.search(license_plate, PLATE_CANDIDATES))
+                if matched_plate:
+                    matched[license_plate] = matched_plate
+        if matched:
+            result = await db_session.execute(
+                select(CarData)
+                .options(joinedload(CarData.damages))
+                .filter(CarData.license_plate.in_(set(matched.values()))))
+            cars.update((car.license_plate, car) for car in result.unique().scalars().all())
+
+    except SQLAlchemyError as e:
+        logging.error(f"Database error: {e}")
+        raise HTTPException(status_code=500, detail="Internal Server Error")
+
+    manifest = []
+    for index, (file, (license_plate, error)) in enumerate(zip(files, resolved)):
+        entry = {"index": index, "filename": file.filename,
+                 "license_plate": license_plate}
+        if error:
+            entry.update(status="plate_lookup_failed", detail=error)
+        elif not license_plate:
+            entry.update(status="plate_not_recognised")
+        elif matched.get(license_plate, license_plate) not in cars:
+            entry.update(status="car_not_found")
+        else:
+            car_plate = matched.get(license_plate, license_plate)
+            if car_plate != license_plate:
+                entry["matched_plate"] = car_plate
+            entry.update(status="ok", report=f"{car_plate}.pdf")
+        manifest.append(entry)
+
+    # Cached reports are looked up first, so archived damages are read only
+    # for the cars left to render, and in one pass over the archive rather
+    # than once per car.
+    cached_paths = dict(zip(cars, await asyncio.gather(
+        *(report_cache.get(car.license_plate, car.report_version) for car in cars.values()))))
+    archived = await damage_archive.damages_for_plates(
+        license_plate for license_plate, cached_path in cached_paths.items() if not cached_path)
+
+    async def render(car):
+        try:
+            cached_path = cached_paths[car.license_plate]
+            if cached_path:
+                return car.license_plate, await asyncio.to_thread(read_file, cached_path)
+            pdf_bytes = await render_pdf(build_car_report(
+                car, archived.get(car.license_plate, []) + list(car.damages)))
+            await store_report(car, pdf_bytes)
+            return car.license_plate, pdf_bytes
+        except Exception as e:
+            logging.error(f"Report rendering failed for {car.license_plate}: {e}")
+            return car.license_plate, None
+
+    renders = [asyncio.ensure_future(render(car)) for car in cars.values()]
+
+    async def entries():
+        failed = set()
+        for task in asyncio.as_completed(renders):
+            license_plate, pdf_bytes = await task
+            if pdf_bytes is None:
+                failed.add(license_plate)
+                continue
+            yield f"{license_plate}.pdf", pdf_bytes
+
+        for entry in manifest:
+            if entry["status"] == "ok" and entry.get("matched_plate", entry["license_plate"]) in failed:
+                entry.update(status="render_failed")
+                del entry["report"]
+        yield "manifest.json", json.dumps(manifest, indent=2).encode('utf-8')
+
+    headers = {
+        'Content-Disposition': 'attachment; filename="reports.zip"'
+    }
+    return StreamingResponse(iter_zip(entries()), media_type="application/zip", headers=headers)
+
+
+class Report(NamedTuple):
+    matched_plate: Optional[str]
+    cached_path: Optional[str]
+    pdf_bytes: Optional[bytes]
+
+
+async def find_report(db_session, license_plate: str) -> Report:
+    # OCR text without a single plate character gives no plate to look up
+    # or to match against.
+    if not license_plate:
+        raise HTTPException(status_code=404, detail="Car not found")
+
+    result = await db_session.execute(select(CarData).filter(
+        CarData.license_plate == license_plate))
+    car_data = result.scalars().first()
+    matched_plate = None
+    if not car_data:
+        # OCR misreads (0/O, 1/I, 8/B, a dropped character) fall back to
+        # the closest registered plate when exactly one is closest.
+        candidates = await match_plate(db_session, license_plate)
+        matched_plate = best_match(candidates)
+        if matched_plate:
+            result = await db_session.execute(select(CarData).filter(
+                CarData.license_plate == matched_plate))
+            car_data = result.scalars().first()
+            license_plate = matched_plate
         if not car_data:
-            raise HTTPException(status_code=404, detail="Car not found")
+            raise HTTPException(status_code=404, detail="Car not found", headers={
+                "X-Plate-Candidates": ", ".join(plate for plate, _ in candidates)})
 
-        damage_data = db_session.query(DamageData).filter(
-            DamageData.license_plate == license_plate).all()
+    # Cached reports are keyed on the car's report_version, which every
+    # write touching the car or its damages changes, so a hit needs
+    # neither the damages query nor a render.
+    cached_path = await report_cache.get(license_plate, car_data.report_version)
+    if cached_path:
+        return Report(matched_plate, cached_path, None)
 
-        car_response = CarDataResponse(
-            license_plate=car_data.license_plate,
-            model=car_data.model,
-            color=car_data.color,
-            vin_number=car_data.vin_number,
-            brand=car_data.brand
-        )
+    result = await db_session.execute(select(DamageData).filter(
+        DamageData.license_plate == license_plate))
+    archived = await damage_archive.damages_for_plates([license_plate])
+    damage_data = archived.get(license_plate, []) + list(result.scalars().all())
 
-        damage_responses = [
-            DamageCreateDataResponse(
-                damage_type=damage.damage_type,
-                damaged_part=damage.damaged_part,
-                date=damage.date
-            ) for damage in damage_data
-        ]
+    pdf_bytes = await render_pdf(build_car_report(car_data, damage_data))
+    await store_report(car_data, pdf_bytes)
+    return Report(matched_plate, None, pdf_bytes)
 
-        response = CarAndDamageResponse(
-            car=car_response, damages=damage_responses)
 
-        pdf_bytes = create_pdf(response)
+async def store_report(car_data: CarData, pdf_bytes: bytes):
+    # A full disk or a read-only cache directory costs the next request a
+    # render, never this one its report.
+    try:
+        await report_cache.put(car_data.license_plate, car_data.report_version, pdf_bytes)
+    except OSError as e:
+        logging.error(f"Report cache write failed for {car_data.license_plate}: {e}")
 
-        return PDFResponse(content=pdf_bytes, filename="report.pdf", media_type='application/pdf')
 
-    except SQLAlchemyError as e:
-        raise HTTPException(status_code=500, detail="Internal Server Error")
+def read_file(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
 
 
-async def call_external_api(file: UploadFile):
+async def match_plate(db_session, license_plate: str):
+    await plate_index.sync(db_session)
+    return plate_index.search(license_plate, PLATE_CANDIDATES)
 
-    contents = await file.read()
-    file_base64 = base64.b64encode(contents).decode('utf-8')
-    auth = f'{USERNAME}:{PASSWORD}'.encode('utf-8')
-    auth_base64 = base64.b64encode(auth).decode('utf-8')
 
-    response = requests.post(
-        EXTERNAL_API_URL,
-        json={
-            "base64ImageString": file_base64,
-            "languageCode": "auto",
-            "plate_output": "yes"
-        },
-        headers={
-            "Authorization": f"Basic {auth_base64}",
-            'Accept': 'application/json'
-        }
+def build_car_report(car_data: CarData, damage_data: List[DamageData]):
+    car_response = CarDataResponse(
+        license_plate=car_data.license_plate,
+        model=car_data.model,
+        color=car_data.color,
+        vin_number=car_data.vin_number,
+        brand=car_data.brand
     )
 
-    if response.status_code != 200:
-        raise HTTPException(status_code=response.status_code,
+    damage_responses = [
+        DamageCreateDataResponse(
+            damage_type=damage.damage_type,
+            damaged_part=damage.damaged_part,
+            date=damage.date
+        ) for damage in damage_data
+    ]
+
+    return CarAndDamageResponse(
+        car=car_response, damages=damage_responses)
+
+
+def finish_stage(timings: dict, stage: str, started: float):
+    timings[stage] = time.perf_counter() - started
+    image_stats.record_stage(stage, timings[stage])
+
+
+async def call_external_api(file: UploadFile, bypass_cache: bool = False, timings: dict = None):
+    # Stage durations (in seconds) and bytes saved are written to timings
+    # when the caller passes a dict, and always added to image_stats.
+    timings = {} if timings is None else timings
+
+    started = time.perf_counter()
+    try:
+        contents = await read_upload(file)
+    except ImageTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    finish_stage(timings, "read", started)
+
+    return await recognise_plate(contents, bypass_cache, timings)
+
+
+async def recognise_plate(contents: bytes, bypass_cache: bool = False, timings: dict = None):
+    timings = {} if timings is None else timings
+
+    # Keyed on the original bytes so a repeat upload skips downscaling too.
+    image_hash = plate_cache.key(contents)
+
+    if bypass_cache:
+        plate_cache.record_bypass()
+    else:
+        license_plate_data = await plate_cache.get(image_hash)
+        if license_plate_data:
+            return license_plate_data
+
+    upload = contents
+    if OCR_DOWNSCALE:
+        started = time.perf_counter()
+        upload = await asyncio.to_thread(downscale_image, contents)
+        finish_stage(timings, "downscale", started)
+    image_stats.record(len(contents), len(upload))
+    timings["bytes_saved"] = len(contents) - len(upload)
+
+    started = time.perf_counter()
+    try:
+        response = await get_plate_client().recognise(upload)
+    except PlateApiError as e:
+        logging.error(f"Plate API error: {e.detail}")
+        plate_api_duration.observe(time.perf_counter() - started, "error")
+        plate_api_errors.inc(e.status_code)
+        raise HTTPException(status_code=e.status_code,
                             detail="Failed to upload image to external API")
+    finish_stage(timings, "recognise", started)
+    plate_api_duration.observe(timings["recognise"], "ok")
 
-    response = response.json()
     license_plate_data = extract_plate(response[0]['plate_text'])
+    if license_plate_data:
+        await plate_cache.set(image_hash, license_plate_data)
     return license_plate_data
 
 
+PLATE_TOKEN = re.compile(r'[A-Za-z0-9]+')
+
+
+def primitive_root(token: str):
+    # The smallest p > 0 at which token reappears inside token + token is
+    # its shortest period that divides len(token), e.g. "AB12AB12" -> 4.
+    # str.find keeps this linear and in C.
+    period = (token + token).find(token, 1)
+    return token[:period]
+
+
 def extract_plate(plate_text):
-    matches = re.findall(r'[A-Za-z0-9]+', plate_text)
-
-    for match in matches:
-        length = len(match)
-        for size in range(1, length + 1):
-            for start in range(length - size + 1):
-                substring = match[start:start + size]
-                if match == substring * (length // size):
-                    return substring
-
-    return max(matches, key=len) if matches else None
-
-
-def create_pdf(data: CarAndDamageResponse):
-    buffer = BytesIO()
-    c = canvas.Canvas(buffer, pagesize=letter)
-    width, height = letter
-
-    c.drawString(100, height - 40, f"Car Details:")
-    c.drawString(100, height - 60, f"License Plate: {data.car.license_plate}")
-    c.drawString(100, height - 80, f"Model: {data.car.model}")
-    c.drawString(100, height - 100, f"Color: {data.car.color}")
-    c.drawString(100, height - 120, f"VIN Number: {data.car.vin_number}")
-    c.drawString(100, height - 140, f"Brand: {data.car.brand}")
-
-    c.drawString(100, height - 180, f"Damages:")
-    y_position = height - 200
-    for damage in data.damages:
-        c.drawString(100, y_position, f"Damage Type: {damage.damage_type}")
-        c.drawString(100, y_position - 20,
-                     f"Damaged Part: {damage.damaged_part}")
-        c.drawString(100, y_position - 40, f"Date: {damage.date}")
-        y_position -= 60
-
-    c.save()
-    buffer.seek(0)
-    return buffer.getvalue()
+    # OCR often reads the plate more than once ("AB12AB12"), so the first
+    # alphanumeric token is collapsed to the string it repeats.
+    match = PLATE_TOKEN.search(plate_text)
+    return primitive_root(match.group()) if match else None
+
+
+def extract_plates(plate_texts):
+    # Batch form of extract_plate. OCR output repeats a lot across a batch,
+    # so each distinct string is only normalised once.
+    plates = {}
+    return [plates[text] if text in plates else plates.setdefault(text, extract_plate(text))
+            for text in plate_texts]
 
 
 class PDFResponse(Response):
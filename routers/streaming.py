@@ -0,0 +1,90 @@
+import csv
+import io
+import json
+import logging
+import zipfile
+
+from fastapi.responses import StreamingResponse
+
+from routers.models import ExportFormat
+
+EXPORT_BATCH_SIZE = 1000
+
+MEDIA_TYPES = {
+    ExportFormat.ndjson: "application/x-ndjson",
+    ExportFormat.csv: "text/csv",
+}
+
+
+async def _iter_csv(result, fieldnames):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fieldnames)
+    async for partition in result.partitions():
+        writer.writerows(partition)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+async def _iter_ndjson(result, fieldnames):
+    async for partition in result.partitions():
+        yield "".join(
+            json.dumps(dict(zip(fieldnames, row)), default=str) + "\n"
+            for row in partition)
+
+
+async def export_response(db_session, statement, export_format: ExportFormat, filename: str):
+    # yield_per turns on a server-side cursor, so only one batch of rows is
+    # held in memory however large the table is.
+    fieldnames = list(statement.selected_columns.keys())
+    result = await db_session.stream(
+        statement.execution_options(yield_per=EXPORT_BATCH_SIZE))
+
+    iter_rows = _iter_csv if export_format == ExportFormat.csv else _iter_ndjson
+
+    async def generate():
+        try:
+            async for chunk in iter_rows(result, fieldnames):
+                yield chunk
+        except Exception as e:
+            logging.error(f"Export stream failed: {e}")
+            raise
+        finally:
+            await result.close()
+
+    headers = {
+        'Content-Disposition': f'attachment; filename="{filename}.{export_format.value}"'
+    }
+    return StreamingResponse(generate(), media_type=MEDIA_TYPES[export_format], headers=headers)
+
+
+class _ZipBuffer:
+    # Write-only sink for ZipFile; without seek/tell ZipFile writes data
+    # descriptors, so the archive can be sent while it is being built.
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+async def iter_zip(entries):
+    buffer = _ZipBuffer()
+    with zipfile.ZipFile(buffer, mode="w", compression=zipfile.ZIP_DEFLATED) as archive:
+        async for name, data in entries:
+            archive.writestr(name, data)
+            yield buffer.drain()
+    yield buffer.drain()
@@ -0,0 +1,156 @@
+import os
+import time
+from collections import OrderedDict
+from typing import Optional
+
+RESULT_CACHE_URL = os.getenv("RESULT_CACHE_URL")
+RESULT_CACHE_MAX_ENTRIES = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "1024"))
+RESULT_CACHE_TTL = float(os.getenv("RESULT_CACHE_TTL", "30"))
+
+
+class MemoryCacheBackend:
+    # LRU with per-entry expiry. Counters live apart from entries so that
+    # evicting results never resets an invalidation generation.
+
+    def __init__(self, max_entries: int = RESULT_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._counters = {}
+
+    async def get(self, key: str) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        value, expires_at = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: bytes, ttl: float):
+        self._entries[key] = (value, time.monotonic() + ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def get_counter(self, key: str) -> int:
+        return self._counters.get(key, 0)
+
+    async def incr(self, key: str) -> int:
+        self._counters[key] = self._counters.get(key, 0) + 1
+        return self._counters[key]
+
+    async def clear(self):
+        self._entries.clear()
+        self._counters.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class RedisCacheBackend:
+    # Shares cached results and invalidations between workers. Needs the
+    # optional redis package; size is bounded by the server's maxmemory
+    # policy, entries expire on their own TTL.
+
+    def __init__(self, url: str, prefix: str = "result-cache:"):
+        try:
+            import redis.asyncio as redis
+        except ImportError as e:
+            raise RuntimeError(
+                "RESULT_CACHE_URL needs the redis package: pip install redis") from e
+
+        self.client = redis.from_url(url)
+        self.prefix = prefix
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self.client.get(self.prefix + key)
+
+    async def set(self, key: str, value: bytes, ttl: float):
+        await self.client.set(self.prefix + key, value, px=int(ttl * 1000))
+
+    async def get_counter(self, key: str) -> int:
+        return int(await self.client.get(self.prefix + key) or 0)
+
+    async def incr(self, key: str) -> int:
+        return await self.client.incr(self.prefix + key)
+
+    async def clear(self):
+        async for key in self.client.scan_iter(match=self.prefix + "*"):
+            await self.client.delete(key)
+
+
+def normalise_params(params: dict) -> str:
+    # Comma-separated filters are order- and whitespace-insensitive, so
+    # "Dent, Scratch" and "Scratch,Dent" share one entry.
+    parts = []
+    for name in sorted(params):
+        value = params[name]
+        if value is None:
+            continue
+        if isinstance(value, str):
+            value = ",".join(sorted({x.strip() for x in value.split(",")}))
+        parts.append(f"{name}={value}")
+    return "&".join(parts)
+
+
+class ResultCache:
+    # Each namespace carries a generation number that is part of every key.
+    # Invalidating bumps the generation, which orphans all older entries at
+    # once (they age out through LRU/TTL) and works the same on Redis.
+
+    def __init__(self, backend, ttl: float = RESULT_CACHE_TTL):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    async def _key(self, namespace: str, params: dict) -> str:
+        generation = await self.backend.get_counter(f"{namespace}:generation")
+        return f"{namespace}:{generation}:{normalise_params(params)}"
+
+    async def get(self, namespace: str, params: dict) -> Optional[bytes]:
+        value = await self.backend.get(await self._key(namespace, params))
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    async def set(self, namespace: str, params: dict, value: bytes):
+        await self.backend.set(await self._key(namespace, params), value, self.ttl)
+
+    async def invalidate(self, *namespaces: str):
+        for namespace in namespaces:
+            await self.backend.incr(f"{namespace}:generation")
+            self.invalidations += 1
+
+    async def clear(self):
+        await self.backend.clear()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "backend": type(self.backend).__name__,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "invalidations": self.invalidations,
+            "ttl": self.ttl,
+        }
+
+
+def create_result_cache():
+    if RESULT_CACHE_URL:
+        return ResultCache(RedisCacheBackend(RESULT_CACHE_URL))
+    return ResultCache(MemoryCacheBackend())
+
+
+result_cache = create_result_cache()
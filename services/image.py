@@ -0,0 +1,132 @@
+import os
+from io import BytesIO
+
+from fastapi import HTTPException, UploadFile
+from fastapi.responses import JSONResponse
+
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(20 * 1024 * 1024)))
+UPLOAD_CHUNK_SIZE = 64 * 1024
+# Room for the multipart boundaries and part headers around one image.
+UPLOAD_FORM_OVERHEAD = 64 * 1024
+BATCH_UPLOAD_MAX_BYTES = int(os.getenv("BATCH_UPLOAD_MAX_BYTES", str(256 * 1024 * 1024)))
+
+# Plates stay readable well below phone camera resolution; 1600px on the
+# long side keeps a plate across a few hundred pixels in a typical shot.
+OCR_DOWNSCALE = os.getenv("OCR_DOWNSCALE", "true").lower() == "true"
+OCR_MAX_SIDE = int(os.getenv("OCR_MAX_SIDE", "1600"))
+OCR_JPEG_QUALITY = int(os.getenv("OCR_JPEG_QUALITY", "85"))
+
+
+class ImageTooLargeError(Exception):
+    pass
+
+
+class ImageStats:
+    # Running totals across uploads, to see what downscaling saves.
+
+    def __init__(self):
+        self.images = 0
+        self.bytes_received = 0
+        self.bytes_sent = 0
+        self.stage_seconds = {}
+
+    def record(self, received: int, sent: int):
+        self.images += 1
+        self.bytes_received += received
+        self.bytes_sent += sent
+
+    def record_stage(self, stage: str, seconds: float):
+        self.stage_seconds[stage] = self.stage_seconds.get(stage, 0.0) + seconds
+
+    def clear(self):
+        self.__init__()
+
+    def stats(self):
+        return {
+            "images": self.images,
+            "bytes_received": self.bytes_received,
+            "bytes_sent": self.bytes_sent,
+            "bytes_saved": self.bytes_received - self.bytes_sent,
+            "stage_seconds": dict(self.stage_seconds),
+        }
+
+
+image_stats = ImageStats()
+
+
+class UploadLimitMiddleware:
+    # Caps the request body of the upload routes before Starlette parses the
+    # form and spools the files: a Content-Length over the limit is refused
+    # without reading the body, and a chunked body is counted as it arrives
+    # and cut off once it passes the limit. `limits` maps paths to bytes.
+
+    def __init__(self, app, limits: dict):
+        self.app = app
+        self.limits = limits
+
+    async def __call__(self, scope, receive, send):
+        limit = self.limits.get(scope["path"]) if scope["type"] == "http" else None
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+
+        detail = f"Request body is larger than {limit} bytes"
+        content_length = dict(scope["headers"]).get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > limit:
+            await JSONResponse({"detail": detail}, status_code=413)(scope, receive, send)
+            return
+
+        received = 0
+
+        async def receive_within_limit():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    raise HTTPException(status_code=413, detail=detail)
+            return message
+
+        await self.app(scope, receive_within_limit, send)
+
+
+async def read_upload(file: UploadFile, max_bytes: int = UPLOAD_MAX_BYTES) -> bytes:
+    # Reads the spooled upload in chunks and stops as soon as it passes the
+    # limit, instead of pulling an arbitrarily large file into memory. This
+    # checks each file of a batch; UploadLimitMiddleware has already capped
+    # the whole request before it was parsed.
+    if file.size is not None and file.size > max_bytes:
+        raise ImageTooLargeError(f"Image is larger than {max_bytes} bytes")
+
+    buffer = bytearray()
+    while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+        buffer += chunk
+        if len(buffer) > max_bytes:
+            raise ImageTooLargeError(f"Image is larger than {max_bytes} bytes")
+    return bytes(buffer)
+
+
+def downscale_image(contents: bytes, max_side: int = OCR_MAX_SIDE, quality: int = OCR_JPEG_QUALITY) -> bytes:
+    # Returns the original bytes when they are not a decodable image, are
+    # already small enough, or would not shrink by re-encoding. Pillow is
+    # imported on the first upload, not at startup.
+    from PIL import Image, ImageOps, UnidentifiedImageError
+
+    try:
+        with Image.open(BytesIO(contents)) as image:
+            if max(image.size) <= max_side:
+                return contents
+
+            # Lets the JPEG decoder skip detail we are about to throw away.
+            image.draft("RGB", (max_side, max_side))
+            image = ImageOps.exif_transpose(image)
+            image.thumbnail((max_side, max_side))
+
+            output = BytesIO()
+            image.convert("RGB").save(output, "JPEG",
+                                      quality=quality, optimize=True)
+    except (UnidentifiedImageError, OSError, ValueError):
+        return contents
+
+    downscaled = output.getvalue()
+    return downscaled if len(downscaled) < len(contents) else contents
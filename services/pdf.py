@@ -0,0 +1,110 @@
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+
+from routers.models import CarAndDamageResponse
+from services.metrics import pdf_render_duration, pdf_render_total
+
+PDF_RENDER_WORKERS = int(os.getenv("PDF_RENDER_WORKERS", "2"))
+# Renders waiting for a worker beyond this are held back in the event loop
+# instead of piling up pickled payloads in the executor queue.
+PDF_RENDER_MAX_PENDING = int(
+    os.getenv("PDF_RENDER_MAX_PENDING", str(max(PDF_RENDER_WORKERS, 1) * 4)))
+
+PAGE_MARGIN_BOTTOM = 60
+DAMAGE_BLOCK_HEIGHT = 60
+
+_render_pool = None
+_render_slots = None
+
+
+def _draw_page_number(c, page: int):
+    c.drawString(500, 30, f"Page {page}")
+
+
+def create_pdf(data: CarAndDamageResponse):
+    # Imported here, in the render workers, rather than when the app starts.
+    from reportlab.lib.pagesizes import letter
+    from reportlab.pdfgen import canvas
+
+    buffer = BytesIO()
+    c = canvas.Canvas(buffer, pagesize=letter)
+    width, height = letter
+    page = 1
+
+    c.drawString(100, height - 40, f"Car Details:")
+    c.drawString(100, height - 60, f"License Plate: {data.car.license_plate}")
+    c.drawString(100, height - 80, f"Model: {data.car.model}")
+    c.drawString(100, height - 100, f"Color: {data.car.color}")
+    c.drawString(100, height - 120, f"VIN Number: {data.car.vin_number}")
+    c.drawString(100, height - 140, f"Brand: {data.car.brand}")
+
+    c.drawString(100, height - 180, f"Damages:")
+    y_position = height - 200
+    for damage in data.damages:
+        if y_position - 40 < PAGE_MARGIN_BOTTOM:
+            _draw_page_number(c, page)
+            c.showPage()
+            page += 1
+            c.drawString(100, height - 40,
+                         f"Damages (continued) - {data.car.license_plate}:")
+            y_position = height - 60
+
+        c.drawString(100, y_position, f"Damage Type: {damage.damage_type}")
+        c.drawString(100, y_position - 20,
+                     f"Damaged Part: {damage.damaged_part}")
+        c.drawString(100, y_position - 40, f"Date: {damage.date}")
+        y_position -= DAMAGE_BLOCK_HEIGHT
+
+    _draw_page_number(c, page)
+    c.save()
+    buffer.seek(0)
+    return buffer.getvalue()
+
+
+def timed_create_pdf(data: CarAndDamageResponse):
+    # Timed inside the worker, so queueing for a free worker is not counted.
+    started = time.perf_counter()
+    pdf_bytes = create_pdf(data)
+    return pdf_bytes, time.perf_counter() - started
+
+
+def get_render_pool():
+    global _render_pool, _render_slots
+    if _render_pool is None:
+        # spawn, not fork: the parent holds an event loop, threads and
+        # pooled DB connections that must not be duplicated into workers.
+        _render_pool = ProcessPoolExecutor(
+            max_workers=PDF_RENDER_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"))
+        _render_slots = asyncio.Semaphore(PDF_RENDER_MAX_PENDING)
+    return _render_pool
+
+
+async def render_pdf(data: CarAndDamageResponse):
+    # ReportLab is mostly pure Python, so rendering on a thread would still
+    # compete with the event loop for the GIL. PDF_RENDER_WORKERS=0 falls
+    # back to a thread, e.g. where worker processes are not allowed.
+    started = time.perf_counter()
+    if PDF_RENDER_WORKERS <= 0:
+        pdf_bytes, rendering = await asyncio.to_thread(timed_create_pdf, data)
+    else:
+        pool = get_render_pool()
+        async with _render_slots:
+            pdf_bytes, rendering = await asyncio.get_running_loop().run_in_executor(
+                pool, timed_create_pdf, data)
+
+    pdf_render_duration.observe(rendering)
+    pdf_render_total.observe(time.perf_counter() - started)
+    return pdf_bytes
+
+
+def shutdown_render_pool():
+    global _render_pool, _render_slots
+    if _render_pool is not None:
+        _render_pool.shutdown(wait=True)
+        _render_pool = None
+        _render_slots = None
@@ -0,0 +1,124 @@
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+PLATE_CACHE_MAX_ENTRIES = int(os.getenv("PLATE_CACHE_MAX_ENTRIES", "10000"))
+# Unset keeps the cache in memory only; a file path adds a SQLite tier
+# that survives restarts.
+PLATE_CACHE_PATH = os.getenv("PLATE_CACHE_PATH")
+
+
+class PlateCache:
+    # Recognised plates keyed by the SHA-256 of the image bytes. Lookups go
+    # to the in-memory LRU first, then to the optional SQLite file, and
+    # disk hits are promoted back into memory.
+
+    def __init__(self, max_entries: int = PLATE_CACHE_MAX_ENTRIES, path: str = PLATE_CACHE_PATH):
+        self.max_entries = max_entries
+        self.path = path
+        self._entries = OrderedDict()
+        self._db = None
+        self._db_lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.bypasses = 0
+
+    @staticmethod
+    def key(contents: bytes) -> str:
+        return hashlib.sha256(contents).hexdigest()
+
+    def _remember(self, key: str, license_plate: str):
+        self._entries[key] = license_plate
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _connection(self) -> sqlite3.Connection:
+        # Opened on first use so that a preloaded app does not hand one
+        # SQLite connection to every forked worker. Callers hold _db_lock.
+        if self._db is None:
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS plates ("
+                "image_hash TEXT PRIMARY KEY, license_plate TEXT NOT NULL, created_at REAL NOT NULL)")
+            self._db.commit()
+        return self._db
+
+    def _read_disk(self, key: str) -> Optional[str]:
+        with self._db_lock:
+            row = self._connection().execute(
+                "SELECT license_plate FROM plates WHERE image_hash = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _write_disk(self, key: str, license_plate: str):
+        with self._db_lock:
+            db = self._connection()
+            db.execute(
+                "INSERT OR REPLACE INTO plates (image_hash, license_plate, created_at) VALUES (?, ?, ?)",
+                (key, license_plate, time.time()))
+            db.commit()
+
+    async def get(self, key: str) -> Optional[str]:
+        license_plate = self._entries.get(key)
+        if license_plate is not None:
+            self._entries.move_to_end(key)
+            self.memory_hits += 1
+            return license_plate
+
+        if self.path:
+            license_plate = await asyncio.to_thread(self._read_disk, key)
+            if license_plate is not None:
+                self._remember(key, license_plate)
+                self.disk_hits += 1
+                return license_plate
+
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, license_plate: str):
+        self._remember(key, license_plate)
+        if self.path:
+            await asyncio.to_thread(self._write_disk, key, license_plate)
+
+    def record_bypass(self):
+        self.bypasses += 1
+
+    def clear(self):
+        self._entries.clear()
+        if self.path:
+            with self._db_lock:
+                db = self._connection()
+                db.execute("DELETE FROM plates")
+                db.commit()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.bypasses = 0
+
+    def close(self):
+        with self._db_lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def stats(self):
+        hits = self.memory_hits + self.disk_hits
+        lookups = hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "persistent": bool(self.path),
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "bypasses": self.bypasses,
+            "hit_rate": hits / lookups if lookups else 0.0,
+        }
+
+
+plate_cache = PlateCache()
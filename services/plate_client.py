@@ -0,0 +1,127 @@
+import asyncio
+import base64
+import logging
+import os
+import random
+
+EXTERNAL_API_URL = os.getenv(
+    "EXTERNAL_API_URL", "https://gatiosoft.ro/platebber.aspx")
+
+PLATE_API_CONNECT_TIMEOUT = float(os.getenv("PLATE_API_CONNECT_TIMEOUT", "3"))
+PLATE_API_READ_TIMEOUT = float(os.getenv("PLATE_API_READ_TIMEOUT", "10"))
+PLATE_API_RETRIES = int(os.getenv("PLATE_API_RETRIES", "2"))
+PLATE_API_BACKOFF = float(os.getenv("PLATE_API_BACKOFF", "0.2"))
+PLATE_API_MAX_IN_FLIGHT = int(os.getenv("PLATE_API_MAX_IN_FLIGHT", "16"))
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+_plate_client = None
+
+
+class PlateApiError(Exception):
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+class PlateRecognitionClient:
+    # One long-lived AsyncClient per process keeps TLS connections to the
+    # plate service alive between requests; the semaphore caps how many
+    # calls are in flight so a slow upstream cannot soak up every request.
+
+    def __init__(
+        self,
+        url: str = EXTERNAL_API_URL,
+        username: str = None,
+        password: str = None,
+        connect_timeout: float = PLATE_API_CONNECT_TIMEOUT,
+        read_timeout: float = PLATE_API_READ_TIMEOUT,
+        retries: int = PLATE_API_RETRIES,
+        backoff: float = PLATE_API_BACKOFF,
+        max_in_flight: int = PLATE_API_MAX_IN_FLIGHT,
+        transport=None
+    ):
+        # httpx is imported with the first client, not at startup.
+        import httpx
+
+        self.url = url
+        self.retries = retries
+        self.backoff = backoff
+        self.max_in_flight = max_in_flight
+        self._in_flight = asyncio.Semaphore(max_in_flight)
+
+        auth = f'{username}:{password}'.encode('utf-8')
+        self.client = httpx.AsyncClient(
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            limits=httpx.Limits(max_connections=max_in_flight,
+                                max_keepalive_connections=max_in_flight),
+            headers={
+                "Authorization": f"Basic {base64.b64encode(auth).decode('utf-8')}",
+                'Accept': 'application/json'
+            },
+            transport=transport
+        )
+
+    def _backoff_delay(self, attempt: int):
+        # Full jitter keeps retries from many workers from arriving in sync.
+        return random.uniform(0, self.backoff * 2 ** attempt)
+
+    async def _post(self, payload: dict):
+        import httpx
+
+        for attempt in range(self.retries + 1):
+            last_attempt = attempt == self.retries
+            try:
+                response = await self.client.post(self.url, json=payload)
+            except httpx.TimeoutException as e:
+                if last_attempt:
+                    raise PlateApiError(504, f"Plate API timed out: {e!r}")
+            except httpx.TransportError as e:
+                if last_attempt:
+                    raise PlateApiError(502, f"Plate API unreachable: {e!r}")
+            else:
+                if response.status_code == 200:
+                    return response.json()
+                if last_attempt or response.status_code not in RETRYABLE_STATUS_CODES:
+                    raise PlateApiError(
+                        response.status_code, f"Plate API returned {response.status_code}")
+
+            delay = self._backoff_delay(attempt)
+            logging.warning(
+                f"Plate API call failed, retry {attempt + 1} in {delay:.2f}s")
+            await asyncio.sleep(delay)
+
+    async def recognise(self, contents: bytes):
+        payload = {
+            "base64ImageString": base64.b64encode(contents).decode('utf-8'),
+            "languageCode": "auto",
+            "plate_output": "yes"
+        }
+        async with self._in_flight:
+            return await self._post(payload)
+
+    async def aclose(self):
+        await self.client.aclose()
+
+
+def get_plate_client():
+    global _plate_client
+    if _plate_client is None:
+        _plate_client = PlateRecognitionClient(
+            username=os.getenv('USERNAME'), password=os.getenv('PASSWORD'))
+    return _plate_client
+
+
+def set_plate_client(client: PlateRecognitionClient):
+    global _plate_client
+    _plate_client = client
+
+
+async def close_plate_client():
+    # The next get_plate_client builds a fresh client, bound to whichever
+    # event loop is running by then.
+    global _plate_client
+    if _plate_client is not None:
+        await _plate_client.aclose()
+        _plate_client = None
@@ -0,0 +1,205 @@
+import asyncio
+import itertools
+import logging
+import os
+import re
+import string
+import time
+from typing import Optional
+
+from sqlalchemy import select
+
+from database.models import CarData
+from database.versions import get_versions
+
+PLATE_MATCH_MAX_COST = float(os.getenv("PLATE_MATCH_MAX_COST", "1.5"))
+
+# Characters OCR mixes up, grouped; every group collapses to its first
+# member, so "8O1" and "B0I" share one canonical key.
+CONFUSABLE_GROUPS = ["0ODQ", "1IL", "2Z", "5S", "6G", "8B"]
+CONFUSABLE_COST = 0.2
+
+_CANONICAL = {ch: group[0] for group in CONFUSABLE_GROUPS for ch in group}
+_CANONICAL_TABLE = str.maketrans(_CANONICAL)
+CANONICAL_ALPHABET = sorted({_CANONICAL.get(ch, ch) for ch in string.ascii_uppercase + string.digits})
+_NON_ALNUM = re.compile(r'[^A-Z0-9]')
+
+
+def normalise(text: str) -> str:
+    return _NON_ALNUM.sub('', text.upper())
+
+
+def canonical(plate: str) -> str:
+    return plate.translate(_CANONICAL_TABLE)
+
+
+def substitution_cost(a: str, b: str) -> float:
+    if a == b:
+        return 0.0
+    return CONFUSABLE_COST if _CANONICAL.get(a, a) == _CANONICAL.get(b, b) else 1.0
+
+
+# Only the cheap pairs are stored; anything else costs a full edit.
+_SUBSTITUTION_COSTS = {(a, b): substitution_cost(a, b)
+                       for group in CONFUSABLE_GROUPS for a in group for b in group}
+
+
+def plate_distance(a: str, b: str) -> float:
+    # Levenshtein distance where swapping confusable characters is cheap.
+    costs = _SUBSTITUTION_COSTS
+    if len(a) == len(b):
+        # Position by position is exact while it stays under 2: any
+        # alignment that shifts characters pays two indels. Big canonical
+        # buckets (O/D/Q/0, I/L/1 plates) are all same-length, so this is
+        # the path that matters.
+        cost = sum(0 if ch_a == ch_b else costs.get((ch_a, ch_b), 1) for ch_a, ch_b in zip(a, b))
+        if cost < 2:
+            return cost
+    elif abs(len(a) - len(b)) == 1:
+        # One character dropped or added: the best single gap, found from
+        # running prefix and suffix costs, is exact while it stays under 3.
+        longer, shorter = (a, b) if len(a) > len(b) else (b, a)
+        pairs = [0 if ch_l == ch_s else costs.get((ch_l, ch_s), 1) for ch_l, ch_s in zip(longer, shorter)]
+        shifted = [0 if ch_l == ch_s else costs.get((ch_l, ch_s), 1) for ch_l, ch_s in zip(longer[1:], shorter)]
+        prefix = [0, *itertools.accumulate(pairs)]
+        suffix = [*itertools.accumulate(reversed(shifted))][::-1] + [0]
+        cost = 1 + min(p + q for p, q in zip(prefix, suffix))
+        if cost < 3:
+            return cost
+    previous = list(range(len(b) + 1))
+    for i, ch_a in enumerate(a, 1):
+        current = [i]
+        for j, ch_b in enumerate(b, 1):
+            substitution = 0 if ch_a == ch_b else costs.get((ch_a, ch_b), 1)
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + substitution))
+        previous = current
+    return previous[-1]
+
+
+def edits1(key: str) -> set:
+    # Every string one insertion, deletion or substitution away, over the
+    # canonical alphabet: about 55 * len(key) keys.
+    splits = [(key[:i], key[i:]) for i in range(len(key) + 1)]
+    variants = {left + right[1:] for left, right in splits if right}
+    variants.update([left + ch + right[1:] for left, right in splits if right for ch in CANONICAL_ALPHABET])
+    variants.update([left + ch + right for left, right in splits for ch in CANONICAL_ALPHABET])
+    return variants
+
+
+class PlateIndex:
+    # Maps canonical keys to the real plates behind them. Any number of
+    # confusable swaps is a single lookup, one further real edit is found by
+    # probing the query's one-edit neighbours, and candidates are ranked by
+    # plate_distance. Memory is one dict entry per car.
+
+    def __init__(self, max_cost: float = PLATE_MATCH_MAX_COST):
+        self.max_cost = max_cost
+        self._plates = {}
+        self.version = None
+        self._refresh_lock = asyncio.Lock()
+
+    def __len__(self):
+        return sum(1 if isinstance(plates, str) else len(plates) for plates in self._plates.values())
+
+    def add(self, plate: str):
+        key = canonical(normalise(plate))
+        existing = self._plates.get(key)
+        # A bare string for the common single-plate key keeps a million
+        # entries from each carrying a set.
+        if existing is None or existing == plate:
+            self._plates[key] = plate
+        elif isinstance(existing, str):
+            self._plates[key] = {existing, plate}
+        else:
+            existing.add(plate)
+
+    def remove(self, plate: str):
+        key = canonical(normalise(plate))
+        existing = self._plates.get(key)
+        if existing == plate:
+            del self._plates[key]
+        elif isinstance(existing, set):
+            existing.discard(plate)
+            if len(existing) == 1:
+                self._plates[key] = existing.pop()
+
+    def _plates_for(self, key: str):
+        plates = self._plates.get(key)
+        if plates is None:
+            return ()
+        return (plates,) if isinstance(plates, str) else plates
+
+    def search(self, text: Optional[str], limit: int = 5):
+        query = normalise(text or "")
+        if not query:
+            return []
+        key = canonical(query)
+
+        # Intersecting with the dict's key view runs in C, which is what
+        # keeps a few hundred probes well under a millisecond.
+        variants = edits1(key)
+        variants.add(key)
+        costs = {}
+        for candidate_key in self._plates.keys() & variants:
+            for plate in self._plates_for(candidate_key):
+                costs[plate] = plate_distance(query, normalise(plate))
+
+        ranked = sorted((cost, plate) for plate, cost in costs.items() if cost <= self.max_cost)
+        return [(plate, round(cost, 2)) for cost, plate in ranked[:limit]]
+
+    def clear(self):
+        self._plates = {}
+        self.version = None
+
+    def _build(self, plates):
+        index = PlateIndex(self.max_cost)
+        for plate in plates:
+            index.add(plate)
+        return index._plates
+
+    async def refresh(self, db_session):
+        version, = await get_versions(db_session, "cars")
+        started = time.perf_counter()
+        result = await db_session.execute(select(CarData.license_plate))
+        plates = result.scalars().all()
+
+        # Building the dict takes seconds for a million plates; on a thread
+        # the event loop keeps serving other requests meanwhile.
+        self._plates = await asyncio.to_thread(self._build, plates)
+        self.version = version
+        logging.info(f"Plate index loaded {len(self._plates)} keys in {time.perf_counter() - started:.2f}s")
+
+    async def sync(self, db_session):
+        # Reloads when cars changed behind this process's back, e.g. through
+        # another worker or a bulk load; this process's own writes are
+        # applied incrementally and acknowledged by advance().
+        version, = await get_versions(db_session, "cars")
+        if version == self.version:
+            return
+        # While another request reloads, a loaded index is searched as it
+        # is rather than waiting; only the very first load is waited for.
+        if self._refresh_lock.locked() and self.version is not None:
+            return
+        async with self._refresh_lock:
+            if version != self.version:
+                await self.refresh(db_session)
+
+    async def advance(self, db_session):
+        # Called after this process applied its own committed write. If that
+        # write is the only change since the last sync, the index is still
+        # complete; otherwise the next sync reloads.
+        if self.version is None:
+            return
+        version, = await get_versions(db_session, "cars")
+        if version == self.version + 1:
+            self.version = version
+
+
+def best_match(candidates):
+    # Only an unambiguous winner is used in place of what OCR read.
+    if not candidates or (len(candidates) > 1 and candidates[0][1] == candidates[1][1]):
+        return None
+    return candidates[0][0]
+
+
+plate_index = PlateIndex()
@@ -0,0 +1,66 @@
+# Offline stand-in for the plate recognition API.
+#
+# Use it in-process through httpx.ASGITransport, or run it as a local server
+# and point EXTERNAL_API_URL at it:
+#
+#   python -m services.plate_stub --port 9000 --latency 0.3
+#   EXTERNAL_API_URL=http://127.0.0.1:9000/platebber.aspx uvicorn main:app
+
+import argparse
+import asyncio
+import base64
+
+import httpx
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+
+def create_stub_app(plate_text="ABC123", latency: float = 0.0, fail_first: int = 0, fail_status: int = 503):
+    # plate_text may be a callable that maps the uploaded image bytes to a
+    # plate, e.g. lambda image: image.decode() for text "images" in tests.
+    app = FastAPI()
+    app.state.calls = 0
+    app.state.in_flight = 0
+    app.state.max_in_flight = 0
+
+    @app.post("/platebber.aspx")
+    async def recognise(request: Request):
+        app.state.calls += 1
+        app.state.in_flight += 1
+        app.state.max_in_flight = max(
+            app.state.max_in_flight, app.state.in_flight)
+        try:
+            await asyncio.sleep(latency)
+            if app.state.calls <= fail_first:
+                return JSONResponse(status_code=fail_status, content={"detail": "stub failure"})
+
+            body = await request.json()
+            image = base64.b64decode(body["base64ImageString"])
+            text = plate_text(image) if callable(plate_text) else plate_text
+            return [{"plate_text": text}]
+        finally:
+            app.state.in_flight -= 1
+
+    return app
+
+
+def create_stub_transport(**kwargs):
+    return httpx.ASGITransport(app=create_stub_app(**kwargs))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--plate", default="ABC123")
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--fail-first", type=int, default=0)
+    args = parser.parse_args()
+
+    uvicorn.run(create_stub_app(args.plate, args.latency, args.fail_first),
+                host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+import asyncio
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+# Empty disables the cache; every report is rendered again.
+REPORT_CACHE_DIR = os.getenv(
+    "REPORT_CACHE_DIR", os.path.join(tempfile.gettempdir(), "car-damage-reports"))
+REPORT_CACHE_MAX_BYTES = int(os.getenv("REPORT_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+
+
+class ReportCache:
+    # Rendered PDFs on local disk, one file per (plate, report_version).
+    # A car's report_version changes with every write that changes its
+    # report, so entries never need invalidating: stale ones just stop being
+    # asked for and age out. Files are evicted least recently used first
+    # once they add up to more than max_bytes. Recency is kept in memory and
+    # mirrored to file mtimes, so it survives restarts; workers sharing the
+    # directory each evict by their own view, which can briefly overshoot.
+
+    def __init__(self, directory: str = REPORT_CACHE_DIR, max_bytes: int = REPORT_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._files = None
+        self._latest = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.directory) and self.max_bytes > 0
+
+    @staticmethod
+    def _prefix(license_plate: str) -> str:
+        # Plates are user input; hashing keeps them out of file paths.
+        return hashlib.sha256(license_plate.encode("utf-8")).hexdigest()[:32]
+
+    def path(self, license_plate: str, version: int) -> str:
+        return os.path.join(self.directory, f"{self._prefix(license_plate)}-{version}.pdf")
+
+    def _load(self):
+        # Called with the lock held. Oldest first, by mtime.
+        if self._files is not None:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".pdf") and entry.is_file():
+                stat = entry.stat()
+                entries.append((stat.st_mtime, entry.path, stat.st_size))
+        self._files = OrderedDict((path, size) for _, path, size in sorted(entries))
+        self._latest = {os.path.basename(path).split("-")[0]: path for path in self._files}
+        self._bytes = sum(self._files.values())
+
+    def _forget(self, path: str):
+        self._bytes -= self._files.pop(path, 0)
+        prefix = os.path.basename(path).split("-")[0]
+        if self._latest.get(prefix) == path:
+            del self._latest[prefix]
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+    def _get(self, license_plate: str, version: int) -> Optional[str]:
+        path = self.path(license_plate, version)
+        with self._lock:
+            self._load()
+            if path not in self._files and os.path.isfile(path):
+                # Written by another worker sharing the directory.
+                self._files[path] = os.path.getsize(path)
+                self._bytes += self._files[path]
+                self._latest[self._prefix(license_plate)] = path
+            if path not in self._files:
+                self.misses += 1
+                return None
+            self._files.move_to_end(path)
+            self.hits += 1
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            # Evicted by another worker since.
+            with self._lock:
+                self._forget(path)
+                self.hits -= 1
+                self.misses += 1
+            return None
+        return path
+
+    def _put(self, license_plate: str, version: int, pdf_bytes: bytes) -> str:
+        path = self.path(license_plate, version)
+        prefix = self._prefix(license_plate)
+        with self._lock:
+            self._load()
+        # Written under a temporary name and renamed, so readers never see
+        # a partial file.
+        fd, temporary = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(pdf_bytes)
+        os.replace(temporary, path)
+
+        with self._lock:
+            # The previous version of the same car can no longer be asked for.
+            previous = self._latest.get(prefix)
+            if previous is not None and previous != path:
+                self._forget(previous)
+            self._bytes += len(pdf_bytes) - self._files.pop(path, 0)
+            self._files[path] = len(pdf_bytes)
+            self._latest[prefix] = path
+            while self._bytes > self.max_bytes and len(self._files) > 1:
+                oldest = next(iter(self._files))
+                self._forget(oldest)
+                self.evictions += 1
+        return path
+
+    def _discard(self, license_plate: str):
+        with self._lock:
+            self._load()
+            path = self._latest.get(self._prefix(license_plate))
+            if path is not None:
+                self._forget(path)
+
+    async def get(self, license_plate: str, version: int) -> Optional[str]:
+        if not self.enabled:
+            return None
+        return await asyncio.to_thread(self._get, license_plate, version)
+
+    async def put(self, license_plate: str, version: int, pdf_bytes: bytes) -> Optional[str]:
+        if not self.enabled:
+            return None
+        return await asyncio.to_thread(self._put, license_plate, version, pdf_bytes)
+
+    async def discard(self, license_plate: str):
+        if self.enabled:
+            await asyncio.to_thread(self._discard, license_plate)
+
+    def clear(self):
+        with self._lock:
+            if self._files is not None:
+                for path in list(self._files):
+                    self._forget(path)
+            self._files = None
+            self._latest = {}
+            self._bytes = 0
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "directory": self.directory,
+            "entries": len(self._files or ()),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+report_cache = ReportCache()
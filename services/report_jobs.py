@@ -0,0 +1,167 @@
+import asyncio
+import logging
+import os
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from fastapi import HTTPException
+
+from services.metrics import GaugeCallback, registry, report_job_duration, report_job_wait
+
+REPORT_JOB_WORKERS = int(os.getenv("REPORT_JOB_WORKERS", "4"))
+# Queued jobs hold their upload in memory until a worker takes them.
+REPORT_JOB_MAX_QUEUED = int(os.getenv("REPORT_JOB_MAX_QUEUED", "100"))
+REPORT_JOB_TTL = float(os.getenv("REPORT_JOB_TTL", "600"))
+
+JOB_STATES = ("queued", "running", "done", "failed")
+
+
+class QueueFullError(Exception):
+    pass
+
+
+class ReportJob:
+    def __init__(self, run):
+        self.id = uuid.uuid4().hex
+        self.status = "queued"
+        self.run = run
+        self.result = None
+        self.status_code = None
+        self.detail = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+    def describe(self):
+        def timestamp(value):
+            return datetime.fromtimestamp(value, timezone.utc) if value is not None else None
+
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "created_at": timestamp(self.created_at),
+            "started_at": timestamp(self.started_at),
+            "finished_at": timestamp(self.finished_at),
+            "status_code": self.status_code,
+            "detail": self.detail,
+        }
+
+
+class ReportJobQueue:
+    # In-process queue served by a fixed number of worker tasks. Jobs are
+    # coroutine factories; what they return is kept as the result until
+    # ttl seconds after they finish. Jobs live in this process only, so
+    # behind several workers a job must be polled on the worker that took
+    # it (sticky sessions), and a restart drops unfinished jobs.
+
+    def __init__(self, workers: int = REPORT_JOB_WORKERS, max_queued: int = REPORT_JOB_MAX_QUEUED,
+                 ttl: float = REPORT_JOB_TTL):
+        self.workers = workers
+        self.max_queued = max_queued
+        self.ttl = ttl
+        self._jobs = OrderedDict()
+        self._queue = None
+        self._tasks = []
+        self._loop = None
+        self.busy = 0
+
+    def _ensure_workers(self):
+        # Workers belong to the running event loop; a new loop (a restart
+        # in tests, say) gets a fresh queue and fresh workers.
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+        for job in self._jobs.values():
+            if job.finished_at is None:
+                job.status, job.status_code, job.detail = "failed", 500, "Worker restarted"
+                job.finished_at = time.time()
+                job.run = None
+        self._loop = loop
+        self._queue = asyncio.Queue()
+        self.busy = 0
+        self._tasks = [loop.create_task(self._work()) for _ in range(self.workers)]
+
+    def _expire(self):
+        cutoff = time.time() - self.ttl
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job.finished_at is not None and job.finished_at < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def submit(self, run) -> ReportJob:
+        self._ensure_workers()
+        self._expire()
+        if self._queue.qsize() >= self.max_queued:
+            raise QueueFullError(f"At most {self.max_queued} report jobs can wait")
+
+        job = ReportJob(run)
+        self._jobs[job.id] = job
+        self._queue.put_nowait(job)
+        return job
+
+    def get(self, job_id: str):
+        self._expire()
+        return self._jobs.get(job_id)
+
+    async def _work(self):
+        while True:
+            job = await self._queue.get()
+            self.busy += 1
+            job.status = "running"
+            job.started_at = time.time()
+            report_job_wait.observe(job.started_at - job.created_at)
+            try:
+                job.result = await job.run()
+                job.status = "done"
+                job.status_code = 200
+            except HTTPException as e:
+                job.status = "failed"
+                job.status_code = e.status_code
+                job.detail = e.detail
+            except Exception as e:
+                logging.error(f"Report job {job.id} failed: {e}")
+                job.status = "failed"
+                job.status_code = 500
+                job.detail = "Internal Server Error"
+            finally:
+                job.finished_at = time.time()
+                # Drops the upload the job was holding on to.
+                job.run = None
+                self.busy -= 1
+                report_job_duration.observe(job.finished_at - job.started_at, job.status)
+
+    async def shutdown(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._loop = None
+        self._queue = None
+
+    def counts(self):
+        counts = dict.fromkeys(JOB_STATES, 0)
+        for job in self._jobs.values():
+            counts[job.status] += 1
+        return counts
+
+    def stats(self):
+        return {
+            "workers": self.workers,
+            "busy_workers": self.busy,
+            "utilisation": self.busy / self.workers if self.workers else 0.0,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "max_queued": self.max_queued,
+            "jobs": self.counts(),
+        }
+
+
+report_jobs = ReportJobQueue()
+
+registry.register(GaugeCallback(
+    "report_jobs", "Report jobs known to this process by state", ("state",),
+    lambda: {(state,): count for state, count in report_jobs.counts().items()}))
+registry.register(GaugeCallback(
+    "report_job_workers", "Report job workers by state", ("state",),
+    lambda: {("busy",): report_jobs.busy, ("idle",): report_jobs.workers - report_jobs.busy}))
@@ -0,0 +1,39 @@
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _default(value):
+    return value.isoformat()
+
+
+def dumps(value) -> bytes:
+    # orjson writes dates as ISO strings natively, which is what Pydantic
+    # would produce for the same response model.
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, default=_default).encode("utf-8")
+
+
+def encode_car_rows(rows) -> bytes:
+    # rows: (license_plate, model, color, vin_number, brand), shaped like
+    # CarDataResponse.
+    return dumps([
+        {"license_plate": license_plate, "model": model, "color": color,
+         "vin_number": vin_number, "brand": brand}
+        for license_plate, model, color, vin_number, brand in rows
+    ])
+
+
+def encode_damage_rows(rows) -> bytes:
+    # rows: (id, license_plate, damage_type, damaged_part, date, model,
+    # color, vin_number, brand), shaped like DamageDataResponse.
+    return dumps([
+        {"damage_type": damage_type, "damaged_part": damaged_part, "date": damage_date,
+         "car": {"license_plate": license_plate, "model": model, "color": color,
+                 "vin_number": vin_number, "brand": brand}}
+        for _, license_plate, damage_type, damaged_part, damage_date, model, color, vin_number, brand in rows
+    ])
@@ -27,13 +27,16 @@ docker exec -i $DB_CONTAINER psql -U $DB_USER -d $DB_NAME -c "$TABLE_STRUCTURE"
 
 # Load the CSV data into the tables
 echo "Loading data from cars.csv..."
-docker exec -i $DB_CONTAINER psql -U $DB_USER -d $DB_NAME -c "\copy cars FROM STDIN WITH CSV HEADER" < $CARS_CSV_FILE
+docker exec -i $DB_CONTAINER psql -U $DB_USER -d $DB_NAME -c "\copy cars (license_plate, model, color, vin_number, brand) FROM STDIN WITH CSV HEADER" < $CARS_CSV_FILE
 
 echo "Loading data from damages.csv..."
-docker exec -i $DB_CONTAINER psql -U $DB_USER -d $DB_NAME -c "\copy damages FROM STDIN WITH CSV HEADER" < $DAMAGES_CSV_FILE
+docker exec -i $DB_CONTAINER psql -U $DB_USER -d $DB_NAME -c "\copy damages (id, license_plate, damage_type, damaged_part, date) FROM STDIN WITH CSV HEADER" < $DAMAGES_CSV_FILE
 
 # Run the additional query
 echo "Updating damages_id_seq sequence..."
 docker exec -i $DB_CONTAINER psql -U $DB_USER -d $DB_NAME -c "SELECT setval('damages_id_seq', (SELECT MAX(id) FROM damages));"
 
+echo "Building the damage analytics summary..."
+docker-compose exec -T web python -m database.analytics rebuild
+
 echo "Data loaded successfully."
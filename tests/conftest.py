@@ -1,12 +1,117 @@
 # test_app.py
 
+import asyncio
+import httpx
 import pytest
-from unittest.mock import patch
+from unittest.mock import AsyncMock, MagicMock, patch
 
 from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+
 from main import app
+from database.database import get_db_session, get_session_factory
+from database.models import Base
+from services.cache import result_cache
+from services.plate_cache import plate_cache
+from services.plate_client import PlateRecognitionClient, get_plate_client, set_plate_client
+from services.image import image_stats
+from services.plate_index import plate_index
+from services.report_cache import report_cache
+from services.plate_stub import create_stub_app
 
 
 @pytest.fixture
 def test_client():
     yield TestClient(app)
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    asyncio.run(result_cache.clear())
+    plate_cache.clear()
+    image_stats.clear()
+    plate_index.clear()
+    yield
+
+
+@pytest.fixture(autouse=True)
+def report_cache_dir(tmp_path):
+    # Rendered reports go to a fresh directory per test.
+    previous = report_cache.directory
+    report_cache.clear()
+    report_cache.directory = str(tmp_path / "reports")
+    yield report_cache.directory
+    report_cache.clear()
+    report_cache.directory = previous
+
+
+@pytest.fixture
+def mock_async_db_session():
+    # Table versions behind the ETags are read before the mocked query, so
+    # they are patched out rather than taken from session.execute.
+    async def get_versions(db_session, *table_names):
+        return [0] * len(table_names)
+
+    session = MagicMock(spec=AsyncSession)
+    session.execute.return_value = MagicMock()
+    app.dependency_overrides[get_db_session] = lambda: session
+    with patch("routers.car.get_versions", get_versions), \
+            patch("routers.damage.get_versions", get_versions):
+        yield session
+    app.dependency_overrides.pop(get_db_session, None)
+
+
+@pytest.fixture
+def mock_stream_result():
+    def make(partitions):
+        async def iter_partitions():
+            for partition in partitions:
+                yield partition
+
+        result = MagicMock()
+        result.partitions.side_effect = iter_partitions
+        result.close = AsyncMock()
+        return result
+
+    return make
+
+
+@pytest.fixture
+def sqlite_db(tmp_path):
+    # A file-backed SQLite database stands in for Postgres: the sync session
+    # seeds data, the routers read it through aiosqlite.
+    url = f"sqlite:///{tmp_path / 'test.db'}"
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+
+    async_engine = create_async_engine(
+        url.replace("sqlite://", "sqlite+aiosqlite://"), poolclass=NullPool)
+    async_session = async_sessionmaker(
+        bind=async_engine, expire_on_commit=False)
+
+    app.dependency_overrides[get_session_factory] = lambda: async_session
+    with sessionmaker(bind=engine)() as session:
+        yield session
+    app.dependency_overrides.pop(get_session_factory, None)
+    engine.dispose()
+
+
+@pytest.fixture
+def stub_plate_api():
+    # Installs a plate API client backed by the in-process stub; by default
+    # the stub reads the plate straight from the uploaded "image" bytes.
+    previous = get_plate_client()
+
+    def install(**kwargs):
+        kwargs.setdefault("plate_text", lambda image: image.decode())
+        stub_app = create_stub_app(**kwargs)
+        set_plate_client(PlateRecognitionClient(
+            url="http://plate-api/platebber.aspx", backoff=0,
+            transport=httpx.ASGITransport(app=stub_app)))
+        return stub_app
+
+    yield install
+    set_plate_client(previous)
@@ -0,0 +1,104 @@
+from datetime import date
+
+from database.models import CarData, DamageData, DamageSummary
+
+
+def summary_rows(session):
+    session.expire_all()
+    return sorted((row.damage_type, row.damaged_part, row.brand, row.month, row.damage_count)
+                  for row in session.query(DamageSummary))
+
+
+def seed_cars(session):
+    session.add(CarData(license_plate="ABC123", model="Civic", color="Red",
+                        vin_number="1HGFA16568L000001", brand="Honda"))
+    session.add(CarData(license_plate="XYZ789", model="Golf", color="Blue",
+                        vin_number="WVWZZZ1KZ8W000002", brand="Volkswagen"))
+    session.commit()
+
+
+def test_damage_analytics_groups_summary(test_client, sqlite_db):
+    seed_cars(sqlite_db)
+    for plate, damage_type, day in [("ABC123", "Dent", date(2022, 5, 1)),
+                                    ("ABC123", "Dent", date(2022, 5, 20)),
+                                    ("ABC123", "Scratch", date(2022, 6, 2)),
+                                    ("XYZ789", "Dent", date(2022, 6, 3))]:
+        response = test_client.post("/admin/damage", json={
+            "license_plate": plate, "damage_type": damage_type,
+            "damaged_part": "Bonnet", "date": day.isoformat()})
+        assert response.status_code == 200
+
+    response = test_client.get("/analytics/damage")
+    assert response.status_code == 200
+    assert response.json() == [
+        {"damage_type": "Dent", "damaged_part": "Bonnet", "brand": "Honda", "month": "2022-05-01", "count": 2},
+        {"damage_type": "Dent", "damaged_part": "Bonnet", "brand": "Volkswagen", "month": "2022-06-01", "count": 1},
+        {"damage_type": "Scratch", "damaged_part": "Bonnet", "brand": "Honda", "month": "2022-06-01", "count": 1},
+    ]
+
+    response = test_client.get(
+        "/analytics/damage?group_by=brand&month_from=2022-06-15")
+    assert response.json() == [
+        {"damage_type": None, "damaged_part": None, "brand": "Honda", "month": None, "count": 1},
+        {"damage_type": None, "damaged_part": None, "brand": "Volkswagen", "month": None, "count": 1},
+    ]
+
+
+def test_damage_summary_tracks_writes_and_matches_rebuild(test_client, sqlite_db):
+    seed_cars(sqlite_db)
+    test_client.post("/admin/damage/bulk", json=[
+        {"id": 1, "license_plate": "ABC123", "damage_type": "Dent",
+         "damaged_part": "Bonnet", "date": "2022-05-01"},
+        {"id": 2, "license_plate": "ABC123", "damage_type": "Dent",
+         "damaged_part": "Bonnet", "date": "2022-05-02"},
+        {"license_plate": "XYZ789", "damage_type": "Scratch",
+         "damaged_part": "Roof", "date": "2022-07-09"},
+    ])
+    # Overwrite id 2, delete id 1, re-brand a car, then remove another.
+    test_client.post("/admin/damage/bulk", json=[
+        {"id": 2, "license_plate": "ABC123", "damage_type": "Scratch",
+         "damaged_part": "Door", "date": "2022-06-02"}])
+    assert test_client.delete("/admin/damage/1").status_code == 200
+    test_client.post("/admin/cars/bulk", json=[
+        {"license_plate": "ABC123", "model": "Civic", "color": "Red",
+         "vin_number": "1HGFA16568L000001", "brand": "Acura"}])
+    test_client.post("/admin/damage", json={
+        "license_plate": "XYZ789", "damage_type": "Dent",
+        "damaged_part": "Roof", "date": "2022-07-30"})
+    assert test_client.delete("/admin/cars/XYZ789").status_code == 200
+
+    incremental = summary_rows(sqlite_db)
+    assert incremental == [("Scratch", "Door", "Acura", date(2022, 6, 1), 1)]
+
+    response = test_client.post("/admin/analytics/rebuild")
+    assert response.json() == {"detail": "Damage summary rebuilt", "groups": 1}
+    assert summary_rows(sqlite_db) == incremental
+
+
+def test_rebuild_backfills_rows_loaded_outside_the_api(test_client, sqlite_db):
+    seed_cars(sqlite_db)
+    for day in [1, 2, 3]:
+        sqlite_db.add(DamageData(license_plate="XYZ789", damage_type="Dent",
+                                 damaged_part="Roof", date=date(2023, 1, day)))
+    sqlite_db.commit()
+    assert test_client.get("/analytics/damage").json() == []
+
+    test_client.post("/admin/analytics/rebuild")
+
+    assert test_client.get("/analytics/damage?group_by=month&brand=Volkswagen").json() == [
+        {"damage_type": None, "damaged_part": None, "brand": None, "month": "2023-01-01", "count": 3}]
+
+
+def test_summary_writes_only_drop_the_keys_they_decrement(test_client, sqlite_db):
+    seed_cars(sqlite_db)
+    # A stale zero row this write has nothing to do with stays untouched.
+    sqlite_db.add(DamageSummary(damage_type="Dent", damaged_part="Roof", brand="Honda",
+                                month=date(2021, 1, 1), damage_count=0))
+    sqlite_db.commit()
+    test_client.post("/admin/damage/bulk", json=[
+        {"id": 1, "license_plate": "ABC123", "damage_type": "Dent",
+         "damaged_part": "Bonnet", "date": "2022-05-01"}])
+
+    assert test_client.delete("/admin/damage/1").status_code == 200
+
+    assert summary_rows(sqlite_db) == [("Dent", "Roof", "Honda", date(2021, 1, 1), 0)]
@@ -0,0 +1,170 @@
+import os
+from datetime import date
+from unittest.mock import patch
+
+import pytest
+
+from database.archive import damage_archive
+from database.models import CarData, DamageData
+from routers.report import build_car_report
+
+DAMAGES = [(1, "ABC123", "Dent", date(2020, 1, 5)),
+           (2, "XYZ789", "Scratch", date(2020, 1, 9)),
+           (3, "ABC123", "Scratch", date(2020, 2, 1)),
+           (4, "ABC123", "Dent", date(2023, 5, 1)),
+           (5, "XYZ789", "Dent", date(2023, 6, 1))]
+
+
+@pytest.fixture
+def archive_dir(tmp_path, monkeypatch):
+    directory = str(tmp_path / "archive")
+    monkeypatch.setattr(damage_archive, "directory", directory)
+    return directory
+
+
+@pytest.fixture
+def archived(test_client, sqlite_db, archive_dir):
+    sqlite_db.add(CarData(license_plate="ABC123", model="Civic", color="Red",
+                          vin_number="1HGFA16568L000001", brand="Honda"))
+    sqlite_db.add(CarData(license_plate="XYZ789", model="Golf", color="Blue",
+                          vin_number="WVWZZZ1KZ8W000002", brand="Volkswagen"))
+    sqlite_db.commit()
+    test_client.post("/admin/damage/bulk", json=[
+        {"id": damage_id, "license_plate": plate, "damage_type": damage_type,
+         "damaged_part": "Bonnet", "date": day.isoformat()}
+        for damage_id, plate, damage_type, day in DAMAGES])
+
+    response = test_client.post("/admin/damage/archive?before=2021-03-15")
+    assert response.status_code == 200
+    return response.json()
+
+
+def damage_dates(response):
+    return [damage["date"] for damage in response.json()]
+
+
+def test_archive_moves_old_months_to_parquet(archived, sqlite_db, archive_dir):
+    assert archived == {"before": "2021-03-15", "damages": 3, "months": [
+        {"month": "2020-01-01", "damages": 2}, {"month": "2020-02-01", "damages": 1}]}
+    assert sorted(os.listdir(archive_dir)) == ["damages-2020-01.parquet", "damages-2020-02.parquet"]
+    sqlite_db.expire_all()
+    assert sorted(damage.id for damage in sqlite_db.query(DamageData)) == [4, 5]
+
+
+def test_read_damage_data_merges_archived_months(test_client, archived):
+    assert damage_dates(test_client.get("/damage")) == [
+        "2023-05-01", "2023-06-01", "2020-01-05", "2020-01-09", "2020-02-01"]
+    assert damage_dates(test_client.get("/damage?limit=2&offset=3")) == ["2020-01-09", "2020-02-01"]
+    assert damage_dates(test_client.get("/damage?brand=Volkswagen&damage_type=Scratch")) == ["2020-01-09"]
+
+    response = test_client.get("/damage?license_plate=ABC123&date_to=2020-12-31")
+    assert response.json()[0]["car"]["model"] == "Civic"
+    assert damage_dates(response) == ["2020-01-05", "2020-02-01"]
+
+    with patch.object(damage_archive, "page") as page:
+        assert damage_dates(test_client.get("/damage?date_from=2022-01-01")) == ["2023-05-01", "2023-06-01"]
+    page.assert_not_called()
+
+
+def test_read_damage_data_cursor_walks_hot_and_archived(test_client, archived):
+    dates = []
+    cursor = ""
+    while cursor is not None:
+        response = test_client.get(f"/damage?limit=2&cursor={cursor}")
+        dates += damage_dates(response)
+        cursor = response.headers.get("X-Next-Cursor")
+
+    assert dates == ["2020-01-05", "2020-01-09", "2020-02-01", "2023-05-01", "2023-06-01"]
+
+
+def test_cursor_pages_only_read_months_from_the_cursor_on(test_client, archived):
+    pages = []
+    cursor = ""
+    with patch.object(damage_archive, "_read", wraps=damage_archive._read) as read:
+        while cursor is not None:
+            read.reset_mock()
+            response = test_client.get(f"/damage?limit=2&cursor={cursor}")
+            pages.append(sorted(os.path.basename(call.args[0]) for call in read.call_args_list))
+            cursor = response.headers.get("X-Next-Cursor")
+
+    assert pages == [["damages-2020-01.parquet"],
+                     ["damages-2020-01.parquet", "damages-2020-02.parquet"],
+                     []]
+
+
+def test_late_damages_are_merged_into_the_archived_month(test_client, archived, archive_dir):
+    test_client.post("/admin/damage", json={
+        "license_plate": "ABC123", "damage_type": "Dent",
+        "damaged_part": "Door", "date": "2020-01-20"})
+    assert len(test_client.get("/damage").json()) == 6
+
+    response = test_client.post("/admin/damage/archive?before=2021-01-01")
+    assert response.json()["damages"] == 1
+    assert len(os.listdir(archive_dir)) == 2
+    assert len(test_client.get("/damage").json()) == 6
+
+
+def test_report_includes_archived_damages(test_client, archived, stub_plate_api):
+    stub_plate_api()
+    with patch("routers.report.build_car_report", wraps=build_car_report) as build:
+        response = test_client.post("/generate-report", files={"file": ("car.jpg", b"ABC123")})
+
+    assert response.status_code == 200
+    car, damages = build.call_args.args
+    assert [damage.date for damage in damages] == [date(2020, 1, 5), date(2020, 2, 1), date(2023, 5, 1)]
+
+
+def test_batch_report_reads_the_archive_once(test_client, archived, stub_plate_api):
+    stub_plate_api()
+    with patch.object(damage_archive, "_for_plates", wraps=damage_archive._for_plates) as read, \
+            patch("routers.report.build_car_report", wraps=build_car_report) as build:
+        response = test_client.post("/generate-report/batch", files=[
+            ("files", ("abc.jpg", b"ABC123")), ("files", ("xyz.jpg", b"XYZ789"))])
+
+    assert response.status_code == 200
+    read.assert_called_once()
+    assert sorted(read.call_args.args[0]) == ["ABC123", "XYZ789"]
+    dates = {car.license_plate: [damage.date for damage in damages] for car, damages in
+             (call.args for call in build.call_args_list)}
+    assert dates == {"ABC123": [date(2020, 1, 5), date(2020, 2, 1), date(2023, 5, 1)],
+                     "XYZ789": [date(2020, 1, 9), date(2023, 6, 1)]}
+
+    # Reports now cached: the next batch does not read the archive at all.
+    with patch.object(damage_archive, "_for_plates") as read:
+        test_client.post("/generate-report/batch", files=[("files", ("abc.jpg", b"ABC123"))])
+    read.assert_not_called()
+
+
+def test_summary_keeps_archived_damages(test_client, archived):
+    def total():
+        return sum(row["count"] for row in test_client.get("/analytics/damage?group_by=brand").json())
+
+    assert total() == 5
+    test_client.post("/admin/analytics/rebuild")
+    assert total() == 5
+
+    response = test_client.post("/admin/cars/delete", json={"license_plates": ["ABC123"]})
+    assert response.json()["damages_deleted"] == 3
+    assert total() == 2
+    assert damage_dates(test_client.get("/damage")) == ["2023-06-01", "2020-01-09"]
+    test_client.post("/admin/analytics/rebuild")
+    assert total() == 2
+
+
+def test_archive_requires_a_directory(test_client):
+    response = test_client.post("/admin/damage/archive?before=2021-01-01")
+    assert response.status_code == 400
+
+
+def test_rebrand_moves_archived_damages_in_summary(test_client, archived):
+    def summary():
+        return sorted((row["brand"], row["count"])
+                      for row in test_client.get("/analytics/damage?group_by=brand").json())
+
+    test_client.post("/admin/cars/bulk", json=[
+        {"license_plate": "ABC123", "model": "Civic", "color": "Red",
+         "vin_number": "1HGFA16568L000001", "brand": "Acura"}])
+    incremental = summary()
+    test_client.post("/admin/analytics/rebuild")
+
+    assert incremental == summary() == [("Acura", 3), ("Volkswagen", 2)]
@@ -0,0 +1,50 @@
+import asyncio
+import pytest
+from unittest.mock import patch
+
+from services.cache import MemoryCacheBackend, ResultCache, normalise_params
+
+
+def test_normalise_params_ignores_order_and_whitespace():
+    assert normalise_params({"damaged_part": "Bonnet", "damage_type": "Scratch, Dent", "offset": 0}) == \
+        normalise_params({"damage_type": "Dent,Scratch", "damaged_part": "Bonnet ", "offset": 0})
+    assert normalise_params({"damage_type": None, "limit": 5}) == "limit=5"
+
+
+def test_memory_backend_evicts_least_recently_used():
+    async def run():
+        backend = MemoryCacheBackend(max_entries=2)
+        await backend.set("a", b"1", 60)
+        await backend.set("b", b"2", 60)
+        await backend.get("a")
+        await backend.set("c", b"3", 60)
+        return [await backend.get(key) for key in "abc"]
+
+    assert asyncio.run(run()) == [b"1", None, b"3"]
+
+
+def test_memory_backend_expires_entries():
+    async def run():
+        backend = MemoryCacheBackend()
+        with patch("services.cache.time.monotonic", return_value=100.0):
+            await backend.set("a", b"1", 10)
+        with patch("services.cache.time.monotonic", return_value=111.0):
+            return await backend.get("a"), len(backend)
+
+    assert asyncio.run(run()) == (None, 0)
+
+
+def test_result_cache_counts_hits_and_invalidates():
+    async def run():
+        cache = ResultCache(MemoryCacheBackend(), ttl=60)
+        assert await cache.get("damage", {"limit": 1}) is None
+        await cache.set("damage", {"limit": 1}, b"[]")
+        assert await cache.get("damage", {"limit": 1}) == b"[]"
+        await cache.invalidate("damage")
+        assert await cache.get("damage", {"limit": 1}) is None
+        return cache.stats()
+
+    stats = asyncio.run(run())
+    assert stats["hits"] == 1
+    assert stats["misses"] == 2
+    assert stats["invalidations"] == 1
@@ -1,21 +1,23 @@
+import json
 import pytest
 from unittest.mock import MagicMock
-from unittest.mock import patch
 
-from database.models import CarData
+from datetime import date
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from database.models import CarData, DamageData
 
 
 @pytest.fixture
-def mock_car_data_db_session():
-    with patch("routers.car.db_session") as mock:
-        yield mock
+def mock_car_data_db_session(mock_async_db_session):
+    yield mock_async_db_session
 
 
 MOCK_DATA = [
-    CarData(license_plate='ABC123', model="Civic", color="Red",
-            vin_number="1HGFA16568L000001", brand="Honda"),
-    CarData(license_plate='XYZ456', model="Camry", color="Blue",
-            vin_number="4T1BE46K97U514571", brand="Toyota")
+    ('ABC123', "Civic", "Red", "1HGFA16568L000001", "Honda"),
+    ('XYZ456', "Camry", "Blue", "4T1BE46K97U514571", "Toyota")
 ]
 
 
@@ -24,10 +26,8 @@ def test_random(test_client, mock_car_data_db_session):
 
 
 def test_read_car_data(test_client, mock_car_data_db_session):
-    # Mock the query and all() method
-    mock_query = MagicMock()
-    mock_query.all.return_value = MOCK_DATA
-    mock_car_data_db_session.query.return_value = mock_query
+    # Mock the execute and all() method
+    mock_car_data_db_session.execute.return_value.all.return_value = MOCK_DATA
 
     response = test_client.get("/cars")
 
@@ -44,7 +44,7 @@ def test_delete_existing_car(test_client, mock_car_data_db_session):
     # Mocking the db_session and CarData
     mock_car_data = MagicMock()
     mock_car_data.license_plate = "ABC123"
-    mock_car_data_db_session.query().filter().first.return_value = mock_car_data
+    mock_car_data_db_session.execute.return_value.scalars.return_value.first.return_value = mock_car_data
 
     response = test_client.delete("/admin/cars/ABC123")
 
@@ -67,8 +67,6 @@ def test_create_car_data_success(test_client, mock_car_data_db_session):
 
     mock_car_data_db_session.add.return_value = None
     mock_car_data_db_session.commit.return_value = None
-    mock_car_data_db_session.query(
-        CarData).return_value = mock_new_car
 
     response = test_client.post("/admin/cars", json=car_data_request)
 
@@ -80,3 +78,190 @@ def test_create_car_data_success(test_client, mock_car_data_db_session):
         "vin_number": "1HGCR2F3XHA12345666",
         "brand": "BMW"
     }
+
+
+def test_export_car_data_ndjson(test_client, mock_car_data_db_session, mock_stream_result):
+    mock_car_data_db_session.stream.return_value = mock_stream_result([
+        [('ABC123', "Civic", "Red", "1HGFA16568L000001", "Honda")],
+        [('XYZ456', "Camry", "Blue", "4T1BE46K97U514571", "Toyota")]
+    ])
+
+    response = test_client.get("/cars/export")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert [json.loads(line) for line in response.text.splitlines()] == [
+        {'license_plate': 'ABC123', 'model': "Civic", 'color': "Red",
+            'vin_number': "1HGFA16568L000001", 'brand': "Honda"},
+        {'license_plate': 'XYZ456', 'model': "Camry", 'color': "Blue",
+            'vin_number': "4T1BE46K97U514571", 'brand': "Toyota"}
+    ]
+    mock_car_data_db_session.stream.return_value.close.assert_awaited_once()
+
+
+def test_export_car_data_csv(test_client, mock_car_data_db_session, mock_stream_result):
+    mock_car_data_db_session.stream.return_value = mock_stream_result([
+        [('ABC123', "Civic", "Red", "1HGFA16568L000001", "Honda")]
+    ])
+
+    response = test_client.get("/cars/export?format=csv")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    assert response.headers["Content-Disposition"] == 'attachment; filename="cars.csv"'
+    assert response.text.splitlines() == [
+        "license_plate,model,color,vin_number,brand",
+        "ABC123,Civic,Red,1HGFA16568L000001,Honda"
+    ]
+
+
+def test_delete_car_data_cascades_damages(test_client, sqlite_db):
+    sqlite_db.add(CarData(license_plate='ABC123', model="Civic", color="Red",
+                          vin_number="1HGFA16568L000001", brand="Honda",
+                          damages=[DamageData(damage_type="Dent", damaged_part="Bonnet",
+                                              date=date(2022, 5, 1))]))
+    sqlite_db.commit()
+
+    response = test_client.delete("/admin/cars/ABC123")
+
+    assert response.status_code == 200
+    assert sqlite_db.query(CarData).count() == 0
+    assert sqlite_db.query(DamageData).count() == 0
+
+
+def test_delete_car_data_leaves_damages_to_the_database(test_client, sqlite_db):
+    sqlite_db.add(CarData(license_plate='ABC123', model="Civic", color="Red",
+                          vin_number="1HGFA16568L000001", brand="Honda",
+                          damages=[DamageData(damage_type="Dent", damaged_part="Bonnet",
+                                              date=date(2022, 5, day)) for day in range(1, 21)]))
+    sqlite_db.commit()
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(Engine, "before_cursor_execute", record)
+    try:
+        response = test_client.delete("/admin/cars/ABC123")
+    finally:
+        event.remove(Engine, "before_cursor_execute", record)
+
+    assert response.status_code == 200
+    assert not [statement for statement in statements if statement.lstrip().startswith("DELETE FROM damages")]
+    assert sqlite_db.query(DamageData).count() == 0
+
+
+def test_bulk_delete_car_data(test_client, sqlite_db):
+    for plate, vin in [("ABC123", "1HGFA16568L000001"), ("XYZ456", "4T1BE46K97U514571"),
+                       ("KEEP01", "WVWZZZ1KZ8W000002")]:
+        sqlite_db.add(CarData(license_plate=plate, model="Civic", color="Red",
+                              vin_number=vin, brand="Honda"))
+    sqlite_db.commit()
+    for plate in ["ABC123", "ABC123", "XYZ456", "KEEP01"]:
+        test_client.post("/admin/damage", json={
+            "license_plate": plate, "damage_type": "Dent",
+            "damaged_part": "Bonnet", "date": "2022-05-01"})
+
+    response = test_client.post("/admin/cars/delete", json={
+        "license_plates": ["ABC123", "XYZ456", "NOPE99", "ABC123"]})
+
+    assert response.status_code == 200
+    assert response.json() == {"requested": 3, "cars_deleted": 2, "damages_deleted": 3,
+                               "not_found": ["NOPE99"]}
+    assert [car.license_plate for car in sqlite_db.query(CarData)] == ["KEEP01"]
+    assert sqlite_db.query(DamageData).count() == 1
+    assert test_client.get("/analytics/damage?group_by=brand").json() == [
+        {"damage_type": None, "damaged_part": None, "brand": "Honda", "month": None, "count": 1}]
+
+
+def test_bulk_create_car_data_json(test_client, sqlite_db):
+    sqlite_db.add(CarData(license_plate='ABC123', model="Civic", color="Red",
+                          vin_number="1HGFA16568L000001", brand="Honda"))
+    sqlite_db.commit()
+
+    response = test_client.post("/admin/cars/bulk", json=[
+        {"license_plate": "ABC123", "model": "Civic", "color": "Green",
+         "vin_number": "1HGFA16568L000001", "brand": "Honda"},
+        {"license_plate": "XYZ456", "model": "Camry", "color": "Blue",
+         "vin_number": "4T1BE46K97U514571", "brand": "Toyota"},
+        {"license_plate": "XYZ456", "model": "Camry", "color": "Blue",
+         "vin_number": "4T1BE46K97U514571", "brand": "Toyota"},
+        {"license_plate": "DEF789", "model": "Accord", "color": "Silver",
+         "vin_number": "1HGFA16568L000001", "brand": "Honda"},
+        {"license_plate": "QWE987", "model": "Corolla"}
+    ])
+
+    assert response.status_code == 200
+    assert response.json() == {
+        "received": 5,
+        "written": 2,
+        "errors": [
+            {"row": 3, "detail": "license_plate: Duplicate entry in upload"},
+            {"row": 4, "detail": "vin_number: Already registered to ABC123"},
+            {"row": 5, "detail": "color: Field required"}
+        ]
+    }
+    sqlite_db.expire_all()
+    assert sqlite_db.get(CarData, "ABC123").color == "Green"
+    assert sqlite_db.query(CarData).count() == 2
+
+
+def test_bulk_create_car_data_csv(test_client, sqlite_db):
+    with open("cars.csv", "rb") as f:
+        response = test_client.post(
+            "/admin/cars/bulk", files={"file": ("cars.csv", f, "text/csv")})
+
+    with open("cars.csv") as f:
+        rows = len(f.readlines()) - 1
+    assert response.status_code == 200
+    assert response.json() == {"received": rows, "written": rows, "errors": []}
+    assert sqlite_db.query(CarData).count() == rows
+
+
+def test_bulk_create_car_data_rejects_non_array(test_client, mock_car_data_db_session):
+    response = test_client.post("/admin/cars/bulk", json={"license_plate": "ABC123"})
+
+    assert response.status_code == 400
+    assert response.json() == {"detail": "Expected a JSON array of rows"}
+
+
+def test_read_car_data_is_cached_until_a_write(test_client, mock_car_data_db_session):
+    mock_car_data_db_session.execute.return_value.all.return_value = MOCK_DATA[:1]
+    assert len(test_client.get("/cars").json()) == 1
+
+    mock_car_data_db_session.execute.return_value.all.return_value = MOCK_DATA
+    assert len(test_client.get("/cars").json()) == 1
+    assert mock_car_data_db_session.execute.await_count == 1
+
+    test_client.post("/admin/cars", json={
+        "license_plate": "XYZ456", "model": "Camry", "color": "Blue",
+        "vin_number": "4T1BE46K97U514571", "brand": "Toyota"})
+    assert len(test_client.get("/cars").json()) == 2
+
+    stats = test_client.get("/admin/cache").json()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 2
+
+
+def test_read_car_data_not_modified_skips_query(test_client, mock_car_data_db_session):
+    response = test_client.get("/cars", headers={"If-None-Match": 'W/"cars-0"'})
+
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["ETag"] == 'W/"cars-0"'
+    mock_car_data_db_session.execute.assert_not_awaited()
+
+
+def test_read_car_data_etag_changes_after_write(test_client, sqlite_db):
+    first = test_client.get("/cars")
+    etag = first.headers["ETag"]
+    assert test_client.get("/cars", headers={"If-None-Match": etag}).status_code == 304
+
+    test_client.post("/admin/cars", json={
+        "license_plate": "XYZ456", "model": "Camry", "color": "Blue",
+        "vin_number": "4T1BE46K97U514571", "brand": "Toyota"})
+
+    response = test_client.get("/cars", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert len(response.json()) == 1
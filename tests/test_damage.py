@@ -1,47 +1,33 @@
+import json
+from collections import namedtuple
 import pytest
-from unittest.mock import MagicMock, Mock
 from unittest.mock import patch
-from database.models import DamageData
+from datetime import date
+from database.models import CarData, DamageData
+from database.pagination import decode_cursor, encode_cursor, get_next_cursor
+from pydantic import TypeAdapter
+from routers.models import DamageDataResponse
 
 
 @pytest.fixture
-def mock_damage_data_db_session():
-    with patch('routers.damage.db_session') as mock_db_session:
-        yield mock_db_session
+def mock_damage_data_db_session(mock_async_db_session):
+    yield mock_async_db_session
 
 
-# Mock data
+# Mock data, laid out like the projected rows of GET /damage
+DamageRow = namedtuple("DamageRow", ["id", "license_plate", "damage_type", "damaged_part",
+                                     "date", "model", "color", "vin_number", "brand"])
+
 MOCK_DATA = [
-    DamageData(
-        license_plate="ABC123",
-        damage_type="Scratch",
-        damaged_part="Door",
-        date="2023-01-01",
-        car=MagicMock(
-            license_plate="ABC123",
-            model="Model S",
-            color="Red",
-            vin_number="1HGCM82633A123456",
-            brand="Tesla"
-        )
-    ),
-    DamageData(
-        license_plate="XYZ789",
-        damage_type="Dent",
-        damaged_part="Bumper",
-        date="2023-02-01",
-        car=MagicMock(
-            license_plate="XYZ789",
-            model="Model 3",
-            color="Blue",
-            vin_number="5YJ3E1EA7KF317817",
-            brand="Tesla"
-        )
-    )
+    DamageRow(7, "ABC123", "Scratch", "Door", date(2023, 1, 1),
+              "Model S", "Red", "1HGCM82633A123456", "Tesla"),
+    DamageRow(9, "XYZ789", "Dent", "Bumper", date(2023, 2, 1),
+              "Model 3", "Blue", "5YJ3E1EA7KF317817", "Tesla")
 ]
 
 
-def mock_get_damage_data_filter(model, damage_type, damaged_part):
+def mock_get_damage_data_filter(model, damage_type, damaged_part, date_from=None, date_to=None,
+                                brand=None, license_plate=None):
     return []
 
 
@@ -52,22 +38,20 @@ def mock_damage_filters():
 
 
 def test_read_damage_data(test_client, mock_damage_data_db_session, mock_damage_filters):
-    mock_query = MagicMock()
-    mock_query = mock_damage_data_db_session.query.return_value
-    mock_query.options.return_value = mock_query
-    mock_query.filter.return_value = mock_query
-    mock_query.limit.return_value = mock_query
-    mock_query.offset.return_value = mock_query
-    mock_query.all.return_value = MOCK_DATA
+    mock_damage_data_db_session.execute.return_value.all.return_value = MOCK_DATA
     response = test_client.get("/damage?limit=2&offset=0")
     assert response.status_code == 200
     assert len(response.json()) == 2
+    assert response.json()[0] == {
+        "damage_type": "Scratch", "damaged_part": "Door", "date": "2023-01-01",
+        "car": {"license_plate": "ABC123", "model": "Model S", "color": "Red",
+                "vin_number": "1HGCM82633A123456", "brand": "Tesla"}}
     assert response.json()[0]['damage_type'] == "Scratch"
     assert response.json()[1]['damage_type'] == "Dent"
 
 
 def test_read_damage_data_no_results(test_client, mock_damage_data_db_session, mock_damage_filters):
-    mock_damage_data_db_session.query.return_value.all.return_value = []
+    mock_damage_data_db_session.execute.return_value.all.return_value = []
     response = test_client.get("/damage?limit=2&offset=0")
     assert response.status_code == 200
     assert response.json() == []
@@ -77,7 +61,7 @@ def test_delete_existing_damage(test_client, mock_damage_data_db_session):
     damage_id = 1
     damage_data = DamageData(id=damage_id)
 
-    mock_damage_data_db_session.query().filter().first.return_value = damage_data
+    mock_damage_data_db_session.execute.return_value.scalars.return_value.first.return_value = damage_data
 
     response = test_client.delete(f"/admin/damage/{damage_id}")
 
@@ -98,8 +82,6 @@ def test_create_damage_data_success(test_client, mock_damage_data_db_session):
 
     mock_damage_data_db_session.add.return_value = None
     mock_damage_data_db_session.commit.return_value = None
-    mock_damage_data_db_session.query(
-        DamageData).return_value = mock_new_damage
     response = test_client.post("/admin/damage", json=damage_data_request)
 
     assert response.status_code == 200
@@ -108,3 +90,211 @@ def test_create_damage_data_success(test_client, mock_damage_data_db_session):
         "damaged_part": "Bonnet",
         "date": "2024-06-14"
     }
+
+
+def test_read_damage_data_cursor_first_page(test_client, mock_damage_data_db_session, mock_damage_filters):
+    mock_damage_data_db_session.execute.return_value.all.return_value = MOCK_DATA
+
+    response = test_client.get("/damage?limit=2&cursor=")
+
+    assert response.status_code == 200
+    assert len(response.json()) == 2
+    assert decode_cursor(response.headers["X-Next-Cursor"]) == (
+        date(2023, 2, 1), 9)
+
+
+def test_read_damage_data_cursor_last_page(test_client, mock_damage_data_db_session, mock_damage_filters):
+    mock_damage_data_db_session.execute.return_value.all.return_value = []
+    cursor = encode_cursor(DamageData(id=9, date=date(2023, 2, 1)))
+
+    response = test_client.get(f"/damage?limit=2&cursor={cursor}")
+
+    assert response.status_code == 200
+    assert response.json() == []
+    assert "X-Next-Cursor" not in response.headers
+
+
+def test_read_damage_data_invalid_cursor(test_client, mock_damage_data_db_session):
+    response = test_client.get("/damage?cursor=not-a-cursor")
+
+    assert response.status_code == 400
+    assert response.json() == {"detail": "Invalid cursor"}
+
+
+def test_export_damage_data_csv(test_client, mock_damage_data_db_session, mock_stream_result):
+    mock_damage_data_db_session.stream.return_value = mock_stream_result([
+        [(1, "ABC123", "Scratch", "Door", date(2023, 1, 1),
+          "Model S", "Red", "1HGCM82633A123456", "Tesla")]
+    ])
+
+    response = test_client.get(
+        "/damage/export?format=csv&damage_type=Scratch")
+
+    assert response.status_code == 200
+    assert response.text.splitlines() == [
+        "id,license_plate,damage_type,damaged_part,date,model,color,vin_number,brand",
+        "1,ABC123,Scratch,Door,2023-01-01,Model S,Red,1HGCM82633A123456,Tesla"
+    ]
+
+
+def test_export_damage_data_empty(test_client, mock_damage_data_db_session, mock_stream_result):
+    mock_damage_data_db_session.stream.return_value = mock_stream_result([])
+
+    response = test_client.get("/damage/export")
+
+    assert response.status_code == 200
+    assert response.text == ""
+
+
+def test_read_damage_data_cursor_walks_all_pages(test_client, sqlite_db):
+    sqlite_db.add(CarData(license_plate="ABC123", model="Civic", color="Red",
+                          vin_number="1HGFA16568L000001", brand="Honda"))
+    for day in [3, 1, 2, 1, 5]:
+        sqlite_db.add(DamageData(license_plate="ABC123", damage_type="Dent",
+                                 damaged_part="Bonnet", date=date(2022, 5, day)))
+    sqlite_db.commit()
+
+    dates = []
+    cursor = ""
+    while cursor is not None:
+        response = test_client.get(f"/damage?limit=2&cursor={cursor}")
+        assert response.status_code == 200
+        dates += [damage["date"] for damage in response.json()]
+        cursor = response.headers.get("X-Next-Cursor")
+
+    assert dates == ["2022-05-01", "2022-05-01",
+                     "2022-05-02", "2022-05-03", "2022-05-05"]
+
+
+def test_read_damage_data_cursor_skips_undated_damages(test_client, sqlite_db):
+    # Loads through setup.sh can leave dates NULL; SQLite sorts them first.
+    sqlite_db.add(CarData(license_plate="ABC123", model="Civic", color="Red",
+                          vin_number="1HGFA16568L000001", brand="Honda"))
+    for day in [None, None, 2, 1]:
+        sqlite_db.add(DamageData(license_plate="ABC123", damage_type="Dent", damaged_part="Bonnet",
+                                 date=date(2022, 5, day) if day else None))
+    sqlite_db.commit()
+
+    dates = []
+    cursor = ""
+    while cursor is not None:
+        response = test_client.get(f"/damage?limit=2&cursor={cursor}")
+        assert response.status_code == 200
+        dates += [damage["date"] for damage in response.json()]
+        cursor = response.headers.get("X-Next-Cursor")
+
+    assert dates == ["2022-05-01", "2022-05-02"]
+
+
+@pytest.mark.parametrize("query", ["limit=0&cursor=", "limit=-1&cursor=", "limit=0", "offset=-1"])
+def test_read_damage_data_rejects_out_of_range_paging(test_client, sqlite_db, query):
+    assert test_client.get(f"/damage?{query}").status_code == 422
+
+
+def test_get_next_cursor_without_rows():
+    assert get_next_cursor([], 0) is None
+
+
+def test_export_damage_data_streams_from_database(test_client, sqlite_db):
+    sqlite_db.add(CarData(license_plate="ABC123", model="Civic", color="Red",
+                          vin_number="1HGFA16568L000001", brand="Honda"))
+    sqlite_db.add(DamageData(license_plate="ABC123", damage_type="Dent",
+                             damaged_part="Bonnet", date=date(2022, 5, 1)))
+    sqlite_db.add(DamageData(license_plate="ABC123", damage_type="Scratch",
+                             damaged_part="Roof", date=date(2022, 5, 2)))
+    sqlite_db.commit()
+
+    response = test_client.get("/damage/export?damage_type=Dent")
+
+    assert response.status_code == 200
+    assert [json.loads(line) for line in response.text.splitlines()] == [
+        {"id": 1, "license_plate": "ABC123", "damage_type": "Dent",
+         "damaged_part": "Bonnet", "date": "2022-05-01", "model": "Civic",
+         "color": "Red", "vin_number": "1HGFA16568L000001", "brand": "Honda"}
+    ]
+
+
+def test_bulk_create_damage_data_csv(test_client, sqlite_db):
+    with open("cars.csv", "rb") as f:
+        test_client.post("/admin/cars/bulk", files={"file": f})
+
+    with open("damages.csv", "rb") as f:
+        response = test_client.post(
+            "/admin/damage/bulk", files={"file": ("damages.csv", f, "text/csv")})
+
+    with open("damages.csv") as f:
+        rows = len(f.readlines()) - 1
+    assert response.status_code == 200
+    assert response.json() == {"received": rows, "written": rows, "errors": []}
+    assert sqlite_db.query(DamageData).count() == rows
+
+
+def test_bulk_create_damage_data_json(test_client, sqlite_db):
+    sqlite_db.add(CarData(license_plate="ABC123", model="Civic", color="Red",
+                          vin_number="1HGFA16568L000001", brand="Honda"))
+    sqlite_db.add(DamageData(id=1, license_plate="ABC123", damage_type="Dent",
+                             damaged_part="Bonnet", date=date(2022, 5, 1)))
+    sqlite_db.commit()
+
+    response = test_client.post("/admin/damage/bulk", json=[
+        {"id": 1, "license_plate": "ABC123", "damage_type": "Scratch",
+         "damaged_part": "Bonnet", "date": "2022-05-01"},
+        {"license_plate": "ABC123", "damage_type": "Chip",
+         "damaged_part": "Roof", "date": "2022-06-01"},
+        {"license_plate": "NOPE00", "damage_type": "Chip",
+         "damaged_part": "Roof", "date": "2022-06-01"},
+        {"license_plate": "ABC123", "damage_type": "Chip",
+         "damaged_part": "Roof", "date": "not a date"}
+    ])
+
+    assert response.status_code == 200
+    assert response.json()["received"] == 4
+    assert response.json()["written"] == 2
+    assert [error["row"] for error in response.json()["errors"]] == [3, 4]
+    assert response.json()["errors"][0]["detail"] == "license_plate: Car not found"
+    sqlite_db.expire_all()
+    assert sqlite_db.get(DamageData, 1).damage_type == "Scratch"
+    assert sqlite_db.query(DamageData).count() == 2
+
+
+def test_read_damage_data_matches_response_model(test_client, sqlite_db):
+    sqlite_db.add(CarData(license_plate="ABC123", model="Civic", color="Red",
+                          vin_number="1HGFA16568L000001", brand="Honda"))
+    sqlite_db.add(DamageData(license_plate="ABC123", damage_type="Dent",
+                             damaged_part="Bonnet", date=date(2022, 5, 1)))
+    sqlite_db.commit()
+
+    body = test_client.get("/damage").json()
+
+    expected = TypeAdapter(list[DamageDataResponse]).validate_python(body)
+    assert body == TypeAdapter(list[DamageDataResponse]).dump_python(expected, mode="json")
+
+
+def test_list_endpoints_keep_openapi_schema(test_client):
+    paths = test_client.get("/openapi.json").json()["paths"]
+
+    for path, model in [("/cars", "CarDataResponse"), ("/damage", "DamageDataResponse")]:
+        schema = paths[path]["get"]["responses"]["200"]["content"]["application/json"]["schema"]
+        assert schema["items"] == {"$ref": f"#/components/schemas/{model}"}
+
+
+def test_read_damage_data_etag_follows_car_and_damage_writes(test_client, sqlite_db):
+    sqlite_db.add(CarData(license_plate="ABC123", model="Civic", color="Red",
+                          vin_number="1HGFA16568L000001", brand="Honda"))
+    sqlite_db.commit()
+    etags = [test_client.get("/damage").headers["ETag"]]
+
+    test_client.post("/admin/damage", json={
+        "license_plate": "ABC123", "damage_type": "Dent",
+        "damaged_part": "Bonnet", "date": "2022-05-01"})
+    etags.append(test_client.get("/damage").headers["ETag"])
+
+    test_client.post("/admin/cars/bulk", json=[
+        {"license_plate": "ABC123", "model": "Civic", "color": "Black",
+         "vin_number": "1HGFA16568L000001", "brand": "Honda"}])
+    response = test_client.get("/damage", headers={"If-None-Match": etags[-1]})
+
+    assert response.status_code == 200
+    assert response.json()[0]["car"]["color"] == "Black"
+    assert len(set(etags + [response.headers["ETag"]])) == 3
+    assert test_client.get("/damage", headers={"If-None-Match": f'"x", {response.headers["ETag"]}'}).status_code == 304
@@ -0,0 +1,63 @@
+from datetime import date
+
+from sqlalchemy import select, text
+from sqlalchemy.dialects import sqlite
+
+from database.damagefilters import DamageFilters
+from database.models import CarData, DamageData
+
+
+def query_plan(session, statement):
+    sql = statement.compile(dialect=sqlite.dialect(),
+                            compile_kwargs={"literal_binds": True})
+    rows = session.execute(text(f"EXPLAIN QUERY PLAN {sql}")).all()
+    return "\n".join(row[-1] for row in rows)
+
+
+def damage_query(**kwargs):
+    filters = DamageFilters.get_damage_data_filter(DamageData, **kwargs)
+    return (select(DamageData)
+            .where(*filters)
+            .order_by(DamageData.date, DamageData.id))
+
+
+def test_filters_combine_all_fields(sqlite_db):
+    sqlite_db.add(CarData(license_plate="ABC123", model="Corolla", color="Red",
+                          vin_number="JTDBR32E720000001", brand="Toyota"))
+    sqlite_db.add(CarData(license_plate="XYZ789", model="Golf", color="Blue",
+                          vin_number="WVWZZZ1KZ8W000002", brand="Volkswagen"))
+    for plate, damage_type, day in [("ABC123", "Dent", 1), ("ABC123", "Dent", 20),
+                                    ("ABC123", "Scratch", 21), ("XYZ789", "Dent", 22)]:
+        sqlite_db.add(DamageData(license_plate=plate, damage_type=damage_type,
+                                 damaged_part="Bonnet", date=date(2023, 3, day)))
+    sqlite_db.commit()
+
+    damages = sqlite_db.scalars(damage_query(
+        damage_type="Dent", damaged_part="Bonnet", date_from=date(2023, 3, 10),
+        date_to=date(2023, 3, 31), brand="Toyota, Honda")).all()
+    assert [(d.license_plate, d.date.day) for d in damages] == [("ABC123", 20)]
+
+    damages = sqlite_db.scalars(damage_query(license_plate="XYZ789")).all()
+    assert [d.date.day for d in damages] == [22]
+
+
+def test_type_part_date_filter_uses_composite_index(sqlite_db):
+    plan = query_plan(sqlite_db, damage_query(
+        damage_type="Dent", damaged_part="Bonnet", date_from=date(2023, 3, 1)))
+
+    assert "USING INDEX ix_damages_type_part_date (damage_type=? AND damaged_part=? AND date>?)" in plan
+
+
+def test_brand_filter_uses_brand_and_plate_indexes(sqlite_db):
+    plan = query_plan(sqlite_db, damage_query(
+        brand="Toyota", date_from=date(2023, 3, 1)))
+
+    assert "USING INDEX ix_damages_plate_date (license_plate=? AND date>?)" in plan
+    assert "ix_cars_brand (brand=?)" in plan
+
+
+def test_plate_filter_uses_plate_date_index(sqlite_db):
+    plan = query_plan(sqlite_db, damage_query(
+        license_plate="ABC123", date_to=date(2023, 3, 31)))
+
+    assert "USING INDEX ix_damages_plate_date (license_plate=? AND date<?)" in plan
@@ -0,0 +1,62 @@
+import random
+import re
+import pytest
+
+from routers.report import extract_plate, extract_plates
+
+
+def legacy_extract_plate(plate_text):
+    # The original cubic implementation, kept as the reference behaviour.
+    matches = re.findall(r'[A-Za-z0-9]+', plate_text)
+
+    for match in matches:
+        length = len(match)
+        for size in range(1, length + 1):
+            for start in range(length - size + 1):
+                substring = match[start:start + size]
+                if match == substring * (length // size):
+                    return substring
+
+    return max(matches, key=len) if matches else None
+
+
+def random_ocr_text(rng):
+    alphabet = "AB12O0 -."
+    unit = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 6)))
+    text = unit * rng.randint(1, 4)
+    if rng.random() < 0.5:
+        text += "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 3)))
+    return text
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_extract_plate_matches_legacy_behaviour(seed):
+    rng = random.Random(seed)
+    for _ in range(200):
+        text = random_ocr_text(rng)
+        assert extract_plate(text) == legacy_extract_plate(text), text
+
+
+@pytest.mark.parametrize("plate_text, plate", [
+    ("AB12AB12", "AB12"),
+    ("AB12AB12AB12", "AB12"),
+    ("AB12AB1", "AB12AB1"),
+    ("ABCAB", "ABCAB"),
+    ("  AB12AB12  XYZ", "AB12"),
+    ("--", None),
+    ("", None),
+])
+def test_extract_plate(plate_text, plate):
+    assert extract_plate(plate_text) == plate
+
+
+def test_extract_plate_is_linear_on_long_tokens():
+    token = "AB12" * 25000 + "X"
+    assert extract_plate(token) == token
+
+
+def test_extract_plates_matches_extract_plate():
+    rng = random.Random(0)
+    texts = [random_ocr_text(rng) for _ in range(500)] * 2
+
+    assert extract_plates(texts) == [extract_plate(text) for text in texts]
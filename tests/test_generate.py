@@ -0,0 +1,61 @@
+from collections import Counter
+
+from database.generate import FleetGenerator, license_plate, write_csv, write_database
+from database.models import CarData, DamageData, DamageSummary
+
+
+def test_generator_is_deterministic_per_seed():
+    first = FleetGenerator(cars=50, seed=7)
+    second = FleetGenerator(cars=50, seed=7)
+
+    assert list(first.iter_cars()) == list(second.iter_cars())
+    assert list(first.iter_damages()) == list(second.iter_damages())
+    assert list(FleetGenerator(cars=50, seed=8).iter_damages()) != list(first.iter_damages())
+
+
+def test_generator_rows_are_unique_skewed_and_in_range():
+    generator = FleetGenerator(cars=2000, damages_per_car=4, skew=1.5, days=30)
+    cars = list(generator.iter_cars())
+    damages = list(generator.iter_damages())
+
+    assert len({car[0] for car in cars}) == 2000
+    assert len({car[3] for car in cars}) == 2000
+    assert all(len(car[3]) == 17 for car in cars)
+    assert 7000 < len(damages) < 9000
+    assert {damage[0] for damage in damages} <= {car[0] for car in cars}
+    assert max(damage[3] for damage in damages) < generator.start_date.replace(day=31)
+
+    types = Counter(damage[1] for damage in damages).most_common()
+    assert types[0][0] == "Scratch"
+    assert types[0][1] > 3 * types[-1][1]
+
+
+def test_license_plates_do_not_repeat():
+    assert license_plate(0) == "AA00AAA"
+    assert len({license_plate(i) for i in range(0, 10 ** 8, 9973)}) == len(range(0, 10 ** 8, 9973))
+
+
+def test_write_database_and_csv(tmp_path, sqlite_db):
+    generator = FleetGenerator(cars=300, damages_per_car=3, seed=1)
+    url = str(sqlite_db.get_bind().url)
+
+    counts = write_database(generator, url)
+
+    assert counts["cars"] == sqlite_db.query(CarData).count() == 300
+    assert counts["damages"] == sqlite_db.query(DamageData).count()
+    assert sum(row.damage_count for row in sqlite_db.query(DamageSummary)) == counts["damages"]
+
+    assert write_csv(generator, str(tmp_path / "csv")) == counts
+    with open(tmp_path / "csv" / "damages.csv") as f:
+        assert next(f).strip() == "id,Car License Plate,Damage Type,Damaged Part,Date"
+        assert next(f).startswith("1,AA00AAA,")
+
+
+def test_generated_csv_loads_through_bulk_endpoints(tmp_path, test_client, sqlite_db):
+    write_csv(FleetGenerator(cars=100, seed=2), str(tmp_path))
+
+    for path, endpoint in [("cars.csv", "/admin/cars/bulk"), ("damages.csv", "/admin/damage/bulk")]:
+        with open(tmp_path / path, "rb") as f:
+            response = test_client.post(endpoint, files={"file": f})
+        assert response.status_code == 200
+        assert response.json()["errors"] == []
@@ -0,0 +1,64 @@
+import os
+import subprocess
+import sys
+
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from database.database import Database, get_db_session
+from main import app
+from services import plate_client
+
+
+def test_healthz(test_client):
+    assert test_client.get("/healthz").json() == {"status": "ok"}
+
+
+def test_readyz_when_database_answers(test_client, sqlite_db):
+    response = test_client.get("/readyz")
+    assert response.status_code == 200
+    assert response.json() == {"status": "ready", "database": "ok"}
+
+
+def test_readyz_when_database_is_unreachable(test_client, tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'missing' / 'test.db'}")
+
+    async def unreachable_session():
+        async with async_sessionmaker(bind=engine)() as session:
+            yield session
+
+    app.dependency_overrides[get_db_session] = unreachable_session
+    try:
+        response = test_client.get("/readyz")
+    finally:
+        app.dependency_overrides.pop(get_db_session, None)
+
+    assert response.status_code == 503
+    assert response.json()["status"] == "unavailable"
+
+
+def test_importing_the_app_opens_nothing():
+    code = ("import sys, main\n"
+            "from database.database import Database\n"
+            "print(sorted(m for m in ('reportlab', 'PIL', 'httpx', 'pyarrow') if m in sys.modules),"
+            " Database._initialized)")
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+    assert output.strip() == "[] False"
+
+
+def test_importing_the_app_leaves_the_plate_cache_file_closed(tmp_path):
+    code = "import main\nfrom services.plate_cache import plate_cache\nprint(plate_cache._db)"
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                            env={**os.environ, "PLATE_CACHE_PATH": str(tmp_path / "plates.db")}).stdout
+    assert output.strip() == "None"
+    assert not (tmp_path / "plates.db").exists()
+
+
+def test_shutdown_releases_lazily_created_resources():
+    with TestClient(app) as client:
+        client.get("/healthz")
+        Database()
+        plate_client.get_plate_client()
+
+    assert not Database._initialized
+    assert plate_client._plate_client is None
@@ -0,0 +1,125 @@
+import asyncio
+import io
+import random
+import pytest
+from unittest.mock import patch
+from PIL import Image
+from starlette.datastructures import UploadFile
+
+from database.models import CarData
+from services.image import ImageTooLargeError, downscale_image, read_upload
+
+
+def make_jpeg(width, height):
+    # Noise does not compress, so the file is about as large as a photo.
+    noise = random.Random(0).randbytes(width * height * 3)
+    image = Image.frombytes("RGB", (width, height), noise)
+    output = io.BytesIO()
+    image.save(output, "JPEG", quality=95)
+    return output.getvalue()
+
+
+def test_read_upload_rejects_oversized_file():
+    upload = UploadFile(io.BytesIO(b"x" * 1000))
+    with pytest.raises(ImageTooLargeError):
+        asyncio.run(read_upload(upload, max_bytes=999))
+
+
+def test_read_upload_reads_in_chunks():
+    upload = UploadFile(io.BytesIO(b"x" * 200_000))
+    assert asyncio.run(read_upload(upload, max_bytes=200_000)) == b"x" * 200_000
+
+
+def test_downscale_image_shrinks_large_photos():
+    contents = make_jpeg(2400, 1200)
+    downscaled = downscale_image(contents, max_side=800)
+
+    assert len(downscaled) < len(contents)
+    assert Image.open(io.BytesIO(downscaled)).size == (800, 400)
+
+
+def test_downscale_image_keeps_small_and_unreadable_input():
+    small = make_jpeg(400, 300)
+    assert downscale_image(small, max_side=800) is small
+    assert downscale_image(b"fake image data") == b"fake image data"
+
+
+def test_generate_report_sends_downscaled_image(test_client, mock_async_db_session, stub_plate_api):
+    mock_async_db_session.execute.return_value.scalars.return_value.first.return_value = None
+    sizes = []
+
+    def plate_text(image):
+        sizes.append(Image.open(io.BytesIO(image)).size)
+        return "ABC123"
+
+    stub_plate_api(plate_text=plate_text)
+    contents = make_jpeg(3200, 1600)
+
+    with patch("routers.report.downscale_image", lambda data: downscale_image(data, max_side=800)):
+        response = test_client.post(
+            "/generate-report", files={"file": ("car.jpg", contents, "image/jpeg")})
+
+    assert response.status_code == 404
+    assert sizes == [(800, 400)]
+
+    stats = test_client.get("/admin/images").json()
+    assert stats["images"] == 1
+    assert stats["bytes_saved"] > 0
+    assert set(stats["stage_seconds"]) == {"read", "downscale", "recognise"}
+
+
+def test_generate_report_reports_timings(test_client, mock_async_db_session, stub_plate_api):
+    mock_async_db_session.execute.return_value.scalars.return_value.first.return_value = CarData(
+        license_plate="ABC123", report_version=1)
+    mock_async_db_session.execute.return_value.scalars.return_value.all.return_value = []
+    stub_plate_api()
+
+    with patch("routers.report.build_car_report"), \
+            patch("routers.report.render_pdf", return_value=b"%PDF"):
+        response = test_client.post(
+            "/generate-report", files={"file": ("car.jpg", b"ABC123", "image/jpeg")})
+
+    assert response.status_code == 200
+    stages = [part.split(";")[0] for part in response.headers["Server-Timing"].split(", ")]
+    assert stages == ["read", "downscale", "recognise"]
+    assert response.headers["X-Image-Bytes-Saved"] == "0"
+
+
+def test_generate_report_rejects_oversized_upload(test_client, mock_async_db_session, stub_plate_api):
+    stub_app = stub_plate_api()
+
+    with patch("routers.report.read_upload", lambda file: read_upload(file, max_bytes=10)):
+        response = test_client.post(
+            "/generate-report", files={"file": ("car.jpg", b"x" * 11, "image/jpeg")})
+
+    assert response.status_code == 413
+    assert stub_app.state.calls == 0
+
+
+def test_upload_limit_refuses_large_content_length_before_parsing(test_client, stub_plate_api):
+    stub_app = stub_plate_api()
+
+    with patch.dict("routers.report.UPLOAD_REQUEST_LIMITS", {"/generate-report": 100}), \
+            patch("routers.report.read_upload") as read:
+        response = test_client.post(
+            "/generate-report", files={"file": ("car.jpg", b"x" * 200, "image/jpeg")})
+
+    assert response.status_code == 413
+    read.assert_not_called()
+    assert stub_app.state.calls == 0
+
+
+def test_upload_limit_cuts_off_chunked_body(test_client, stub_plate_api):
+    stub_app = stub_plate_api()
+    chunks = [b"--boundary\r\nContent-Disposition: form-data; name=\"file\"; filename=\"car.jpg\"\r\n\r\n",
+              b"x" * 100, b"x" * 100, b"\r\n--boundary--\r\n"]
+
+    with patch.dict("routers.report.UPLOAD_REQUEST_LIMITS", {"/reports": 150}), \
+            patch("routers.report.read_upload") as read:
+        response = test_client.post(
+            "/reports", content=iter(chunks),
+            headers={"Content-Type": "multipart/form-data; boundary=boundary"})
+
+    assert response.status_code == 413
+    read.assert_not_called()
+    assert stub_app.state.calls == 0
@@ -0,0 +1,78 @@
+import asyncio
+from datetime import date
+from unittest.mock import patch
+
+from sqlalchemy import create_engine, text
+
+from database.models import DamageData
+from routers.models import CarAndDamageResponse, CarDataResponse, DamageCreateDataResponse
+from services.metrics import (Histogram, db_statement_duration, http_request_duration, instrument_engine,
+                              pdf_render_duration, plate_api_errors)
+from services.pdf import render_pdf
+
+
+def observations(histogram, *labels):
+    series = histogram._series.get(labels)
+    return series[2] if series else 0
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram("test_seconds", "Test", ("route",), buckets=(0.1, 1))
+    for value in [0.05, 0.5, 0.5, 3]:
+        histogram.observe(value, "/cars")
+
+    assert list(histogram.collect())[2:] == [
+        'test_seconds_bucket{route="/cars",le="0.1"} 1',
+        'test_seconds_bucket{route="/cars",le="1"} 3',
+        'test_seconds_bucket{route="/cars",le="+Inf"} 4',
+        'test_seconds_sum{route="/cars"} 4.05',
+        'test_seconds_count{route="/cars"} 4',
+    ]
+
+
+def test_requests_are_labelled_by_route_template(test_client, mock_async_db_session):
+    mock_async_db_session.execute.return_value.scalars.return_value.first.return_value = DamageData(id=7)
+    before = observations(http_request_duration, "DELETE", "/admin/damage/{damage_id}", 200)
+
+    test_client.delete("/admin/damage/7")
+    response = test_client.get("/metrics")
+
+    assert observations(http_request_duration, "DELETE", "/admin/damage/{damage_id}", 200) == before + 1
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert 'route="/admin/damage/{damage_id}",status="200"' in response.text
+
+
+def test_sql_statements_are_timed_by_operation():
+    engine = create_engine("sqlite://")
+    instrument_engine(engine)
+    before = observations(db_statement_duration, "SELECT")
+
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+        connection.execute(text("  select 2"))
+
+    assert observations(db_statement_duration, "SELECT") == before + 2
+
+
+def test_plate_api_errors_are_counted(test_client, mock_async_db_session, stub_plate_api):
+    stub_plate_api(fail_first=10, fail_status=400)
+    before = plate_api_errors._values.get((400,), 0)
+
+    response = test_client.post("/generate-report", files={"file": ("car.jpg", b"ABC123")})
+
+    assert response.status_code == 400
+    assert plate_api_errors._values[(400,)] == before + 1
+    assert 'plate_api_request_duration_seconds_count{outcome="error"}' in test_client.get("/metrics").text
+
+
+def test_render_pdf_records_render_time():
+    report = CarAndDamageResponse(
+        car=CarDataResponse(license_plate="ABC123", model="Civic", color="Red",
+                            vin_number="1HGFA16568L000001", brand="Honda"),
+        damages=[DamageCreateDataResponse(damage_type="Dent", damaged_part="Bonnet", date=date(2022, 5, 1))])
+    before = observations(pdf_render_duration)
+
+    with patch("services.pdf.PDF_RENDER_WORKERS", 0):
+        assert asyncio.run(render_pdf(report)).startswith(b"%PDF")
+
+    assert observations(pdf_render_duration) == before + 1
@@ -0,0 +1,31 @@
+import asyncio
+import re
+import pytest
+from datetime import date
+
+from routers.models import CarDataResponse, DamageCreateDataResponse, CarAndDamageResponse
+from services.pdf import create_pdf, render_pdf
+
+
+def make_report(damages):
+    return CarAndDamageResponse(
+        car=CarDataResponse(license_plate="ABC123", model="Civic", color="Red",
+                            vin_number="1HGFA16568L000001", brand="Honda"),
+        damages=[DamageCreateDataResponse(damage_type="Dent", damaged_part="Bonnet",
+                                          date=date(2022, 5, 1))] * damages)
+
+
+def count_pages(pdf_bytes):
+    return len(re.findall(rb"/Type /Page\b", pdf_bytes))
+
+
+@pytest.mark.parametrize("damages, pages", [(0, 1), (9, 1), (10, 2), (100, 10)])
+def test_create_pdf_breaks_pages(damages, pages):
+    assert count_pages(create_pdf(make_report(damages))) == pages
+
+
+def test_render_pdf_in_process_pool():
+    pdf_bytes = asyncio.run(render_pdf(make_report(25)))
+
+    assert pdf_bytes.startswith(b"%PDF")
+    assert count_pages(pdf_bytes) == 3
@@ -0,0 +1,48 @@
+import asyncio
+import pytest
+
+from services.plate_cache import PlateCache
+
+
+def test_plate_cache_evicts_least_recently_used():
+    async def run():
+        cache = PlateCache(max_entries=2)
+        await cache.set("a", "AAA111")
+        await cache.set("b", "BBB222")
+        await cache.get("a")
+        await cache.set("c", "CCC333")
+        return [await cache.get(key) for key in "abc"], cache.stats()
+
+    plates, stats = asyncio.run(run())
+    assert plates == ["AAA111", None, "CCC333"]
+    assert stats["memory_hits"] == 3
+    assert stats["misses"] == 1
+
+
+def test_plate_cache_survives_restart_on_disk(tmp_path):
+    path = str(tmp_path / "plates.db")
+    key = PlateCache.key(b"image bytes")
+
+    asyncio.run(PlateCache(path=path).set(key, "ABC123"))
+    restarted = PlateCache(path=path)
+
+    assert asyncio.run(restarted.get(key)) == "ABC123"
+    assert asyncio.run(restarted.get(key)) == "ABC123"
+    assert restarted.stats()["disk_hits"] == 1
+    assert restarted.stats()["memory_hits"] == 1
+    assert restarted.stats()["hit_rate"] == 1.0
+
+
+def test_plate_cache_opens_its_file_on_first_use_and_closes_it(tmp_path):
+    path = tmp_path / "plates.db"
+    cache = PlateCache(path=str(path))
+    assert cache._db is None and not path.exists()
+
+    asyncio.run(cache.set("a", "AAA111"))
+    assert cache._db is not None
+    cache.close()
+    assert cache._db is None
+
+    cache._entries.clear()
+    assert asyncio.run(cache.get("a")) == "AAA111"
+    cache.close()
@@ -0,0 +1,70 @@
+import asyncio
+import httpx
+import pytest
+
+from services.plate_client import PlateApiError, PlateRecognitionClient
+from services.plate_stub import create_stub_app
+
+
+def make_client(app=None, transport=None, **kwargs):
+    kwargs.setdefault("backoff", 0)
+    return PlateRecognitionClient(
+        url="http://plate-api/platebber.aspx",
+        transport=transport or httpx.ASGITransport(app=app), **kwargs)
+
+
+def test_recognise_returns_plate_text():
+    client = make_client(create_stub_app(plate_text=lambda image: image.decode()))
+
+    assert asyncio.run(client.recognise(b"ABC123")) == [{"plate_text": "ABC123"}]
+
+
+def test_recognise_retries_transient_failures():
+    app = create_stub_app(fail_first=2, fail_status=503)
+    client = make_client(app, retries=2)
+
+    assert asyncio.run(client.recognise(b"image")) == [{"plate_text": "ABC123"}]
+    assert app.state.calls == 3
+
+
+def test_recognise_gives_up_after_retries():
+    app = create_stub_app(fail_first=5, fail_status=503)
+    client = make_client(app, retries=1)
+
+    with pytest.raises(PlateApiError) as e:
+        asyncio.run(client.recognise(b"image"))
+    assert e.value.status_code == 503
+    assert app.state.calls == 2
+
+
+def test_recognise_does_not_retry_client_errors():
+    app = create_stub_app(fail_first=5, fail_status=401)
+    client = make_client(app, retries=3)
+
+    with pytest.raises(PlateApiError) as e:
+        asyncio.run(client.recognise(b"image"))
+    assert e.value.status_code == 401
+    assert app.state.calls == 1
+
+
+def test_recognise_maps_timeouts_to_504():
+    def handler(request):
+        raise httpx.ReadTimeout("read timed out", request=request)
+
+    client = make_client(transport=httpx.MockTransport(handler), retries=1)
+
+    with pytest.raises(PlateApiError) as e:
+        asyncio.run(client.recognise(b"image"))
+    assert e.value.status_code == 504
+
+
+def test_recognise_caps_calls_in_flight():
+    app = create_stub_app(latency=0.02)
+    client = make_client(app, max_in_flight=3)
+
+    async def run():
+        await asyncio.gather(*(client.recognise(b"image") for _ in range(10)))
+
+    asyncio.run(run())
+    assert app.state.calls == 10
+    assert app.state.max_in_flight == 3
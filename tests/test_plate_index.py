@@ -0,0 +1,168 @@
+import asyncio
+import io
+import json
+import zipfile
+
+from database.database import get_session_factory
+from database.models import CarData, TableVersion
+from main import app
+from services.plate_index import PlateIndex, best_match, canonical, plate_distance, plate_index
+
+
+def make_car(license_plate):
+    return CarData(license_plate=license_plate, model="Civic", color="Red",
+                   vin_number=f"VIN-{license_plate}", brand="Honda")
+
+
+def test_confusable_characters_share_a_canonical_key():
+    assert canonical("AB0123") == canonical("ABO123") == canonical("A8OI23")
+
+
+def test_plate_distance_makes_confusions_cheaper_than_edits():
+    assert plate_distance("ABC123", "ABC123") == 0
+    assert plate_distance("ABO123", "AB0123") == 0.2
+    assert plate_distance("ABX123", "AB0123") == 1
+    assert plate_distance("AB123", "AB0123") == 1
+    assert plate_distance("AB0I23", "AB0123") < plate_distance("AB0X23", "AB0123")
+
+
+def test_search_ranks_candidates():
+    index = PlateIndex()
+    for plate in ["AB0123", "ABO124", "XYZ999"]:
+        index.add(plate)
+
+    assert index.search("ABO123") == [("AB0123", 0.2), ("ABO124", 1)]
+    assert index.search("AB013") == [("AB0123", 1)]
+    assert index.search("XYZ99") == [("XYZ999", 1)]
+    assert index.search("QQQ111") == []
+    assert index.search("ab-o123", limit=1) == [("AB0123", 0.2)]
+    assert index.search("---") == []
+    assert index.search(None) == []
+
+
+def test_add_and_remove_keep_colliding_plates_apart():
+    index = PlateIndex()
+    index.add("AB0123")
+    index.add("ABO123")
+    assert len(index) == 2
+
+    index.remove("AB0123")
+    assert index.search("AB0123") == [("ABO123", 0.2)]
+    index.remove("ABO123")
+    assert len(index) == 0
+
+
+def test_best_match_only_takes_an_unambiguous_winner():
+    assert best_match([("AB0123", 0.2), ("ABO124", 1)]) == "AB0123"
+    assert best_match([("AB0123", 0.2), ("ABO123", 0.2)]) is None
+    assert best_match([]) is None
+
+
+def test_generate_report_falls_back_to_closest_plate(test_client, sqlite_db, stub_plate_api):
+    sqlite_db.add_all([make_car("AB0123"), make_car("XYZ999")])
+    sqlite_db.commit()
+    stub_plate_api(plate_text=lambda image: "ABO123")
+
+    response = test_client.post("/generate-report", files={"file": ("car.jpg", b"image")})
+
+    assert response.status_code == 200
+    assert response.headers["X-Matched-Plate"] == "AB0123"
+
+
+def test_generate_report_without_plate_characters_is_not_found(test_client, sqlite_db, stub_plate_api):
+    sqlite_db.add(make_car("AB0123"))
+    sqlite_db.commit()
+    stub_plate_api(plate_text=lambda image: "---")
+
+    response = test_client.post("/generate-report", files={"file": ("car.jpg", b"image")})
+
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Car not found"
+
+
+def test_generate_report_lists_candidates_when_ambiguous(test_client, sqlite_db, stub_plate_api):
+    sqlite_db.add_all([make_car("AB0123"), make_car("ABO123")])
+    sqlite_db.commit()
+    stub_plate_api(plate_text=lambda image: "AB8123")
+
+    response = test_client.post("/generate-report", files={"file": ("car.jpg", b"image")})
+
+    assert response.status_code == 404
+    assert response.headers["X-Plate-Candidates"] == "AB0123, ABO123"
+
+
+def test_batch_report_matches_misread_plates(test_client, sqlite_db, stub_plate_api):
+    sqlite_db.add(make_car("AB0123"))
+    sqlite_db.commit()
+    stub_plate_api()
+
+    response = test_client.post("/generate-report/batch", files=[
+        ("files", ("car.jpg", b"ABO123", "image/jpeg"))])
+
+    archive = zipfile.ZipFile(io.BytesIO(response.content))
+    manifest = json.loads(archive.read("manifest.json"))
+    assert manifest[0]["status"] == "ok"
+    assert manifest[0]["matched_plate"] == "AB0123"
+    assert "AB0123.pdf" in archive.namelist()
+
+
+def test_lookup_follows_admin_writes(test_client, sqlite_db):
+    sqlite_db.add(make_car("AB0123"))
+    sqlite_db.commit()
+
+    assert test_client.get("/cars/lookup", params={"plate": "ABO123"}).json() == [
+        {"license_plate": "AB0123", "cost": 0.2}]
+    loaded_version = plate_index.version
+
+    test_client.post("/admin/cars", json={
+        "license_plate": "CD4567", "model": "Civic", "color": "Red",
+        "vin_number": "VIN-CD4567", "brand": "Honda"})
+    test_client.delete("/admin/cars/AB0123")
+
+    # Both writes were applied in place, so no reload was needed.
+    assert plate_index.version == loaded_version + 2
+    assert test_client.get("/cars/lookup", params={"plate": "ABO123"}).json() == []
+    assert test_client.get("/cars/lookup", params={"plate": "CD4S67"}).json() == [
+        {"license_plate": "CD4567", "cost": 0.2}]
+
+
+def test_sync_reloads_after_writes_from_elsewhere(sqlite_db):
+    sqlite_db.add(make_car("AB0123"))
+    sqlite_db.commit()
+    index = PlateIndex()
+
+    async def sync():
+        async with app.dependency_overrides[get_session_factory]()() as db_session:
+            await index.sync(db_session)
+
+    asyncio.run(sync())
+    assert index.search("AB0123") == [("AB0123", 0)]
+
+    # Another worker adds a car; only the version counter tells this one.
+    sqlite_db.add(make_car("EF8901"))
+    sqlite_db.merge(TableVersion(table_name="cars", version=index.version + 1))
+    sqlite_db.commit()
+
+    asyncio.run(sync())
+    assert index.search("EFB901") == [("EF8901", 0.2)]
+
+
+def test_sync_serves_loaded_index_while_another_request_reloads(sqlite_db):
+    sqlite_db.add(make_car("AB0123"))
+    sqlite_db.commit()
+    index = PlateIndex()
+
+    async def scenario():
+        async with app.dependency_overrides[get_session_factory]()() as db_session:
+            await index.sync(db_session)
+            sqlite_db.add(make_car("EF8901"))
+            sqlite_db.merge(TableVersion(table_name="cars", version=index.version + 1))
+            sqlite_db.commit()
+
+            async with index._refresh_lock:
+                await asyncio.wait_for(index.sync(db_session), 1)
+                stale = index.search("EF8901")
+            await index.sync(db_session)
+            return stale, index.search("EF8901")
+
+    assert asyncio.run(scenario()) == ([], [("EF8901", 0)])
@@ -0,0 +1,51 @@
+import asyncio
+import pytest
+from sqlalchemy import create_engine, text
+
+from database.database import Database, get_db_session, get_session_factory
+from database.pool import InstrumentedQueuePool
+
+
+def test_pool_stats_track_checkouts(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'pool.db'}",
+                           poolclass=InstrumentedQueuePool, pool_size=1, max_overflow=1)
+
+    first = engine.connect()
+    second = engine.connect()
+    first.execute(text("SELECT 1"))
+
+    stats = engine.pool.stats()
+    assert stats["pool_size"] == 1
+    assert stats["checked_out"] == 2
+    assert stats["overflow"] == 1
+    assert stats["checkouts"] == 2
+    assert stats["wait_time_max"] >= stats["wait_time_avg"] > 0
+
+    first.close()
+    second.close()
+    assert engine.pool.stats()["checked_out"] == 0
+    engine.dispose()
+
+
+def test_get_db_session_yields_a_session_per_request():
+    async def open_session():
+        dependency = get_db_session(get_session_factory())
+        session = await dependency.__anext__()
+        await dependency.aclose()
+        return session
+
+    async def open_two():
+        return await asyncio.gather(open_session(), open_session())
+
+    first, second = asyncio.run(open_two())
+    assert first is not second
+
+
+def test_read_pool_stats(test_client):
+    response = test_client.get("/admin/pool")
+
+    assert response.status_code == 200
+    assert response.json()["settings"] == Database().pool_settings
+    assert set(response.json()["async"]) == {
+        "pool_size", "checked_in", "checked_out", "overflow", "checkouts",
+        "wait_time_total", "wait_time_max", "wait_time_avg"}
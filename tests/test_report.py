@@ -1,7 +1,12 @@
+import io
+import json
+import zipfile
 import pytest
-from unittest.mock import patch, MagicMock
+from datetime import date
+from fastapi import HTTPException
+from unittest.mock import patch
 from database.models import CarData, DamageData
-from routers.models import CarDataResponse, DamageCreateDataResponse, CarAndDamageResponse
+from routers.models import CarDataResponse, DamageCreateDataResponse
 import tempfile
 
 
@@ -57,15 +62,8 @@ def mock_damage_response():
 
 
 @pytest.fixture
-def mock_db_session():
-    with patch('routers.report.db_session') as mock:
-        yield mock
-
-
-@pytest.fixture
-def mock_requests_post():
-    with patch('routers.report.requests.post') as mock:
-        yield mock
+def mock_db_session(mock_async_db_session):
+    yield mock_async_db_session
 
 
 @pytest.fixture
@@ -74,16 +72,13 @@ def mock_extract_plate():
         yield mock
 
 
-def test_generate_report_success(test_client, mock_db_session, mock_requests_post, mock_extract_plate):
+def test_generate_report_success(test_client, mock_db_session, stub_plate_api, mock_extract_plate):
     # Mock the database session
-    mock_db_session.query.return_value.filter.return_value.first.return_value = mock_car_data()
-    mock_db_session.query.return_value.filter.return_value.all.return_value = mock_damage_data()
+    mock_db_session.execute.return_value.scalars.return_value.first.return_value = mock_car_data()
+    mock_db_session.execute.return_value.scalars.return_value.all.return_value = mock_damage_data()
 
-    # Mock the external API call
-    mock_response = MagicMock()
-    mock_response.status_code = 200
-    mock_response.json.return_value = [{"plate_text": "ABC123"}]
-    mock_requests_post.return_value = mock_response
+    # Stub the external API call
+    stub_plate_api(plate_text="ABC123")
 
     # Mock the extract_plate function
     mock_extract_plate.return_value = "ABC123"
@@ -104,15 +99,12 @@ def test_generate_report_success(test_client, mock_db_session, mock_requests_pos
     assert response.headers["content-type"] == 'application/pdf'
 
 
-def test_generate_report_car_not_found(test_client, mock_db_session, mock_requests_post, mock_extract_plate):
+def test_generate_report_car_not_found(test_client, mock_db_session, stub_plate_api, mock_extract_plate):
     # Mock the database session with no car data
-    mock_db_session.query.return_value.filter.return_value.first.return_value = None
+    mock_db_session.execute.return_value.scalars.return_value.first.return_value = None
 
-    # Mock the external API call
-    mock_response = MagicMock()
-    mock_response.status_code = 200
-    mock_response.json.return_value = [{"plate_text": "ABC123"}]
-    mock_requests_post.return_value = mock_response
+    # Stub the external API call
+    stub_plate_api(plate_text="ABC123")
 
     # Mock the extract_plate function
     mock_extract_plate.return_value = "ABC123"
@@ -132,11 +124,9 @@ def test_generate_report_car_not_found(test_client, mock_db_session, mock_reques
     assert response.json() == {"detail": "Car not found"}
 
 
-def test_generate_report_external_api_failure(test_client, mock_requests_post):
-    # Mock the external API call with failure
-    mock_response = MagicMock()
-    mock_response.status_code = 500
-    mock_requests_post.return_value = mock_response
+def test_generate_report_external_api_failure(test_client, stub_plate_api):
+    # Stub the external API call with failure
+    stub_plate_api(fail_first=10, fail_status=500)
 
     # Create a temporary file to simulate file upload
     with tempfile.NamedTemporaryFile(delete=False) as tmp_file:
@@ -152,3 +142,55 @@ def test_generate_report_external_api_failure(test_client, mock_requests_post):
     assert response.status_code == 500
     assert response.json() == {
         "detail": "Failed to upload image to external API"}
+
+
+def test_generate_batch_report(test_client, sqlite_db):
+    car = mock_car_data()
+    car.damages = mock_damage_data()
+    for damage in car.damages:
+        damage.date = date.fromisoformat(damage.date)
+    sqlite_db.add(car)
+    sqlite_db.commit()
+
+    plates = {"front.jpg": "ABC123", "rear.jpg": "ABC123",
+              "other.jpg": "ZZZ999", "blurry.jpg": None}
+
+    async def fake_call_external_api(file, bypass_cache=False):
+        if file.filename == "broken.jpg":
+            raise HTTPException(status_code=502,
+                                detail="Failed to upload image to external API")
+        return plates[file.filename]
+
+    with patch('routers.report.call_external_api', side_effect=fake_call_external_api):
+        response = test_client.post("/generate-report/batch", files=[
+            ("files", (name, b"fake image data", "image/jpeg"))
+            for name in ["front.jpg", "rear.jpg", "other.jpg", "blurry.jpg", "broken.jpg"]
+        ])
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/zip"
+    archive = zipfile.ZipFile(io.BytesIO(response.content))
+    assert sorted(archive.namelist()) == ["ABC123.pdf", "manifest.json"]
+    assert archive.read("ABC123.pdf").startswith(b"%PDF")
+    assert [(entry["filename"], entry["status"]) for entry in json.loads(archive.read("manifest.json"))] == [
+        ("front.jpg", "ok"),
+        ("rear.jpg", "ok"),
+        ("other.jpg", "car_not_found"),
+        ("blurry.jpg", "plate_not_recognised"),
+        ("broken.jpg", "plate_lookup_failed")
+    ]
+
+
+def test_generate_report_reuses_recognised_plate(test_client, mock_db_session, stub_plate_api):
+    mock_db_session.execute.return_value.scalars.return_value.first.return_value = mock_car_data()
+    mock_db_session.execute.return_value.scalars.return_value.all.return_value = mock_damage_data()
+    stub_app = stub_plate_api()
+
+    for url in ["/generate-report", "/generate-report", "/generate-report?refresh=true"]:
+        response = test_client.post(url, files={"file": ("car.jpg", b"ABC123")})
+        assert response.status_code == 200
+
+    assert stub_app.state.calls == 2
+    stats = test_client.get("/admin/cache/plates").json()
+    assert stats["memory_hits"] == 1
+    assert stats["bypasses"] == 1
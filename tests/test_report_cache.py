@@ -0,0 +1,92 @@
+import asyncio
+import os
+from unittest.mock import patch
+
+from database.models import CarData
+from services.report_cache import ReportCache
+
+
+def test_report_cache_evicts_least_recently_used(tmp_path):
+    cache = ReportCache(str(tmp_path), max_bytes=250)
+
+    async def scenario():
+        await cache.put("AAA111", 1, b"a" * 100)
+        await cache.put("BBB222", 1, b"b" * 100)
+        assert await cache.get("AAA111", 1)
+        await cache.put("CCC333", 1, b"c" * 100)
+        return [await cache.get(plate, 1) is not None for plate in ["AAA111", "BBB222", "CCC333"]]
+
+    assert asyncio.run(scenario()) == [True, False, True]
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["bytes"] == 200
+
+
+def test_report_cache_replaces_older_versions(tmp_path):
+    cache = ReportCache(str(tmp_path))
+
+    async def scenario():
+        old_path = await cache.put("AAA111", 1, b"old")
+        new_path = await cache.put("AAA111", 2, b"new")
+        return old_path, new_path, await cache.get("AAA111", 1)
+
+    old_path, new_path, stale = asyncio.run(scenario())
+    assert stale is None
+    assert not os.path.exists(old_path)
+    assert open(new_path, "rb").read() == b"new"
+
+
+def test_report_cache_picks_up_files_on_disk(tmp_path):
+    asyncio.run(ReportCache(str(tmp_path)).put("AAA111", 3, b"%PDF"))
+
+    cache = ReportCache(str(tmp_path))
+    assert asyncio.run(cache.get("AAA111", 3))
+    assert cache.stats()["entries"] == 1
+    asyncio.run(cache.discard("AAA111"))
+    assert os.listdir(tmp_path) == []
+
+
+def test_generate_report_serves_cached_pdf_until_the_car_changes(test_client, sqlite_db, stub_plate_api):
+    test_client.post("/admin/cars", json={
+        "license_plate": "ABC123", "model": "Civic", "color": "Red",
+        "vin_number": "1HGFA16568L000001", "brand": "Honda"})
+    stub_plate_api()
+
+    def report():
+        return test_client.post("/generate-report", files={"file": ("car.jpg", b"ABC123")})
+
+    first = report()
+    with patch("routers.report.render_pdf") as render_pdf:
+        second = report()
+    assert first.headers["X-Report-Cache"] == "miss"
+    assert second.headers["X-Report-Cache"] == "hit"
+    assert second.content == first.content
+    assert second.headers["Content-Disposition"] == 'attachment; filename="report.pdf"'
+    render_pdf.assert_not_called()
+
+    test_client.post("/admin/damage", json={
+        "license_plate": "ABC123", "damage_type": "Dent",
+        "damaged_part": "Bonnet", "date": "2022-05-01"})
+    third = report()
+    assert third.headers["X-Report-Cache"] == "miss"
+    assert third.content != first.content
+
+
+def test_recreated_car_never_reuses_a_report_version(test_client, sqlite_db):
+    car = {"license_plate": "ABC123", "model": "Civic", "color": "Red",
+           "vin_number": "1HGFA16568L000001", "brand": "Honda"}
+
+    def report_version():
+        sqlite_db.expire_all()
+        return sqlite_db.get(CarData, "ABC123").report_version
+
+    test_client.post("/admin/cars", json=car)
+    versions = [report_version()]
+    test_client.post("/admin/damage", json={
+        "license_plate": "ABC123", "damage_type": "Dent",
+        "damaged_part": "Bonnet", "date": "2022-05-01"})
+    versions.append(report_version())
+    test_client.delete("/admin/cars/ABC123")
+    test_client.post("/admin/cars", json=car)
+    versions.append(report_version())
+
+    assert len(set(versions)) == 3
@@ -0,0 +1,100 @@
+import asyncio
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from database.models import CarData
+from main import app
+from services.report_jobs import ReportJobQueue, report_jobs
+
+
+@pytest.fixture
+def job_client(sqlite_db):
+    # Jobs run on worker tasks of the client's event loop, so the client
+    # has to stay open between submitting and polling.
+    sqlite_db.add(CarData(license_plate="ABC123", model="Civic", color="Red",
+                          vin_number="1HGFA16568L000001", brand="Honda"))
+    sqlite_db.commit()
+    with TestClient(app) as client:
+        yield client
+        client.portal.call(report_jobs.shutdown)
+
+
+def wait_for(client, location, timeout=5):
+    deadline = time.monotonic() + timeout
+    while True:
+        response = client.get(location)
+        if response.status_code != 202 or time.monotonic() > deadline:
+            return response
+        time.sleep(0.01)
+
+
+def test_report_job_returns_pdf(job_client, stub_plate_api):
+    stub_plate_api(latency=0.2)
+
+    started = time.monotonic()
+    response = job_client.post("/reports", files={"file": ("car.jpg", b"ABC123")})
+    assert time.monotonic() - started < 0.2
+    assert response.status_code == 202
+    assert response.json()["status"] == "queued"
+    location = response.headers["Location"]
+    assert location == f"/reports/{response.json()['job_id']}"
+
+    assert job_client.get(location).status_code == 202
+    report = wait_for(job_client, location)
+    assert report.status_code == 200
+    assert report.headers["content-type"] == "application/pdf"
+    assert report.content.startswith(b"%PDF")
+
+    stats = job_client.get("/admin/reports/jobs").json()
+    assert stats["jobs"]["done"] == 1
+    assert stats["queue_depth"] == 0
+    assert 'report_job_workers{state="busy"} 0' in job_client.get("/metrics").text
+
+
+def test_report_job_records_failure(job_client, stub_plate_api):
+    stub_plate_api(plate_text=lambda image: "ZZZ999")
+
+    response = job_client.post("/reports", files={"file": ("car.jpg", b"image")})
+    report = wait_for(job_client, response.headers["Location"])
+
+    assert report.status_code == 200
+    assert report.json()["status"] == "failed"
+    assert report.json()["status_code"] == 404
+    assert report.json()["detail"] == "Car not found"
+
+
+def test_report_job_queue_rejects_when_full(job_client, stub_plate_api, monkeypatch):
+    stub_plate_api(latency=0.5)
+    monkeypatch.setattr(report_jobs, "workers", 1)
+    monkeypatch.setattr(report_jobs, "max_queued", 1)
+    job_client.portal.call(report_jobs.shutdown)
+
+    statuses = [job_client.post("/reports", files={"file": ("car.jpg", b"ABC123")}).status_code
+                for _ in range(4)]
+
+    assert statuses.count(202) < 4
+    assert statuses[-1] == 503
+
+
+def test_unknown_report_job(test_client):
+    assert test_client.get("/reports/nope").status_code == 404
+
+
+def test_finished_jobs_expire():
+    queue = ReportJobQueue(workers=1, ttl=0.05)
+
+    async def scenario():
+        async def run():
+            return b"%PDF"
+
+        job = queue.submit(run)
+        await asyncio.sleep(0.01)
+        assert queue.get(job.id).result == b"%PDF"
+        await asyncio.sleep(0.1)
+        expired = queue.get(job.id)
+        await queue.shutdown()
+        return expired
+
+    assert asyncio.run(scenario()) is None